@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# Benchmark suite for the pipeline: construction, per-stage overhead, batch throughput and memory per session
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Awaitable
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from leadgen import __version__  # noqa: E402
+from leadgen.agents.question_agents import QuestionList, KeywordList  # noqa: E402
+from leadgen.pipeline.batch_pipeline import BatchRunner, match_answers  # noqa: E402
+from leadgen.pipeline.lead_gen_pipeline import AsyncLeadGenPipeline, LeadGenPipeline  # noqa: E402
+from leadgen.services.registry import ServiceRegistry  # noqa: E402
+from leadgen.utils.helpers import format_qa_for_prompt, format_all_qa_for_prompt  # noqa: E402
+
+SAMPLE_ANSWER = (
+    "We build scheduling and billing software for independent dental clinics with two to twenty chairs. "
+    "Most customers are practice owners who struggle with no-shows, insurance claims and front-desk turnover."
+)
+
+
+def create_registry(data_dir: str, latency_seconds: float, tokens_per_second: float) -> ServiceRegistry:
+    """Create a registry that uses the mock LLM backend and keeps all data in data_dir
+
+    The response cache, rate limits, question reuse and speculation are disabled
+    so every run measures the same work.
+
+    Args:
+        data_dir: Directory for sessions and indexes
+        latency_seconds: Fixed mock latency per call
+        tokens_per_second: Mock output rate (0 for no pacing)
+
+    Returns:
+        A ServiceRegistry with the benchmark configuration
+    """
+    registry = ServiceRegistry(os.path.join(ROOT_DIR, "config"))
+    config = registry.config_loader.get_config()
+    config["llm"] = {
+        "provider": "mock",
+        "mock": {
+            "seed": 1,
+            "latency": {"distribution": "fixed", "mean_seconds": latency_seconds},
+            "tokens_per_second": tokens_per_second,
+        },
+    }
+    config["rate_limits"] = {"enabled": False}
+    config["cache"] = {"enabled": False}
+    config["storage"] = {"type": "local", "path": data_dir}
+    config["keyword_index"] = {"enabled": True, "path": os.path.join(data_dir, "keyword_index.sqlite3")}
+    config["question_reuse"] = {"enabled": False}
+    config["metrics"] = {
+        "enabled": True,
+        "prometheus_path": os.path.join(data_dir, "metrics.prom"),
+        "spans_path": os.path.join(data_dir, "spans.jsonl"),
+    }
+    registry.config_loader.get_params().setdefault("speculation", {})["personalized_questions"] = {"enabled": False}
+    registry.config_loader.get_params()["speculation"]["keyword_draft"] = {"enabled": False}
+    auto_tune = registry.config_loader.get_agent_params().get("auto_tune", {})
+    auto_tune["path"] = os.path.join(data_dir, "output_budgets.json")
+    return registry
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize timing samples in milliseconds
+
+    Args:
+        samples: Durations in seconds
+
+    Returns:
+        Dictionary with mean, median, p95, min and max in milliseconds
+    """
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 4),
+        "p50_ms": round(statistics.median(ordered) * 1000, 4),
+        "p95_ms": round(p95 * 1000, 4),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def time_calls(function: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """Time repeated calls of a function
+
+    Args:
+        function: Zero-argument function to time
+        iterations: Number of calls
+
+    Returns:
+        Timing summary in milliseconds
+    """
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def peak_rss_bytes() -> int:
+    """Get the peak resident set size of this process
+
+    Returns:
+        Peak RSS in bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def make_record(index: Any) -> Dict[str, Any]:
+    """Build a synthetic pre-answered questionnaire
+
+    Args:
+        index: Record number or label
+
+    Returns:
+        A BatchRunner input record
+    """
+    return {
+        "id": f"bench-{index}",
+        "default_answers": [f"{SAMPLE_ANSWER} (customer {index}, answer {n})" for n in range(5)],
+        "auto_answer": SAMPLE_ANSWER + " ({question})",
+    }
+
+
+def benchmark_construction(registry: ServiceRegistry, iterations: int) -> Dict[str, Any]:
+    """Measure LeadGenPipeline() construction time
+
+    Args:
+        registry: Benchmark registry
+        iterations: Number of constructions to time
+
+    Returns:
+        Cold (first, services built) and warm (shared services) construction times
+    """
+    started = time.perf_counter()
+    LeadGenPipeline(registry)
+    cold = time.perf_counter() - started
+    return {
+        "cold_ms": round(cold * 1000, 4),
+        "warm": time_calls(lambda: LeadGenPipeline(registry), iterations),
+    }
+
+
+async def benchmark_stages(registry: ServiceRegistry, iterations: int) -> Dict[str, Any]:
+    """Measure per-stage overhead excluding time spent in the model backend
+
+    Args:
+        registry: Benchmark registry (zero-latency mock)
+        iterations: Number of sessions to run through every stage
+
+    Returns:
+        Overhead per stage plus timings of prompt building, output validation and save_session
+    """
+    backend = registry.llm_service.backend
+    backend_time = [0.0]
+    backend_run = backend.run
+
+    async def timed_run(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await backend_run(*args, **kwargs)
+        finally:
+            backend_time[0] += time.perf_counter() - started
+
+    backend.run = timed_run
+
+    async def measure(call: Callable[[], Awaitable[Any]]) -> float:
+        backend_time[0] = 0.0
+        started = time.perf_counter()
+        await call()
+        return max(0.0, time.perf_counter() - started - backend_time[0])
+
+    stages: Dict[str, List[float]] = {
+        "personalized_questions": [], "keyword_generation": [], "icp_generation": [],
+    }
+    record = make_record(0)
+    pipeline = None
+    try:
+        for index in range(iterations):
+            pipeline = AsyncLeadGenPipeline(registry, session_id=f"stage-bench-{index}")
+            questions = pipeline.run_default_questions_stage()
+            await pipeline.process_default_answers(match_answers(questions, record["default_answers"], None))
+            stages["personalized_questions"].append(await measure(pipeline.run_personalized_questions_stage))
+            await pipeline.process_personalized_answers(match_answers(
+                pipeline.session.generated_personalized_questions, None, record["auto_answer"]
+            ))
+            stages["keyword_generation"].append(await measure(pipeline.run_keyword_generation_stage))
+            stages["icp_generation"].append(await measure(pipeline.run_icp_generation_stage))
+    finally:
+        backend.run = backend_run
+
+    all_qa_data = {
+        "Default Questions": pipeline.session.default_questions,
+        "Personalized Questions": pipeline.session.personalized_questions,
+    }
+    questions_json = QuestionList(questions=pipeline.session.generated_personalized_questions).model_dump_json()
+    keywords_json = KeywordList(keywords=[k.text for k in pipeline.session.keywords]).model_dump_json()
+    return {
+        "stage_overhead": {name: summarize(samples) for name, samples in stages.items()},
+        "prompt_building": {
+            "format_qa_for_prompt": time_calls(
+                lambda: format_qa_for_prompt(pipeline.session.default_questions), iterations * 10),
+            "format_all_qa_for_prompt": time_calls(
+                lambda: format_all_qa_for_prompt(all_qa_data), iterations * 10),
+        },
+        "output_validation": {
+            "question_list": time_calls(lambda: QuestionList.model_validate_json(questions_json), iterations * 10),
+            "keyword_list": time_calls(lambda: KeywordList.model_validate_json(keywords_json), iterations * 10),
+        },
+        "save_session": time_calls(pipeline.save_session, iterations),
+    }
+
+
+async def benchmark_throughput(registry: ServiceRegistry, sessions: int,
+                               concurrency_levels: List[int]) -> Dict[str, Any]:
+    """Measure completed sessions per second at several concurrency levels
+
+    Args:
+        registry: Benchmark registry (mock with realistic latency)
+        sessions: Sessions to run per concurrency level
+        concurrency_levels: Maximum sessions in flight for each run
+
+    Returns:
+        Throughput and session latency per concurrency level
+    """
+    runner = BatchRunner(os.devnull, os.devnull, registry=registry)
+    results: Dict[str, Any] = {}
+    for concurrency in concurrency_levels:
+        semaphore = asyncio.Semaphore(concurrency)
+        durations: List[float] = []
+
+        async def run_one(index: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await runner.run_session(make_record(f"c{concurrency}-{index}"))
+                durations.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_one(index) for index in range(sessions)))
+        elapsed = time.perf_counter() - started
+        results[str(concurrency)] = {
+            "sessions": sessions,
+            "elapsed_seconds": round(elapsed, 3),
+            "sessions_per_second": round(sessions / elapsed, 3),
+            "session_latency": summarize(durations),
+        }
+    return results
+
+
+async def benchmark_memory(registry: ServiceRegistry, sessions: int) -> Dict[str, Any]:
+    """Measure peak RSS growth per live, fully completed session
+
+    Args:
+        registry: Benchmark registry (zero-latency mock)
+        sessions: Number of pipelines kept alive at once
+
+    Returns:
+        Peak RSS before and after, and the growth per session
+    """
+    runner = BatchRunner(os.devnull, os.devnull, registry=registry)
+    # Run one session first so one-time allocations don't count against every session
+    await runner.run_session(make_record("memory-warmup"))
+    before = peak_rss_bytes()
+
+    live = []
+    for index in range(sessions):
+        pipeline = AsyncLeadGenPipeline(registry, session_id=f"memory-{index}")
+        questions = pipeline.run_default_questions_stage()
+        await pipeline.process_default_answers(
+            match_answers(questions, make_record(index)["default_answers"], None)
+        )
+        await pipeline.run_personalized_questions_stage()
+        await pipeline.process_personalized_answers(match_answers(
+            pipeline.session.generated_personalized_questions, None, SAMPLE_ANSWER
+        ))
+        await pipeline.run_keyword_generation_stage()
+        await pipeline.run_icp_generation_stage()
+        live.append(pipeline)
+
+    after = peak_rss_bytes()
+    return {
+        "live_sessions": len(live),
+        "peak_rss_before_bytes": before,
+        "peak_rss_after_bytes": after,
+        "peak_rss_per_session_bytes": round((after - before) / max(1, len(live))),
+    }
+
+
+def get_git_commit() -> str:
+    """Get the current git commit, if available
+
+    Returns:
+        Abbreviated commit hash, or "unknown"
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every benchmark
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Benchmark results
+    """
+    with tempfile.TemporaryDirectory(prefix="leadgen-bench-") as data_dir:
+        instant = create_registry(os.path.join(data_dir, "instant"), 0.0, 0.0)
+        realistic = create_registry(os.path.join(data_dir, "realistic"), args.latency_ms / 1000, 0.0)
+
+        results: Dict[str, Any] = {
+            "meta": {
+                "version": __version__,
+                "commit": get_git_commit(),
+                "timestamp": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "mock_latency_ms": args.latency_ms,
+            },
+        }
+        results["construction"] = benchmark_construction(instant, args.iterations)
+        results["stages"] = await benchmark_stages(instant, args.iterations)
+        results["throughput"] = await benchmark_throughput(realistic, args.sessions, args.concurrency)
+        results["memory"] = await benchmark_memory(instant, args.memory_sessions)
+    return results
+
+
+def main() -> None:
+    """Parse arguments, run the suite and write the JSON results"""
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite (runs against the mock LLM backend)")
+    parser.add_argument("--iterations", type=int, default=20, help="Iterations for construction and stage timings")
+    parser.add_argument("--sessions", type=int, default=64, help="Sessions per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="Concurrency levels for the throughput benchmark")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock LLM latency for the throughput benchmark")
+    parser.add_argument("--memory-sessions", type=int, default=200, help="Live sessions for the memory benchmark")
+    parser.add_argument("--output", metavar="JSON", help="Write results to a file instead of stdout")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
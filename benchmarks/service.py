@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# Load test for the ASGI service mode: many concurrent users driven in-process against the mock LLM backend
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from pipeline import SAMPLE_ANSWER, create_registry, summarize, peak_rss_bytes  # noqa: E402
+from leadgen.api.asgi import LeadGenApp  # noqa: E402
+from leadgen.pipeline.session_manager import SessionManager  # noqa: E402
+
+
+async def request(app: LeadGenApp, method: str, path: str,
+                  body: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+    """Send one request to the app in-process
+
+    Args:
+        app: The ASGI application
+        method: HTTP method
+        path: Request path
+        body: JSON body
+
+    Returns:
+        Tuple of (status, parsed JSON body, or the raw text for non-JSON responses)
+    """
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    status, headers, chunks = 0, {}, []
+
+    async def receive() -> Dict[str, Any]:
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status, headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = dict(message.get("headers", []))
+        else:
+            chunks.append(message.get("body", b""))
+
+    await app({"type": "http", "method": method, "path": path, "headers": []}, receive, send)
+    text = b"".join(chunks).decode("utf-8")
+    if headers.get(b"content-type") == b"application/json":
+        return status, json.loads(text)
+    return status, text
+
+
+async def run_user(app: LeadGenApp, timings: Dict[str, List[float]], stream: bool) -> None:
+    """Walk one user through every stage, typing answers one at a time
+
+    Args:
+        app: The ASGI application
+        timings: Request durations keyed by route, filled in
+        stream: Whether to stream the ICP instead of requesting it in one response
+    """
+    async def call(route: str, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        started = time.perf_counter()
+        status, result = await request(app, method, path, body)
+        timings.setdefault(route, []).append(time.perf_counter() - started)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} returned {status}: {result}")
+        return result
+
+    session = await call("create", "POST", "/sessions")
+    base = f"/sessions/{session['session_id']}"
+    questions = session["default_questions"]
+    answers = [f"{SAMPLE_ANSWER} ({session['session_id']}, {index})" for index in range(len(questions))]
+    for answered in range(1, len(answers)):
+        await call("default_answers_partial", "POST", f"{base}/default-answers",
+                   {"answers": answers[:answered], "partial": True})
+    await call("default_answers", "POST", f"{base}/default-answers", {"answers": answers})
+
+    personalized = (await call("personalized_questions", "POST", f"{base}/personalized-questions"))["questions"]
+    await call("personalized_answers", "POST", f"{base}/personalized-answers",
+               {"answers": [SAMPLE_ANSWER] * len(personalized)})
+    await call("keywords", "POST", f"{base}/keywords")
+    if stream:
+        events = await call("icp_stream", "GET", f"{base}/icp/stream")
+        if "event: done" not in events:
+            raise RuntimeError(f"ICP stream for {base} did not complete: {events[-200:]}")
+    else:
+        await call("icp", "POST", f"{base}/icp")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Benchmark results
+    """
+    with tempfile.TemporaryDirectory(prefix="leadgen-service-bench-") as data_dir:
+        registry = create_registry(data_dir, args.latency_ms / 1000, tokens_per_second=0)
+        sessions = SessionManager(registry, memory_budget_bytes=int(args.memory_budget_mb * 2 ** 20),
+                                  max_live=args.max_live)
+        app = LeadGenApp(registry, sessions=sessions)
+        timings: Dict[str, List[float]] = {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        failures: List[str] = []
+
+        async def user(index: int) -> None:
+            async with semaphore:
+                try:
+                    await run_user(app, timings, stream=index % 2 == 0)
+                except Exception as e:
+                    failures.append(str(e))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(index) for index in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency_ms,
+            "failures": len(failures),
+            "first_failure": failures[0] if failures else None,
+            "sessions_per_second": round((args.sessions - len(failures)) / elapsed, 2),
+            "elapsed_seconds": round(elapsed, 3),
+            "sessions_held": sessions.get_stats(),
+            "peak_rss_mb": round(peak_rss_bytes() / 2 ** 20, 1),
+            "requests_ms": {route: summarize(samples) for route, samples in sorted(timings.items())},
+        }
+
+
+def main() -> None:
+    """Parse arguments, run the load test and print the JSON results"""
+    parser = argparse.ArgumentParser(description="Service mode load test (runs against the mock LLM backend)")
+    parser.add_argument("--sessions", type=int, default=500, help="Users walked through every stage")
+    parser.add_argument("--concurrency", type=int, default=200, help="Users in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock LLM latency per call")
+    parser.add_argument("--memory-budget-mb", type=float, default=256.0,
+                        help="Memory budget of the session manager")
+    parser.add_argument("--max-live", type=int, default=256, help="Sessions kept as live pipelines")
+    parser.add_argument("--output", metavar="JSON", help="Write results to a file instead of stdout")
+    args = parser.parse_args()
+
+    text = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Cold-start benchmark for the CLI: measures --version/--help and checks no heavy imports happen
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Any
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the lightweight commands must not import
+FORBIDDEN_MODULES = ["pydantic_ai", "groq", "httpx", "pydantic", "yaml"]
+
+COMMANDS = {
+    "version": ["--version"],
+    "help": ["--help"],
+}
+
+
+def get_env() -> Dict[str, str]:
+    """Get the environment for the CLI subprocesses (src/ on the path, no bytecode writes)
+
+    Returns:
+        Environment dictionary
+    """
+    env = dict(os.environ)
+    src_dir = os.path.join(ROOT_DIR, "src")
+    env["PYTHONPATH"] = src_dir + os.pathsep + env.get("PYTHONPATH", "")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def get_imported_modules(args: List[str]) -> List[str]:
+    """Get the top-level modules a CLI invocation imports
+
+    Args:
+        args: Command-line arguments for main.py
+
+    Returns:
+        Sorted list of top-level module names
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT_DIR, "main.py"), *args],
+        cwd=ROOT_DIR, env=get_env(), capture_output=True, text=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            if name != "package":
+                modules.add(name.split(".")[0])
+    return sorted(modules)
+
+
+def time_command(args: List[str], runs: int) -> Dict[str, float]:
+    """Time repeated cold starts of a CLI invocation
+
+    Args:
+        args: Command-line arguments for main.py
+        runs: Number of runs
+
+    Returns:
+        Dictionary with the median, minimum and maximum wall time in milliseconds
+    """
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT_DIR, "main.py"), *args],
+            cwd=ROOT_DIR, env=get_env(), capture_output=True, check=True,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+    }
+
+
+def main() -> int:
+    """Run the benchmark and enforce the startup budget
+
+    Returns:
+        Exit code (1 if a budget or import check failed)
+    """
+    parser = argparse.ArgumentParser(description="CLI cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per command")
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="Maximum median wall time per command")
+    args = parser.parse_args()
+
+    results: Dict[str, Any] = {"budget_ms": args.budget_ms, "commands": {}}
+    failed = False
+    for name, command in COMMANDS.items():
+        heavy = [module for module in get_imported_modules(command) if module in FORBIDDEN_MODULES]
+        timing = time_command(command, args.runs)
+        ok = not heavy and timing["median_ms"] <= args.budget_ms
+        failed = failed or not ok
+        results["commands"][name] = {**timing, "heavy_imports": heavy, "ok": ok}
+
+    print(json.dumps(results, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
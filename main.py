@@ -3,17 +3,22 @@
 
 import os
 import argparse
-from typing import Dict, List, Any
+from typing import Dict, List, Optional, Callable, Tuple, TYPE_CHECKING
 
-from leadgen.pipeline.lead_gen_pipeline import LeadGenPipeline
-from leadgen.utils.helpers import format_questions_for_display
+if TYPE_CHECKING:
+    # Imported lazily: the pipeline pulls in yaml, httpx and pydantic, which
+    # --version, --help and the index queries never need
+    from leadgen.pipeline.lead_gen_pipeline import LeadGenPipeline
 
 
-def get_user_answers(questions: List[str]) -> Dict[str, str]:
+def get_user_answers(questions: List[str], before_last_answer: Optional[Callable[[], None]] = None,
+                     on_answer: Optional[Callable[[Dict[str, str]], None]] = None) -> Dict[str, str]:
     """Get answers from the user for a list of questions
     
     Args:
         questions: List of questions to ask
+        before_last_answer: Optional callback run just before the last question is asked
+        on_answer: Optional callback run with the answers so far after each answer
         
     Returns:
         Dictionary mapping questions to answers
@@ -22,15 +27,19 @@ def get_user_answers(questions: List[str]) -> Dict[str, str]:
     print("\nPlease answer the following questions:\n")
     
     for i, question in enumerate(questions):
+        if before_last_answer and i == len(questions) - 1:
+            before_last_answer()
         print(f"Question {i+1}: {question}")
         answer = input("Your answer: ")
         answers[question] = answer
+        if on_answer:
+            on_answer(answers)
         print()  # Add a blank line for readability
     
     return answers
 
 
-def run_default_questions_stage(pipeline: LeadGenPipeline) -> None:
+def run_default_questions_stage(pipeline: "LeadGenPipeline") -> None:
     """Run the default questions stage
     
     Args:
@@ -38,12 +47,15 @@ def run_default_questions_stage(pipeline: LeadGenPipeline) -> None:
     """
     print("\n=== Default Questions Stage ===")
     questions = pipeline.run_default_questions_stage()
-    answers = get_user_answers(questions)
+    # Warm up the LLM connection while the user types the last answer, and start
+    # generating personalized questions once enough answers are in
+    answers = get_user_answers(questions, before_last_answer=pipeline.prewarm_connection,
+                               on_answer=pipeline.observe_default_answers)
     pipeline.process_default_answers(answers)
     print("Default questions stage completed.")
 
 
-def run_personalized_questions_stage(pipeline: LeadGenPipeline) -> None:
+def run_personalized_questions_stage(pipeline: "LeadGenPipeline") -> None:
     """Run the personalized questions stage
     
     Args:
@@ -52,12 +64,33 @@ def run_personalized_questions_stage(pipeline: LeadGenPipeline) -> None:
     print("\n=== Personalized Questions Stage ===")
     print("Generating personalized questions based on your initial answers...")
     questions = pipeline.run_personalized_questions_stage()
-    answers = get_user_answers(questions)
+    reuse = pipeline.last_question_reuse
+    speculation = pipeline.last_speculation
+    if reuse and reuse["hit"]:
+        print(f"(Reused from a session with near-identical answers; similarity {reuse['similarity']:.2f})")
+    elif speculation and speculation["hit"]:
+        print(f"(Prepared while you were answering; saved {speculation['saved_seconds']:.1f}s)")
+    # Draft keywords in the background as the answers come in
+    answers = get_user_answers(questions, before_last_answer=pipeline.prewarm_connection,
+                               on_answer=pipeline.observe_personalized_answers)
     pipeline.process_personalized_answers(answers)
     print("Personalized questions stage completed.")
 
 
-def run_keyword_generation_stage(pipeline: LeadGenPipeline) -> None:
+def print_keywords(pipeline: "LeadGenPipeline") -> None:
+    """Print the session's keywords with their type and relevance score
+    
+    Args:
+        pipeline: The lead generation pipeline
+    """
+    for i, keyword in enumerate(pipeline.session.keywords):
+        details = ""
+        if keyword.relevance_score is not None:
+            details = f" ({keyword.type}, relevance {keyword.relevance_score:.2f})"
+        print(f"{i+1}. {keyword.text}{details}")
+
+
+def run_keyword_generation_stage(pipeline: "LeadGenPipeline") -> None:
     """Run the keyword generation stage
     
     Args:
@@ -65,16 +98,18 @@ def run_keyword_generation_stage(pipeline: LeadGenPipeline) -> None:
     """
     print("\n=== Keyword Generation Stage ===")
     print("Generating keywords based on your answers...")
-    keywords = pipeline.run_keyword_generation_stage()
+    pipeline.run_keyword_generation_stage()
+    draft = pipeline.last_keyword_draft
+    if draft and draft["used"] != "none":
+        print(f"(Drafted while you were answering; saved {draft['saved_seconds']:.1f}s)")
     
     print("\nGenerated Keywords:")
-    for i, keyword in enumerate(keywords):
-        print(f"{i+1}. {keyword}")
+    print_keywords(pipeline)
     
     print("\nKeyword generation stage completed.")
 
 
-def run_icp_generation_stage(pipeline: LeadGenPipeline) -> None:
+def run_icp_generation_stage(pipeline: "LeadGenPipeline") -> None:
     """Run the ICP generation stage
     
     Args:
@@ -82,35 +117,230 @@ def run_icp_generation_stage(pipeline: LeadGenPipeline) -> None:
     """
     print("\n=== Ideal Customer Profile Generation Stage ===")
     print("Generating Ideal Customer Profile based on all collected data...")
-    icp_data = pipeline.run_icp_generation_stage()
     
     print("\nIdeal Customer Profile:")
-    print(icp_data.get("profile", "No profile generated"))
+    for delta in pipeline.run_icp_generation_stage_stream():
+        print(delta, end="", flush=True)
+    print()
     
     print("\nICP generation stage completed.")
 
 
-def run_full_pipeline() -> None:
-    """Run the full lead generation pipeline"""
-    # Check if GROQ_API_KEY is set
+def check_api_key() -> bool:
+    """Check that GROQ_API_KEY is set, printing instructions if it is not
+    
+    The key is not needed when llm.provider is "mock".
+    
+    Returns:
+        True if the API key is set or not needed
+    """
+    from leadgen.services.registry import get_registry
+    
+    if get_registry().config_loader.get_config().get("llm", {}).get("provider") == "mock":
+        return True
     if not os.getenv("GROQ_API_KEY"):
         print("Error: GROQ_API_KEY environment variable is not set.")
         print("Please set it before running the application.")
         print("Example: export GROQ_API_KEY='your-api-key'")
+        return False
+    return True
+
+
+def run_batch(input_path: str, output_path: Optional[str], concurrency: Optional[int]) -> None:
+    """Run the generation stages headlessly for a JSONL file of questionnaires
+    
+    Args:
+        input_path: Path to the input JSONL file
+        output_path: Path to the output JSONL file (defaults to batch.output_path)
+        concurrency: Maximum number of sessions in flight (defaults to batch.concurrency)
+    """
+    if not check_api_key():
+        return
+    
+    from leadgen.pipeline.batch_pipeline import BatchRunner
+    from leadgen.services.registry import get_registry
+    from leadgen.utils.async_helpers import run_sync
+    
+    if output_path is None:
+        config = get_registry().config_loader.get_config()
+        output_path = config.get("batch", {}).get("output_path", "./data/batch_results.jsonl")
+    
+    runner = BatchRunner(input_path, output_path, concurrency=concurrency)
+    print("\n=== Batch Mode ===")
+    print(f"Processing {input_path} with concurrency {runner.concurrency}...")
+    stats = run_sync(runner.run())
+    
+    print(f"\nResults written to: {output_path}")
+    print(f"Completed: {stats['completed']}")
+    print(f"Failed: {stats['failed']}")
+    print(f"Skipped (already done): {stats['skipped']}")
+    print(f"Elapsed: {stats['elapsed_seconds']}s")
+    print(f"Throughput: {stats['sessions_per_minute']} sessions/minute")
+
+
+def run_keyword_query(args: argparse.Namespace) -> None:
+    """Answer a query against the cross-session keyword index
+    
+    Args:
+        args: Parsed command-line arguments
+    """
+    from leadgen.services.registry import get_registry
+    
+    index = get_registry().keyword_index
+    if index is None:
+        print("Error: the keyword index is disabled (keyword_index.enabled in config.yaml).")
+        return
+    
+    if args.search_keyword:
+        if args.search_keyword.endswith("*"):
+            for entry in index.prefix_search(args.search_keyword[:-1], limit=args.limit):
+                print(f"{entry['keyword']} ({entry['sessions']} sessions)")
+        else:
+            for session_id in index.find_sessions(args.search_keyword, limit=args.limit):
+                print(session_id)
+    elif args.search_icp:
+        for session_id in index.search_icp(args.search_icp, limit=args.limit):
+            print(session_id)
+    else:
+        for i, entry in enumerate(index.top_keywords(args.top_keywords, month=args.month)):
+            print(f"{i+1}. {entry['keyword']} ({entry['sessions']} sessions)")
+
+
+def show_output_budgets() -> None:
+    """Print the observed output lengths per agent and the proposed max_tokens caps"""
+    from leadgen.services.registry import get_registry
+    
+    tuner = get_registry().output_budgets
+    if tuner is None:
+        print("Error: output budget tuning is disabled (agent_params.auto_tune.enabled in params.yaml).")
+        return
+    
+    proposals = tuner.propose()
+    if not proposals:
+        print("No output lengths recorded yet.")
+        return
+    
+    for agent, proposal in proposals.items():
+        stats = ", ".join(f"{key}={value}" for key, value in proposal.items() if not key.endswith("max_tokens"))
+        print(f"{agent}: {stats}")
+        print(f"  max_tokens: {proposal['current_max_tokens']} -> {proposal['proposed_max_tokens'] or 'not enough samples'}")
+    
+    print("\nSuggested agent_params.agents overrides for params.yaml:")
+    for agent, proposal in proposals.items():
+        if proposal["proposed_max_tokens"] is not None:
+            print(f"    {agent}:\n      max_tokens: {proposal['proposed_max_tokens']}")
+
+
+def compile_config() -> None:
+    """Validate the configuration files and write the precompiled snapshot"""
+    from pydantic import ValidationError
+    from leadgen.config.config_loader import ConfigLoader
+    
+    loader = ConfigLoader()
+    try:
+        path = loader.compile_snapshot()
+    except ValidationError as e:
+        print(f"Error: invalid configuration in {loader.config_dir}:\n{e}")
+        return
+    print(f"Configuration in {loader.config_dir} is valid; snapshot written to {path}")
+
+
+def run_server(host: Optional[str], port: Optional[int]) -> None:
+    """Serve the pipeline stages over HTTP with uvicorn
+    
+    Args:
+        host: Interface to bind (defaults to service.host)
+        port: Port to listen on (defaults to service.port)
+    """
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: service mode needs uvicorn (pip install uvicorn, or pip install -e .[server]).")
+        return
+    
+    if not check_api_key():
+        return
+    
+    from leadgen.api.asgi import create_app
+    from leadgen.services.registry import get_registry
+    
+    service_config = get_registry().config_loader.get_config().get("service", {})
+    uvicorn.run(create_app(), host=host or service_config.get("host", "127.0.0.1"),
+                port=port or service_config.get("port", 8000))
+
+
+def run_fused_generation_stage(pipeline: "LeadGenPipeline") -> None:
+    """Run the fused keyword and ICP generation stage
+    
+    Args:
+        pipeline: The lead generation pipeline
+    """
+    print("\n=== Keyword and Ideal Customer Profile Generation Stage ===")
+    print("Generating keywords and Ideal Customer Profile based on all collected data...")
+    result = pipeline.run_fused_generation_stage()
+    
+    print("\nGenerated Keywords:")
+    print_keywords(pipeline)
+    
+    print("\nIdeal Customer Profile:")
+    print(result.get("profile") or "No profile summary generated")
+    
+    print("\nKeyword and ICP generation stage completed.")
+
+
+def get_stages(pipeline: "LeadGenPipeline") -> List[Tuple[str, Callable[["LeadGenPipeline"], None]]]:
+    """Get the CLI stages in order, keyed by the pipeline's stage names
+    
+    Args:
+        pipeline: The lead generation pipeline
+        
+    Returns:
+        List of (stage name, stage runner) pairs
+    """
+    stages = [
+        ("default_questions", run_default_questions_stage),
+        ("personalized_questions", run_personalized_questions_stage),
+    ]
+    if pipeline.fused_generation:
+        # Fills keywords and the ICP together, so the ICP stage is then already complete
+        stages.append(("keyword_generation", run_fused_generation_stage))
+    else:
+        stages.append(("keyword_generation", run_keyword_generation_stage))
+    stages.append(("icp_generation", run_icp_generation_stage))
+    return stages
+
+
+def run_full_pipeline(resume_session_id: Optional[str] = None) -> None:
+    """Run the full lead generation pipeline
+    
+    Args:
+        resume_session_id: ID of a stored session to continue from its first incomplete stage
+    """
+    # Check if GROQ_API_KEY is set
+    if not check_api_key():
         return
     
     print("\n=== Lead Generation Pipeline ===")
     print("This application will guide you through a multi-step process to generate an Ideal Customer Profile.")
     
+    from leadgen.pipeline.lead_gen_pipeline import LeadGenPipeline
+    
     # Initialize the pipeline
-    pipeline = LeadGenPipeline()
+    if resume_session_id:
+        try:
+            pipeline = LeadGenPipeline.resume(resume_session_id)
+        except KeyError:
+            print(f"\nError: no stored session with ID {resume_session_id}")
+            return
+        print(f"\nResuming session {resume_session_id}.")
+    else:
+        pipeline = LeadGenPipeline()
     
     try:
-        # Run each stage
-        run_default_questions_stage(pipeline)
-        run_personalized_questions_stage(pipeline)
-        run_keyword_generation_stage(pipeline)
-        run_icp_generation_stage(pipeline)
+        # Run each stage, skipping the ones a resumed session already completed
+        for stage_name, run_stage in get_stages(pipeline):
+            if pipeline.next_stage() == stage_name:
+                run_stage(pipeline)
         
         # Save the session
         session_file = pipeline.save_session()
@@ -128,17 +358,35 @@ def run_full_pipeline() -> None:
         
         print("\nThank you for using the Lead Generation application!")
     
-    except Exception as e:
-        print(f"\nError: {str(e)}")
+    except (Exception, KeyboardInterrupt) as e:
+        print(f"\nError: {str(e) or type(e).__name__}")
         print("The pipeline was interrupted. Saving current progress...")
         session_file = pipeline.save_session()
         print(f"Session data saved to: {session_file}")
+        print(f"Resume with: python main.py --resume {pipeline.session.id}")
 
 
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Lead Generation Application")
     parser.add_argument("--version", action="store_true", help="Show version information")
+    parser.add_argument("--batch", metavar="INPUT_JSONL", help="Process pre-answered questionnaires from a JSONL file")
+    parser.add_argument("--output", metavar="OUTPUT_JSONL", help="Output JSONL file for --batch")
+    parser.add_argument("--concurrency", type=int, help="Maximum concurrent sessions for --batch")
+    parser.add_argument("--resume", metavar="SESSION_ID", help="Continue a stored session from its first incomplete stage")
+    parser.add_argument("--search-keyword", metavar="KEYWORD",
+                        help="List sessions that targeted a keyword (end with * for a prefix search)")
+    parser.add_argument("--search-icp", metavar="TEXT", help="List sessions whose ICP mentions every word of TEXT")
+    parser.add_argument("--top-keywords", type=int, metavar="K", help="Show the K most frequent keywords")
+    parser.add_argument("--month", metavar="YYYY-MM", help="Restrict --top-keywords to one month")
+    parser.add_argument("--limit", type=int, default=100, help="Maximum number of query results")
+    parser.add_argument("--output-budgets", action="store_true",
+                        help="Show observed output lengths per agent and proposed max_tokens caps")
+    parser.add_argument("--serve", action="store_true", help="Serve the pipeline stages over HTTP (needs uvicorn)")
+    parser.add_argument("--host", help="Interface for --serve (defaults to service.host)")
+    parser.add_argument("--port", type=int, help="Port for --serve (defaults to service.port)")
+    parser.add_argument("--compile-config", action="store_true",
+                        help="Validate the YAML configuration and write a snapshot that loads faster")
     
     args = parser.parse_args()
     
@@ -147,7 +395,27 @@ def main():
         print(f"Lead Generation Application v{__version__}")
         return
     
-    run_full_pipeline()
+    if args.batch:
+        run_batch(args.batch, args.output, args.concurrency)
+        return
+    
+    if args.search_keyword or args.search_icp or args.top_keywords:
+        run_keyword_query(args)
+        return
+    
+    if args.output_budgets:
+        show_output_budgets()
+        return
+    
+    if args.compile_config:
+        compile_config()
+        return
+    
+    if args.serve:
+        run_server(args.host, args.port)
+        return
+    
+    run_full_pipeline(args.resume)
 
 
 if __name__ == "__main__":
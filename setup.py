@@ -31,8 +31,13 @@ setup(
         "pydantic>=2.0.0",
         "pydantic-ai>=0.1.0",
         "pyyaml>=6.0",
-        "httpx>=0.24.0",
+        "httpx[http2]>=0.24.0",
+        "numpy>=1.22.0",
     ],
+    extras_require={
+        # HTTP service mode (python main.py --serve)
+        "server": ["uvicorn>=0.23.0"],
+    },
     entry_points={
         "console_scripts": [
             "leadgen=leadgen.main:main",
@@ -1,13 +1,14 @@
 # Question generation agents for the leadgen application
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from pydantic import BaseModel
 
-from pydantic_ai import Agent
-
 from leadgen.services.llm_service import LLMService
+from leadgen.services.registry import get_registry
 from leadgen.config.config_loader import ConfigLoader
-from leadgen.utils.helpers import format_qa_for_prompt, extract_keywords_from_text
+from leadgen.entity.models import IdealCustomerProfile
+from leadgen.utils.async_helpers import run_sync
+from leadgen.utils.helpers import format_qa_for_prompt, format_all_qa_for_prompt
 
 
 class QuestionList(BaseModel):
@@ -20,13 +21,24 @@ class KeywordList(BaseModel):
     keywords: List[str]
 
 
+class KeywordsAndProfile(BaseModel):
+    """Model for keywords and a structured ICP generated in one call"""
+    keywords: List[str]
+    profile: IdealCustomerProfile
+
+
 class DefaultQuestionsAgent:
     """Agent for handling the default questions stage"""
     
-    def __init__(self):
-        """Initialize the default questions agent"""
-        self.config_loader = ConfigLoader()
-        self.llm_service = LLMService()
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, llm_service: Optional[LLMService] = None):
+        """Initialize the default questions agent
+        
+        Args:
+            config_loader: Shared config loader (defaults to the process-wide one)
+            llm_service: Shared LLM service (defaults to the process-wide one)
+        """
+        self.config_loader = config_loader or get_registry().config_loader
+        self.llm_service = llm_service or get_registry().llm_service
         self.system_prompt = self.config_loader.get_system_prompt("default_questions_agent")
         self.default_questions = self.config_loader.get_default_questions()
     
@@ -55,13 +67,19 @@ class DefaultQuestionsAgent:
 class PersonalizedQuestionsAgent:
     """Agent for generating personalized questions based on initial answers"""
     
-    def __init__(self):
-        """Initialize the personalized questions agent"""
-        self.config_loader = ConfigLoader()
-        self.llm_service = LLMService()
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, llm_service: Optional[LLMService] = None):
+        """Initialize the personalized questions agent
+        
+        Args:
+            config_loader: Shared config loader (defaults to the process-wide one)
+            llm_service: Shared LLM service (defaults to the process-wide one)
+        """
+        self.config_loader = config_loader or get_registry().config_loader
+        self.llm_service = llm_service or get_registry().llm_service
         self.system_prompt = self.config_loader.get_system_prompt("personalized_questions_agent")
+        self.model_settings = self.config_loader.get_model_settings("personalized_questions_agent")
         
-    def generate_questions(self, initial_qa: Dict[str, str], num_questions: int = 10) -> List[str]:
+    async def generate_questions_async(self, initial_qa: Dict[str, str], num_questions: int = 10) -> List[str]:
         """Generate personalized questions based on initial answers
         
         Args:
@@ -71,12 +89,6 @@ class PersonalizedQuestionsAgent:
         Returns:
             List of generated questions
         """
-        # Create an agent with the appropriate system prompt and output type
-        agent = self.llm_service.create_agent(
-            system_prompt=self.system_prompt,
-            output_type=QuestionList
-        )
-        
         # Format the initial Q&A for the prompt
         formatted_qa = format_qa_for_prompt(initial_qa)
         
@@ -84,10 +96,20 @@ class PersonalizedQuestionsAgent:
         prompt = f"Based on the following information, generate {num_questions} personalized questions to gather deeper insights:\n\n{formatted_qa}"
         
         # Run the agent
-        result = agent.run_sync(prompt)
+        output = await self.llm_service.run_async(
+            system_prompt=self.system_prompt,
+            prompt=prompt,
+            output_type=QuestionList,
+            model_settings=self.model_settings,
+            name="personalized_questions_agent"
+        )
         
         # Return the generated questions
-        return result.output.questions
+        return output.questions
+    
+    def generate_questions(self, initial_qa: Dict[str, str], num_questions: int = 10) -> List[str]:
+        """Synchronous wrapper around generate_questions_async"""
+        return run_sync(self.generate_questions_async(initial_qa, num_questions))
     
     def process_answers(self, questions_and_answers: Dict[str, str]) -> Dict[str, str]:
         """Process the answers to the personalized questions
@@ -105,82 +127,222 @@ class PersonalizedQuestionsAgent:
 class KeywordGenerationAgent:
     """Agent for generating keywords based on questions and answers"""
     
-    def __init__(self):
-        """Initialize the keyword generation agent"""
-        self.config_loader = ConfigLoader()
-        self.llm_service = LLMService()
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, llm_service: Optional[LLMService] = None):
+        """Initialize the keyword generation agent
+        
+        Args:
+            config_loader: Shared config loader (defaults to the process-wide one)
+            llm_service: Shared LLM service (defaults to the process-wide one)
+        """
+        self.config_loader = config_loader or get_registry().config_loader
+        self.llm_service = llm_service or get_registry().llm_service
         self.system_prompt = self.config_loader.get_system_prompt("keyword_generation_agent")
+        self.model_settings = self.config_loader.get_model_settings("keyword_generation_agent")
     
-    def generate_keywords(self, all_qa_data: Dict[str, Dict[str, str]], num_keywords: int = 10) -> List[str]:
+    async def generate_keywords_async(self, all_qa_data: Dict[str, Dict[str, str]], num_keywords: int = 10,
+                                      formatted_qa: Optional[str] = None) -> List[str]:
         """Generate keywords based on all questions and answers
         
         Args:
             all_qa_data: Dictionary mapping stage names to Q&A dictionaries
             num_keywords: Number of keywords to generate
+            formatted_qa: Pre-built (e.g. compacted) Q&A text to use instead of formatting all_qa_data
             
         Returns:
             List of generated keywords
         """
-        # Create an agent with the appropriate system prompt and output type
-        agent = self.llm_service.create_agent(
-            system_prompt=self.system_prompt,
-            output_type=KeywordList
-        )
-        
         # Format all Q&A data for the prompt
-        formatted_data = ""
-        for stage, qa_dict in all_qa_data.items():
-            formatted_data += f"\n\n--- {stage} ---\n"
-            formatted_data += format_qa_for_prompt(qa_dict)
+        formatted_data = formatted_qa if formatted_qa is not None else format_all_qa_for_prompt(all_qa_data)
         
         # Generate the prompt
         prompt = f"Based on the following questions and answers, generate {num_keywords} relevant keywords for lead generation:\n\n{formatted_data}"
         
         # Run the agent
-        result = agent.run_sync(prompt)
+        output = await self.llm_service.run_async(
+            system_prompt=self.system_prompt,
+            prompt=prompt,
+            output_type=KeywordList,
+            model_settings=self.model_settings,
+            name="keyword_generation_agent"
+        )
         
         # Return the generated keywords
-        return result.output.keywords
+        return output.keywords
+    
+    def generate_keywords(self, all_qa_data: Dict[str, Dict[str, str]], num_keywords: int = 10,
+                          formatted_qa: Optional[str] = None) -> List[str]:
+        """Synchronous wrapper around generate_keywords_async"""
+        return run_sync(self.generate_keywords_async(all_qa_data, num_keywords, formatted_qa))
+    
+    async def refine_keywords_async(self, draft_keywords: List[str], new_qa: Dict[str, str],
+                                    num_keywords: int = 10) -> List[str]:
+        """Update a draft keyword list with answers the draft did not see
+        
+        Only the draft and the new answers are sent, so this is much cheaper
+        than generating the keywords from the full Q&A again.
+        
+        Args:
+            draft_keywords: Keywords generated from an earlier subset of the answers
+            new_qa: Dictionary mapping the new or changed questions to their answers
+            num_keywords: Number of keywords to return
+            
+        Returns:
+            List of final keywords
+        """
+        formatted_keywords = "\n".join(f"- {keyword}" for keyword in draft_keywords)
+        formatted_qa = format_all_qa_for_prompt({"Additional Answers": new_qa})
+        prompt = (
+            f"These keywords were generated from part of a business questionnaire:\n{formatted_keywords}\n\n"
+            f"Revise them using the following additional answers, keeping the keywords that still fit, "
+            f"and return {num_keywords} relevant keywords for lead generation:\n\n{formatted_qa}"
+        )
+        
+        output = await self.llm_service.run_async(
+            system_prompt=self.system_prompt,
+            prompt=prompt,
+            output_type=KeywordList,
+            model_settings=self.model_settings,
+            name="keyword_generation_agent"
+        )
+        return output.keywords
+    
+    def refine_keywords(self, draft_keywords: List[str], new_qa: Dict[str, str],
+                        num_keywords: int = 10) -> List[str]:
+        """Synchronous wrapper around refine_keywords_async"""
+        return run_sync(self.refine_keywords_async(draft_keywords, new_qa, num_keywords))
 
 
 class ICPGenerationAgent:
     """Agent for generating an Ideal Customer Profile based on all data"""
     
-    def __init__(self):
-        """Initialize the ICP generation agent"""
-        self.config_loader = ConfigLoader()
-        self.llm_service = LLMService()
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, llm_service: Optional[LLMService] = None):
+        """Initialize the ICP generation agent
+        
+        Args:
+            config_loader: Shared config loader (defaults to the process-wide one)
+            llm_service: Shared LLM service (defaults to the process-wide one)
+        """
+        self.config_loader = config_loader or get_registry().config_loader
+        self.llm_service = llm_service or get_registry().llm_service
         self.system_prompt = self.config_loader.get_system_prompt("icp_generation_agent")
+        self.model_settings = self.config_loader.get_model_settings("icp_generation_agent")
     
-    def generate_icp(self, all_qa_data: Dict[str, Dict[str, str]], keywords: List[str]) -> Dict[str, Any]:
-        """Generate an Ideal Customer Profile based on all data
+    def build_prompt(self, all_qa_data: Dict[str, Dict[str, str]], keywords: List[str],
+                     formatted_qa: Optional[str] = None) -> str:
+        """Build the ICP generation prompt
         
         Args:
             all_qa_data: Dictionary mapping stage names to Q&A dictionaries
             keywords: List of generated keywords
+            formatted_qa: Pre-built (e.g. compacted) Q&A text to use instead of formatting all_qa_data
             
         Returns:
-            Dictionary containing the Ideal Customer Profile
+            The user prompt for the ICP agent
         """
-        # Create an agent with the appropriate system prompt
-        agent = self.llm_service.create_agent(system_prompt=self.system_prompt)
-        
         # Format all Q&A data for the prompt
-        formatted_data = ""
-        for stage, qa_dict in all_qa_data.items():
-            formatted_data += f"\n\n--- {stage} ---\n"
-            formatted_data += format_qa_for_prompt(qa_dict)
+        formatted_data = formatted_qa if formatted_qa is not None else format_all_qa_for_prompt(all_qa_data)
         
         # Add keywords to the prompt
         formatted_keywords = ", ".join(keywords)
         formatted_data += f"\n\n--- Keywords ---\n{formatted_keywords}"
         
         # Generate the prompt
-        prompt = f"Based on all the following information, generate a detailed ideal customer profile:\n\n{formatted_data}"
+        return f"Based on all the following information, generate a detailed ideal customer profile:\n\n{formatted_data}"
+    
+    async def generate_icp_async(self, all_qa_data: Dict[str, Dict[str, str]], keywords: List[str],
+                                 formatted_qa: Optional[str] = None) -> Dict[str, Any]:
+        """Generate an Ideal Customer Profile based on all data
+        
+        Args:
+            all_qa_data: Dictionary mapping stage names to Q&A dictionaries
+            keywords: List of generated keywords
+            formatted_qa: Pre-built (e.g. compacted) Q&A text to use instead of formatting all_qa_data
+            
+        Returns:
+            Dictionary containing the Ideal Customer Profile
+        """
+        prompt = self.build_prompt(all_qa_data, keywords, formatted_qa)
         
         # Run the agent
-        result = agent.run_sync(prompt)
+        output = await self.llm_service.run_async(
+            system_prompt=self.system_prompt, prompt=prompt, model_settings=self.model_settings,
+            name="icp_generation_agent"
+        )
         
         # Return the generated ICP
         # Note: In a real implementation, you might want to parse this into a structured format
-        return {"profile": result.output}
\ No newline at end of file
+        return {"profile": output}
+    
+    def generate_icp(self, all_qa_data: Dict[str, Dict[str, str]], keywords: List[str],
+                     formatted_qa: Optional[str] = None) -> Dict[str, Any]:
+        """Synchronous wrapper around generate_icp_async"""
+        return run_sync(self.generate_icp_async(all_qa_data, keywords, formatted_qa))
+    
+    def generate_icp_stream(self, all_qa_data: Dict[str, Dict[str, str]], keywords: List[str],
+                            formatted_qa: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream an Ideal Customer Profile as text deltas
+        
+        Args:
+            all_qa_data: Dictionary mapping stage names to Q&A dictionaries
+            keywords: List of generated keywords
+            formatted_qa: Pre-built (e.g. compacted) Q&A text to use instead of formatting all_qa_data
+            
+        Returns:
+            Async iterator of text deltas; joined, they form the full profile
+        """
+        prompt = self.build_prompt(all_qa_data, keywords, formatted_qa)
+        return self.llm_service.run_stream_async(
+            system_prompt=self.system_prompt, prompt=prompt, model_settings=self.model_settings,
+            name="icp_generation_agent"
+        )
+
+
+class FusedKeywordICPAgent:
+    """Agent for generating keywords and a structured Ideal Customer Profile in a single call"""
+    
+    def __init__(self, config_loader: Optional[ConfigLoader] = None, llm_service: Optional[LLMService] = None):
+        """Initialize the fused keyword and ICP agent
+        
+        Args:
+            config_loader: Shared config loader (defaults to the process-wide one)
+            llm_service: Shared LLM service (defaults to the process-wide one)
+        """
+        self.config_loader = config_loader or get_registry().config_loader
+        self.llm_service = llm_service or get_registry().llm_service
+        self.system_prompt = self.config_loader.get_system_prompt("fused_keyword_icp_agent")
+        self.model_settings = self.config_loader.get_model_settings("fused_keyword_icp_agent")
+    
+    async def generate_async(self, all_qa_data: Dict[str, Dict[str, str]], num_keywords: int = 10,
+                             formatted_qa: Optional[str] = None) -> KeywordsAndProfile:
+        """Generate keywords and an Ideal Customer Profile based on all data
+        
+        Args:
+            all_qa_data: Dictionary mapping stage names to Q&A dictionaries
+            num_keywords: Number of keywords to generate
+            formatted_qa: Pre-built (e.g. compacted) Q&A text to use instead of formatting all_qa_data
+            
+        Returns:
+            The generated keywords and structured profile
+        """
+        # Format all Q&A data for the prompt
+        formatted_data = formatted_qa if formatted_qa is not None else format_all_qa_for_prompt(all_qa_data)
+        
+        # Generate the prompt
+        prompt = (
+            f"Based on the following questions and answers, generate {num_keywords} relevant keywords "
+            f"for lead generation and a detailed ideal customer profile:\n\n{formatted_data}"
+        )
+        
+        # Run the agent
+        return await self.llm_service.run_async(
+            system_prompt=self.system_prompt,
+            prompt=prompt,
+            output_type=KeywordsAndProfile,
+            model_settings=self.model_settings,
+            name="fused_keyword_icp_agent"
+        )
+    
+    def generate(self, all_qa_data: Dict[str, Dict[str, str]], num_keywords: int = 10,
+                 formatted_qa: Optional[str] = None) -> KeywordsAndProfile:
+        """Synchronous wrapper around generate_async"""
+        return run_sync(self.generate_async(all_qa_data, num_keywords, formatted_qa))
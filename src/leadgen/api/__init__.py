@@ -0,0 +1 @@
+# API module initialization
\ No newline at end of file
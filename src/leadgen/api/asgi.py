@@ -0,0 +1,550 @@
+# ASGI service exposing the pipeline stages over HTTP, with many concurrent sessions per process
+
+import re
+import json
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, Optional, Callable, Awaitable, AsyncIterator, Tuple, TypeVar
+
+from leadgen.pipeline.batch_pipeline import match_answers
+from leadgen.pipeline.lead_gen_pipeline import AsyncLeadGenPipeline, StageOrderError
+from leadgen.pipeline.session_manager import SessionManager
+from leadgen.services.registry import ServiceRegistry, get_registry
+from leadgen.utils.async_helpers import submit
+from leadgen.utils.helpers import generate_id, is_valid_session_id
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+# (method, template, compiled pattern, handler)
+Route = Tuple[str, str, "re.Pattern[str]", Callable[..., Awaitable[Any]]]
+
+
+class HTTPError(Exception):
+    """An error returned to the client with a status code"""
+
+    def __init__(self, status: int, message: str):
+        """Initialize the error
+
+        Args:
+            status: HTTP status code
+            message: Error message for the response body
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+async def on_pipeline_loop(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the shared background loop and wait for it from the server's loop
+
+    Every pipeline call runs on the background loop, like the CLI and batch mode,
+    so the LLM service's HTTP pool, scheduler and speculative tasks stay on one
+    loop whatever server runs the app.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    return await asyncio.wrap_future(submit(coro))
+
+
+async def _call(function: Callable[..., T], *args: Any) -> T:
+    """Call a synchronous pipeline method (used to run it on the background loop)"""
+    return function(*args)
+
+
+class LeadGenApp:
+    """ASGI application serving the questionnaire to many users from one process
+
+    Sessions are keyed by QuestionSession.id and held by a SessionManager:
+    recently used sessions keep their AsyncLeadGenPipeline between requests,
+    idle ones are compressed and, beyond the memory budget, evicted to storage
+    and brought back on their next request. Calls for the same session are
+    serialized; different sessions run concurrently.
+
+    Routes (request and response bodies are JSON):
+
+        GET  /questions/default                   default questions
+        POST /sessions                            start a session ({"session_id", "tenant_id"}, both optional)
+        GET  /sessions/{id}                       session state and next stage
+        POST /sessions/{id}/default-answers       {"answers": {...} or [...], "partial": false}
+        POST /sessions/{id}/personalized-questions
+        POST /sessions/{id}/personalized-answers  {"answers": {...} or [...], "partial": false}
+        POST /sessions/{id}/keywords
+        POST /sessions/{id}/icp
+        GET  /sessions/{id}/icp/stream            ICP deltas as server-sent events
+        GET  /metrics                             Prometheus text format
+        GET  /healthz
+
+    With "partial": true, answers are only observed (starting speculative
+    generation) and the stage stays open. Final answers given as a list are
+    matched to the questions by position.
+    """
+
+    def __init__(self, registry: Optional[ServiceRegistry] = None, max_body_bytes: int = 1 << 20,
+                 sessions: Optional[SessionManager] = None):
+        """Initialize the application
+
+        Args:
+            registry: Service registry to take shared services from
+                (defaults to the process-wide registry)
+            max_body_bytes: Largest request body accepted
+            sessions: Session manager holding the sessions in memory
+                (defaults to one with the default limits)
+        """
+        self.registry = registry or get_registry()
+        self.max_body_bytes = max_body_bytes
+        self.sessions = sessions if sessions is not None else SessionManager(self.registry)
+        # Per-session locks with the number of requests holding or waiting for them
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._requests: Dict[Tuple[str, int], int] = {}
+        self._stats_lock = threading.Lock()
+        self._routes = [
+            self._route("GET", "/healthz", self.health),
+            self._route("GET", "/metrics", self.metrics),
+            self._route("GET", "/questions/default", self.default_questions),
+            self._route("POST", "/sessions", self.create_session),
+            self._route("GET", "/sessions/{session_id}", self.get_session),
+            self._route("POST", "/sessions/{session_id}/default-answers", self.default_answers),
+            self._route("POST", "/sessions/{session_id}/personalized-questions", self.personalized_questions),
+            self._route("POST", "/sessions/{session_id}/personalized-answers", self.personalized_answers),
+            self._route("POST", "/sessions/{session_id}/keywords", self.keywords),
+            self._route("POST", "/sessions/{session_id}/icp", self.icp),
+            self._route("GET", "/sessions/{session_id}/icp/stream", self.icp_stream),
+        ]
+
+    @staticmethod
+    def _route(method: str, template: str, handler: Callable[..., Awaitable[Any]]) -> Route:
+        """Compile a route template such as /sessions/{session_id} (parameters match one path segment)"""
+        pattern = re.compile(re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template))
+        return method, template, pattern, handler
+
+    @classmethod
+    def from_config(cls, registry: Optional[ServiceRegistry] = None) -> "LeadGenApp":
+        """Create the application from the service and sessions sections of config.yaml
+
+        Args:
+            registry: Service registry to take shared services from
+
+        Returns:
+            A configured LeadGenApp
+        """
+        registry = registry or get_registry()
+        config = registry.config_loader.get_config()
+        return cls(
+            registry,
+            max_body_bytes=config.get("service", {}).get("max_body_bytes", 1 << 20),
+            sessions=SessionManager.from_config(config.get("sessions", {}), registry)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle an ASGI connection"""
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        route = "unmatched"
+        status = 500
+        try:
+            handler, params, route = self._match(method, path)
+            body = await self._read_json(receive) if method == "POST" else {}
+            result = await handler(body=body, send=send, **params)
+            if result is not None:
+                status, payload = result
+                await self._send_json(send, status, payload)
+            else:
+                # The handler streamed its own response
+                status = 200
+        except HTTPError as e:
+            status = e.status
+            await self._send_json(send, e.status, {"error": e.message})
+        except Exception as e:
+            logger.exception("Request %s %s failed", method, path)
+            await self._send_json(send, 500, {"error": str(e) or type(e).__name__})
+        finally:
+            with self._stats_lock:
+                self._requests[(route, status)] = self._requests.get((route, status), 0) + 1
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        """Handle the ASGI lifespan protocol (saving sessions and flushing metrics on shutdown)"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await on_pipeline_loop(self.sessions.spill_all())
+                if self.registry.instrumentation is not None:
+                    self.registry.instrumentation.export()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _match(self, method: str, path: str) -> Tuple[Callable[..., Awaitable[Any]], Dict[str, str], str]:
+        """Find the handler for a request
+
+        Returns:
+            Tuple of (handler, path parameters, route template)
+
+        Raises:
+            HTTPError: 404 for an unknown path, 405 for a known path with another method
+        """
+        allowed = []
+        for route_method, template, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return handler, match.groupdict(), template
+            allowed.append(route_method)
+        if allowed:
+            raise HTTPError(405, f"Method {method} not allowed; use {', '.join(allowed)}")
+        raise HTTPError(404, f"Not found: {path}")
+
+    async def _read_json(self, receive: Receive) -> Dict[str, Any]:
+        """Read a JSON object request body (an empty body reads as {})
+
+        Raises:
+            HTTPError: 413 if the body is too large, 400 if it is not a JSON object
+        """
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise HTTPError(413, f"Request body exceeds {self.max_body_bytes} bytes")
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        raw = b"".join(chunks)
+        if not raw.strip():
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return body
+
+    @staticmethod
+    async def _send_json(send: Send, status: int, payload: Any) -> None:
+        """Send a complete JSON response"""
+        body = json.dumps(payload, default=str).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @asynccontextmanager
+    async def _session_lock(self, session_id: str) -> AsyncIterator[None]:
+        """Hold a session's lock, so calls for the same session run one at a time"""
+        lock, users = self._locks.get(session_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[session_id]
+            if users > 1:
+                self._locks[session_id] = (lock, users - 1)
+            else:
+                del self._locks[session_id]
+
+    @asynccontextmanager
+    async def _session(self, session_id: str) -> AsyncIterator[AsyncLeadGenPipeline]:
+        """Hold a session's lock and its pipeline for the duration of a request
+
+        The pipeline is acquired from the session manager (which brings it back
+        into memory if it was compacted or evicted) and released afterwards, at
+        which point the manager may compact or evict other idle sessions.
+
+        Yields:
+            The session's pipeline
+
+        Raises:
+            HTTPError: 404 if there is no such session
+        """
+        if not is_valid_session_id(session_id):
+            raise HTTPError(404, f"No session with ID {session_id}")
+        async with self._session_lock(session_id):
+            try:
+                pipeline = await on_pipeline_loop(self.sessions.acquire(session_id))
+            except KeyError:
+                raise HTTPError(404, f"No session with ID {session_id}")
+            try:
+                yield pipeline
+            finally:
+                try:
+                    await on_pipeline_loop(self.sessions.release(session_id))
+                except Exception:
+                    logger.exception("Evicting idle sessions failed after a request for %s", session_id)
+
+    async def _run_stage(self, session_id: str, stage: Callable[[AsyncLeadGenPipeline], Awaitable[T]]) -> T:
+        """Run a stage of a session on the background loop, one call per session at a time
+
+        Args:
+            session_id: ID of the session
+            stage: Coroutine function taking the session's pipeline
+
+        Returns:
+            The stage's result
+
+        Raises:
+            HTTPError: 404 for an unknown session, 409 if an earlier stage is incomplete,
+                400 for answers that don't match the questions, 502 if the model call fails
+        """
+        async with self._session(session_id) as pipeline:
+            try:
+                return await on_pipeline_loop(stage(pipeline))
+            except StageOrderError as e:
+                raise HTTPError(409, str(e))
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            except HTTPError:
+                raise
+            except Exception as e:
+                logger.exception("Stage failed for session %s", session_id)
+                raise HTTPError(502, f"Generation failed: {str(e) or type(e).__name__}")
+
+    @staticmethod
+    def _state(pipeline: AsyncLeadGenPipeline) -> Dict[str, Any]:
+        """Describe a session for responses"""
+        return {"session_id": pipeline.session.id, "next_stage": pipeline.next_stage()}
+
+    async def health(self, **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Report that the service is up"""
+        stats = self.sessions.get_stats()
+        return 200, {"status": "ok", "live_sessions": stats["live"], "compact_sessions": stats["compact"]}
+
+    async def metrics(self, send: Send, **_: Any) -> None:
+        """Serve the stage, call and session metrics plus the service's request counters in Prometheus text format"""
+        lines = []
+        if self.registry.instrumentation is not None:
+            lines.append(self.registry.instrumentation.render_prometheus().rstrip("\n"))
+        lines.append(self.sessions.render_prometheus().rstrip("\n"))
+        lines.append("# TYPE leadgen_service_requests_total counter")
+        with self._stats_lock:
+            requests = sorted(self._requests.items())
+        for (route, status), count in requests:
+            lines.append(f'leadgen_service_requests_total{{route="{route}",status="{status}"}} {count}')
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; version=0.0.4"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def default_questions(self, **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Get the default questions"""
+        return 200, {"questions": self.registry.config_loader.get_default_questions()}
+
+    async def create_session(self, body: Dict[str, Any], **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Start a session, optionally with a caller-chosen ID
+
+        The ID is checked and taken under the session's lock, so of two concurrent
+        requests for the same ID one gets the session and the other a 409. IDs other
+        than 1 to 64 letters, digits, hyphens and underscores are rejected with a 400.
+        """
+        session_id = body.get("session_id")
+        if session_id is None:
+            session_id = generate_id()
+        elif not is_valid_session_id(session_id):
+            raise HTTPError(400, "session_id must be 1 to 64 letters, digits, hyphens or underscores")
+        # Tenant IDs follow the session ID rules; only sessions of the same tenant share questions
+        tenant_id = body.get("tenant_id")
+        if tenant_id is not None and not is_valid_session_id(tenant_id):
+            raise HTTPError(400, "tenant_id must be 1 to 64 letters, digits, hyphens or underscores")
+        async with self._session_lock(session_id):
+            if await on_pipeline_loop(self.sessions.exists(session_id)):
+                raise HTTPError(409, f"Session {session_id} already exists")
+            pipeline = await on_pipeline_loop(_call(self.sessions.create, session_id))
+            pipeline.session.tenant_id = tenant_id
+            try:
+                # Saved right away, so the session can be resumed before its first answers arrive
+                await on_pipeline_loop(pipeline.checkpoint())
+                return 201, {**self._state(pipeline), "default_questions": pipeline.run_default_questions_stage()}
+            finally:
+                await on_pipeline_loop(self.sessions.release(session_id))
+
+    async def get_session(self, session_id: str, **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Get a session's questions, answers and results so far"""
+        async with self._session(session_id) as pipeline:
+            return 200, {
+                **self._state(pipeline),
+                "summary": pipeline.get_session_summary(),
+                "session": json.loads(pipeline.session.model_dump_json()),
+            }
+
+    async def default_answers(self, session_id: str, body: Dict[str, Any], **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Submit (or, with partial, observe) the answers to the default questions"""
+        async def stage(pipeline: AsyncLeadGenPipeline) -> Dict[str, Any]:
+            questions = pipeline.run_default_questions_stage()
+            if body.get("partial", False):
+                await pipeline.observe_default_answers(self._partial_answers(questions, body.get("answers")))
+            else:
+                await pipeline.process_default_answers(match_answers(questions, body.get("answers"), body.get("auto_answer")))
+            return self._state(pipeline)
+
+        return 200, await self._run_stage(session_id, stage)
+
+    async def personalized_questions(self, session_id: str, **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Generate (or return the already generated) personalized questions"""
+        async def stage(pipeline: AsyncLeadGenPipeline) -> Dict[str, Any]:
+            questions = await pipeline.run_personalized_questions_stage()
+            return {
+                **self._state(pipeline),
+                "questions": questions,
+                "reused": pipeline.last_question_reuse,
+                "speculation": pipeline.last_speculation,
+            }
+
+        return 200, await self._run_stage(session_id, stage)
+
+    async def personalized_answers(self, session_id: str, body: Dict[str, Any],
+                                   **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Submit (or, with partial, observe) the answers to the personalized questions"""
+        async def stage(pipeline: AsyncLeadGenPipeline) -> Dict[str, Any]:
+            questions = pipeline.session.generated_personalized_questions
+            if not questions:
+                raise StageOrderError("Personalized questions stage must be completed first")
+            if body.get("partial", False):
+                await pipeline.observe_personalized_answers(self._partial_answers(questions, body.get("answers")))
+            else:
+                await pipeline.process_personalized_answers(
+                    match_answers(questions, body.get("answers"), body.get("auto_answer"))
+                )
+            return self._state(pipeline)
+
+        return 200, await self._run_stage(session_id, stage)
+
+    async def keywords(self, session_id: str, **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Generate the keywords (and, in fused mode, the ICP with them)"""
+        async def stage(pipeline: AsyncLeadGenPipeline) -> Dict[str, Any]:
+            if not pipeline.session.keywords:
+                if pipeline.fused_generation:
+                    await pipeline.run_fused_generation_stage()
+                else:
+                    await pipeline.run_keyword_generation_stage()
+            return {
+                **self._state(pipeline),
+                "keywords": [keyword.model_dump() for keyword in pipeline.session.keywords],
+            }
+
+        return 200, await self._run_stage(session_id, stage)
+
+    async def icp(self, session_id: str, **_: Any) -> Tuple[int, Dict[str, Any]]:
+        """Generate (or return the already generated) Ideal Customer Profile"""
+        async def stage(pipeline: AsyncLeadGenPipeline) -> Dict[str, Any]:
+            if pipeline.session.ideal_customer_profile is None:
+                await pipeline.run_icp_generation_stage()
+            return {**self._state(pipeline), "profile": pipeline.session.ideal_customer_profile.model_dump()}
+
+        return 200, await self._run_stage(session_id, stage)
+
+    async def icp_stream(self, session_id: str, send: Send, **_: Any) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Stream the Ideal Customer Profile as server-sent events
+
+        Each delta is a "data" event with {"delta": text}; a final "done" event
+        carries the full profile. A profile generated earlier is sent as one delta.
+        """
+        async with self._session(session_id) as pipeline:
+            if not pipeline.session.keywords:
+                raise HTTPError(409, "Keyword generation stage must be completed first")
+
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+            })
+            try:
+                async for delta in self._iterate_icp(pipeline):
+                    await self._send_event(send, "message", {"delta": delta})
+                await self._send_event(send, "done", self._state(pipeline))
+            except Exception as e:
+                logger.exception("ICP stream failed for session %s", session_id)
+                await self._send_event(send, "error", {"error": str(e) or type(e).__name__})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        return None
+
+    async def _iterate_icp(self, pipeline: AsyncLeadGenPipeline) -> AsyncIterator[str]:
+        """Iterate the ICP stream of a session
+
+        The stream is consumed by one task on the background loop, which hands the
+        deltas to this loop; closing the iterator early cancels the model call.
+        """
+        if pipeline.session.ideal_customer_profile is not None:
+            yield pipeline.session.ideal_customer_profile.summary or ""
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+
+        async def produce() -> None:
+            try:
+                async for delta in pipeline.run_icp_generation_stage_stream():
+                    loop.call_soon_threadsafe(queue.put_nowait, ("delta", delta))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, ("error", e))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, ("done", None))
+
+        producer = submit(produce())
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "error":
+                    raise value
+                if kind == "done":
+                    return
+                yield value
+        finally:
+            producer.cancel()
+
+    @staticmethod
+    async def _send_event(send: Send, event: str, payload: Any) -> None:
+        """Send one server-sent event ("message" events are sent without an event line)"""
+        data = f"data: {json.dumps(payload)}\n\n"
+        if event != "message":
+            data = f"event: {event}\n{data}"
+        await send({"type": "http.response.body", "body": data.encode("utf-8"), "more_body": True})
+
+    @staticmethod
+    def _partial_answers(questions: List[str], answers: Any) -> Dict[str, str]:
+        """Pair the answers given so far with their questions, skipping unanswered ones"""
+        if isinstance(answers, list):
+            return {question: answer for question, answer in zip(questions, answers) if answer}
+        return {question: (answers or {})[question] for question in questions if (answers or {}).get(question)}
+
+    def forget(self, session_id: str) -> None:
+        """Evict a session from memory to storage (it is resumed on its next request)"""
+        submit(self.sessions.evict(session_id)).result()
+
+
+def create_app(registry: Optional[ServiceRegistry] = None) -> LeadGenApp:
+    """Create the ASGI application (e.g. uvicorn --factory leadgen.api.asgi:create_app)
+
+    Args:
+        registry: Service registry to take shared services from
+
+    Returns:
+        The ASGI application
+    """
+    return LeadGenApp.from_config(registry)
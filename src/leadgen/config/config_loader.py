@@ -1,92 +1,317 @@
 # Configuration loader for the leadgen application
 
 import os
-from typing import Dict, Any, Optional
-import yaml
+import json
+import logging
+import threading
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# agent_params keys passed to the model with every call
+MODEL_SETTING_KEYS = ("temperature", "max_tokens", "top_p")
+
+# Files validated against the models in leadgen.config.settings (schema.yaml is loaded as is)
+VALIDATED_FILES = ("config", "params", "prompts")
+
+# File name of the precompiled snapshot, written next to the YAML files by default
+SNAPSHOT_FILE = "config.snapshot.json"
+SNAPSHOT_VERSION = 2
+
+# Environment variable overriding the configuration directory
+CONFIG_DIR_ENV = "LEADGEN_CONFIG_DIR"
+
+
+def resolve_config_dir(config_dir: Optional[str] = None) -> str:
+    """Find the configuration directory without depending on the working directory
+    
+    Args:
+        config_dir: Explicit directory (relative paths are taken from the working directory)
+    
+    Returns:
+        Absolute path of config_dir if given, otherwise of $LEADGEN_CONFIG_DIR, the
+        checkout's config/ directory, or ./config, whichever is found first
+    """
+    if config_dir:
+        return os.path.abspath(config_dir)
+    if os.environ.get(CONFIG_DIR_ENV):
+        return os.path.abspath(os.environ[CONFIG_DIR_ENV])
+    # src/leadgen/config/config_loader.py -> <checkout>/config
+    checkout_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "config")
+    if os.path.exists(os.path.join(checkout_dir, "config.yaml")):
+        return os.path.normpath(checkout_dir)
+    return os.path.abspath("config")
 
 
 class ConfigLoader:
-    """Utility class for loading configuration from YAML files"""
+    """Utility class for loading configuration from YAML files
+    
+    config.yaml, params.yaml and prompts.yaml are validated against the models in
+    leadgen.config.settings when they are loaded, so a bad value fails at startup
+    rather than deep inside a stage. The validated files can be written to a JSON
+    snapshot (see compile_snapshot) that later processes load instead of parsing
+    and validating the YAML again, as long as the YAML files are unchanged. With
+    watch() running, edited files are reloaded in the background, so get_* calls
+    never touch the file system.
+    """
     
-    def __init__(self, config_dir: str = "config"):
+    def __init__(self, config_dir: Optional[str] = None, snapshot_path: Optional[str] = None):
         """Initialize the config loader
         
         Args:
-            config_dir: Directory containing configuration files
+            config_dir: Directory containing configuration files (see resolve_config_dir)
+            snapshot_path: Path of the precompiled snapshot (defaults to config.snapshot.json
+                in config_dir; it is only used if it exists and is current)
         """
-        self.config_dir = config_dir
+        self.config_dir = resolve_config_dir(config_dir)
+        self.snapshot_path = snapshot_path or os.path.join(self.config_dir, SNAPSHOT_FILE)
         self.config_cache: Dict[str, Any] = {}
+        self._mtimes: Dict[str, int] = {}
+        self._settings: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._snapshot_checked = False
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+    
+    def _file_path(self, name: str) -> str:
+        """Get the path of a configuration file by name (e.g. "params")"""
+        return os.path.join(self.config_dir, f"{name}.yaml")
+    
+    def _mtime(self, name: str) -> Optional[int]:
+        """Get the modification time of a configuration file in nanoseconds, or None if it is missing"""
+        try:
+            return os.stat(self._file_path(name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
     
     def _load_yaml(self, file_path: str) -> Dict[str, Any]:
         """Load a YAML file
         
         Args:
             file_path: Path to the YAML file
-            
+        
         Returns:
             Dictionary containing the YAML content
         """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Configuration file not found: {file_path}")
         
+        import yaml
+        
         with open(file_path, "r") as file:
             return yaml.safe_load(file)
     
+    def _parse(self, name: str) -> Dict[str, Any]:
+        """Load a configuration file, validating it if it has a model
+        
+        Args:
+            name: Name of the file without extension
+        
+        Returns:
+            The file content, with values coerced to their model types and unset
+            keys filled in with the model defaults
+        
+        Raises:
+            pydantic.ValidationError: If the content does not match the model
+        """
+        data = self._load_yaml(self._file_path(name))
+        if name not in VALIDATED_FILES:
+            return data
+        from leadgen.config.settings import validate_file
+        # Defaults are filled in here, so the models in settings.py are the one place they are defined
+        return validate_file(name, data).model_dump()
+    
+    def _load_snapshot(self) -> None:
+        """Fill the cache from the precompiled snapshot if it matches the current YAML files (lock must be held)"""
+        self._snapshot_checked = True
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "r") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable config snapshot %s: %s", self.snapshot_path, e)
+            return
+        
+        mtimes = {name: self._mtime(name) for name in VALIDATED_FILES}
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("mtimes") != mtimes:
+            logger.info("Config snapshot %s is out of date; loading the YAML files", self.snapshot_path)
+            return
+        for name in VALIDATED_FILES:
+            self.config_cache.setdefault(name, snapshot["files"][name])
+            self._mtimes.setdefault(name, mtimes[name])
+    
+    def _get(self, name: str, refresh: bool = False) -> Dict[str, Any]:
+        """Get a configuration file from the cache, loading it on first use
+        
+        Args:
+            name: Name of the file without extension
+            refresh: Whether to load the file again
+        
+        Returns:
+            Dictionary containing the file content
+        """
+        content = self.config_cache.get(name)
+        if content is not None and not refresh:
+            return content
+        with self._lock:
+            if not self._snapshot_checked and not refresh:
+                self._load_snapshot()
+            if name not in self.config_cache or refresh:
+                mtime = self._mtime(name)
+                self.config_cache[name] = self._parse(name)
+                self._mtimes[name] = mtime
+                self._settings.pop(name, None)
+            return self.config_cache[name]
+    
     def get_config(self, refresh: bool = False) -> Dict[str, Any]:
         """Get the main configuration
         
         Args:
             refresh: Whether to refresh the cached configuration
-            
+        
         Returns:
             Dictionary containing the configuration
         """
-        if "config" not in self.config_cache or refresh:
-            file_path = os.path.join(self.config_dir, "config.yaml")
-            self.config_cache["config"] = self._load_yaml(file_path)
-        return self.config_cache["config"]
+        return self._get("config", refresh)
     
     def get_prompts(self, refresh: bool = False) -> Dict[str, Any]:
         """Get the prompts configuration
         
         Args:
             refresh: Whether to refresh the cached configuration
-            
+        
         Returns:
             Dictionary containing the prompts
         """
-        if "prompts" not in self.config_cache or refresh:
-            file_path = os.path.join(self.config_dir, "prompts.yaml")
-            self.config_cache["prompts"] = self._load_yaml(file_path)
-        return self.config_cache["prompts"]
+        return self._get("prompts", refresh)
     
     def get_params(self, refresh: bool = False) -> Dict[str, Any]:
         """Get the parameters configuration
         
         Args:
             refresh: Whether to refresh the cached configuration
-            
+        
         Returns:
             Dictionary containing the parameters
         """
-        if "params" not in self.config_cache or refresh:
-            file_path = os.path.join(self.config_dir, "params.yaml")
-            self.config_cache["params"] = self._load_yaml(file_path)
-        return self.config_cache["params"]
+        return self._get("params", refresh)
     
     def get_schema(self, refresh: bool = False) -> Dict[str, Any]:
         """Get the schema configuration
         
         Args:
             refresh: Whether to refresh the cached configuration
-            
+        
         Returns:
             Dictionary containing the schema
         """
-        if "schema" not in self.config_cache or refresh:
-            file_path = os.path.join(self.config_dir, "schema.yaml")
-            self.config_cache["schema"] = self._load_yaml(file_path)
-        return self.config_cache["schema"]
+        return self._get("schema", refresh)
+    
+    def get_settings(self, name: str) -> Any:
+        """Get a validated configuration file as its typed model
+        
+        Args:
+            name: "config", "params" or "prompts"
+        
+        Returns:
+            The AppConfig, ParamsConfig or PromptsConfig of the current content
+        """
+        settings = self._settings.get(name)
+        if settings is None:
+            from leadgen.config.settings import validate_file
+            with self._lock:
+                settings = self._settings[name] = validate_file(name, self._get(name))
+        return settings
+    
+    def validate(self) -> None:
+        """Load and validate every validated file, so errors surface at startup
+        
+        Raises:
+            pydantic.ValidationError: If a file does not match its model
+        """
+        for name in VALIDATED_FILES:
+            self._get(name)
+    
+    def compile_snapshot(self, path: Optional[str] = None) -> str:
+        """Validate the YAML files and write them to a snapshot that loads without YAML parsing
+        
+        Args:
+            path: Path of the snapshot (defaults to snapshot_path)
+        
+        Returns:
+            The path written
+        """
+        path = path or self.snapshot_path
+        with self._lock:
+            mtimes = {name: self._mtime(name) for name in VALIDATED_FILES}
+            files = {name: self._parse(name) for name in VALIDATED_FILES}
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"version": SNAPSHOT_VERSION, "mtimes": mtimes, "files": files}, file)
+        os.replace(temp_path, path)
+        return path
+    
+    def reload_changed(self) -> List[str]:
+        """Reload the loaded files whose modification time changed
+        
+        A file that fails to load or validate is logged and the previous content is
+        kept. Dictionaries already handed out are not modified; the new content is
+        returned by the next get_* call.
+        
+        Returns:
+            Names of the files reloaded
+        """
+        reloaded = []
+        with self._lock:
+            for name, known_mtime in list(self._mtimes.items()):
+                mtime = self._mtime(name)
+                if mtime is None or mtime == known_mtime:
+                    continue
+                # Record the new time first, so an invalid edit is reported once
+                self._mtimes[name] = mtime
+                try:
+                    content = self._parse(name)
+                except Exception as e:
+                    logger.error("Keeping the previous %s.yaml; the edited file is invalid: %s", name, e)
+                    continue
+                self.config_cache[name] = content
+                self._settings.pop(name, None)
+                reloaded.append(name)
+        if reloaded:
+            logger.info("Reloaded configuration: %s", ", ".join(f"{name}.yaml" for name in reloaded))
+        return reloaded
+    
+    def watch(self, interval_seconds: float = 2.0) -> None:
+        """Start reloading changed files in a background thread
+        
+        Args:
+            interval_seconds: Time between modification time checks
+        """
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(
+                target=self._watch_loop, args=(interval_seconds,), name="config-reload", daemon=True
+            )
+            self._watcher.start()
+    
+    def _watch_loop(self, interval_seconds: float) -> None:
+        """Check for changed files every interval_seconds until stop_watching is called"""
+        while not self._stop_watching.wait(interval_seconds):
+            try:
+                self.reload_changed()
+            except Exception:
+                logger.exception("Configuration reload failed")
+    
+    def stop_watching(self) -> None:
+        """Stop the background reload thread"""
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            self._stop_watching.set()
+            watcher.join()
     
     def get_default_questions(self) -> list:
         """Get the default questions from the parameters
@@ -106,15 +331,64 @@ class ConfigLoader:
         params = self.get_params()
         return params.get("agent_params", {})
     
+    def get_model_settings(self, agent_type: str) -> Dict[str, Any]:
+        """Get the model settings for an agent's calls
+        
+        The shared agent_params (temperature, max_tokens, top_p) are overridden
+        by the agent's entry in agent_params.agents.
+        
+        Args:
+            agent_type: Type of agent (e.g., keyword_generation_agent)
+        
+        Returns:
+            Dictionary of model settings, without unset values
+        """
+        agent_params = self.get_agent_params()
+        settings = {key: agent_params.get(key) for key in MODEL_SETTING_KEYS}
+        overrides = (agent_params.get("agents") or {}).get(agent_type) or {}
+        settings.update((key, value) for key, value in overrides.items() if value is not None)
+        return {key: value for key, value in settings.items() if key in MODEL_SETTING_KEYS and value is not None}
+    
     def get_system_prompt(self, agent_type: str) -> Optional[str]:
         """Get a system prompt for a specific agent type
         
         Args:
             agent_type: Type of agent (e.g., default_questions_agent)
-            
+        
         Returns:
             System prompt string or None if not found
         """
         prompts = self.get_prompts()
         agent_config = prompts.get(agent_type, {})
-        return agent_config.get("system_prompt")
\ No newline at end of file
+        return agent_config.get("system_prompt")
+
+
+_loaders: Dict[str, ConfigLoader] = {}
+_loaders_lock = threading.Lock()
+
+
+def get_config_loader(config_dir: Optional[str] = None) -> ConfigLoader:
+    """Get the process-wide loader for a configuration directory, creating it on first use
+    
+    The configuration is validated when the loader is created, and hot reload is
+    started if config_reload.enabled is set in config.yaml.
+    
+    Args:
+        config_dir: Directory containing configuration files (see resolve_config_dir)
+    
+    Returns:
+        The shared ConfigLoader for the directory
+    """
+    resolved = resolve_config_dir(config_dir)
+    loader = _loaders.get(resolved)
+    if loader is None:
+        with _loaders_lock:
+            loader = _loaders.get(resolved)
+            if loader is None:
+                loader = ConfigLoader(resolved)
+                loader.validate()
+                reload_config = loader.get_config().get("config_reload", {})
+                if reload_config.get("enabled", False):
+                    loader.watch(reload_config.get("interval_seconds", 2.0))
+                _loaders[resolved] = loader
+    return loader
@@ -0,0 +1,297 @@
+# Typed models of config.yaml, params.yaml and prompts.yaml, validated when the configuration is loaded
+
+from typing import List, Dict, Any, Optional, Literal
+from pydantic import BaseModel, ConfigDict, Field, RootModel, ValidationInfo, field_validator
+
+
+class Section(BaseModel):
+    """Base for configuration sections
+
+    Keys without a field are kept as they are, so new settings can be added to
+    the YAML files before they get a typed field here.
+    """
+    model_config = ConfigDict(extra="allow")
+
+
+# config.yaml
+
+class HedgingSettings(Section):
+    """Hedged request settings (llm.hedging)"""
+    enabled: bool = False
+    percentile: float = Field(95, gt=0, le=100)
+    min_samples: int = Field(20, ge=1)
+    window: int = Field(200, ge=1)
+    model: Optional[str] = None
+
+
+class MockLatencySettings(Section):
+    """Simulated latency of the mock backend (llm.mock.latency)"""
+    distribution: Literal["fixed", "normal", "long_tail"] = "fixed"
+    mean_seconds: float = Field(0.5, ge=0)
+    stddev_seconds: float = Field(0.1, ge=0)
+    tail_sigma: float = Field(1.0, ge=0)
+
+
+class MockSettings(Section):
+    """Mock backend settings (llm.mock)"""
+    seed: int = 0
+    latency: MockLatencySettings = Field(default_factory=MockLatencySettings)
+    tokens_per_second: float = Field(200, gt=0)
+    error_rate: float = Field(0.0, ge=0, le=1)
+
+
+class LLMSettings(Section):
+    """Model provider and routing settings (llm)"""
+    provider: Literal["groq", "mock"] = "groq"
+    model: str = "qwen/qwen3-32b"
+    agent_models: Dict[str, str] = Field(default_factory=dict)
+    fallback_models: List[str] = Field(default_factory=list)
+    timeout_seconds: Optional[float] = Field(None, gt=0)
+    hedging: HedgingSettings = Field(default_factory=HedgingSettings)
+    base_url: Optional[str] = None
+    mock: MockSettings = Field(default_factory=MockSettings)
+
+    @field_validator("agent_models", "fallback_models", mode="before")
+    @classmethod
+    def _empty_as_unset(cls, value: Any, info: ValidationInfo) -> Any:
+        """Treat a key left empty in the YAML file as an empty mapping or list"""
+        if value is None:
+            return {} if info.field_name == "agent_models" else []
+        return value
+
+
+class RateLimitSettings(Section):
+    """Request scheduler settings (rate_limits)"""
+    enabled: bool = False
+    requests_per_minute: int = Field(60, ge=1)
+    tokens_per_minute: int = Field(6000, ge=1)
+    max_concurrency: int = Field(8, ge=1)
+    min_concurrency: int = Field(1, ge=1)
+    max_retries: int = Field(5, ge=0)
+    backoff_base_seconds: float = Field(0.5, ge=0)
+    backoff_max_seconds: float = Field(30, ge=0)
+
+
+class HTTPSettings(Section):
+    """Shared HTTP client settings (http)"""
+    http2: bool = True
+    max_connections: int = Field(100, ge=1)
+    max_keepalive_connections: int = Field(20, ge=0)
+    keepalive_expiry_seconds: float = Field(120, ge=0)
+    timeout_seconds: float = Field(60, gt=0)
+    connect_timeout_seconds: float = Field(10, gt=0)
+    prewarm: bool = True
+
+
+class QuestionCountSettings(Section):
+    """Question and keyword counts (questions)"""
+    default_count: int = Field(5, ge=1)
+    personalized_count: int = Field(10, ge=1)
+    keyword_count: int = Field(10, ge=1)
+
+
+class StorageSettings(Section):
+    """Session storage settings (storage)"""
+    type: Literal["local", "sqlite"] = "local"
+    path: str = "./data"
+    # None for sessions.sqlite3 under path
+    sqlite_path: Optional[str] = None
+    batch_size: int = Field(1, ge=1)
+
+
+class KeywordIndexSettings(Section):
+    """Cross-session keyword index settings (keyword_index)"""
+    enabled: bool = False
+    path: str = "./data/keyword_index.sqlite3"
+
+
+class QuestionReuseSettings(Section):
+    """Personalized question reuse settings (question_reuse)"""
+    enabled: bool = False
+    path: str = "./data/question_reuse.sqlite3"
+    threshold: float = Field(0.92, gt=0, le=1)
+    dimensions: int = Field(1024, ge=16)
+    max_entries: int = Field(20000, ge=1)
+
+
+class CacheSettings(Section):
+    """LLM response cache settings (cache)"""
+    enabled: bool = False
+    path: str = "./data/llm_cache.sqlite3"
+    ttl_seconds: Optional[float] = Field(None, gt=0)
+    max_entries: int = Field(10000, ge=1)
+
+
+class MetricsSettings(Section):
+    """Stage and call metrics settings (metrics)"""
+    enabled: bool = False
+    prometheus_path: Optional[str] = None
+    spans_path: Optional[str] = None
+    export_interval_seconds: float = Field(5, ge=0)
+
+
+class ConfigReloadSettings(Section):
+    """Hot reload of the configuration files (config_reload)"""
+    enabled: bool = False
+    interval_seconds: float = Field(2.0, gt=0)
+
+
+class ServiceSettings(Section):
+    """HTTP service mode settings (service)"""
+    host: str = "127.0.0.1"
+    port: int = Field(8000, ge=0, le=65535)
+    max_body_bytes: int = Field(1 << 20, ge=1)
+
+
+class SessionManagerSettings(Section):
+    """In-memory session limits of the service (sessions)"""
+    memory_budget_mb: float = Field(256, gt=0)
+    max_live: int = Field(256, ge=1)
+    pipeline_overhead_bytes: int = Field(8192, ge=0)
+    compression_level: int = Field(6, ge=0, le=9)
+    rate_window_seconds: float = Field(300, gt=0)
+
+
+class BatchSettings(Section):
+    """Batch mode settings (batch)"""
+    concurrency: int = Field(8, ge=1)
+    output_path: str = "./data/batch_results.jsonl"
+
+
+class AppConfig(Section):
+    """Contents of config.yaml"""
+    llm: LLMSettings = Field(default_factory=LLMSettings)
+    rate_limits: RateLimitSettings = Field(default_factory=RateLimitSettings)
+    http: HTTPSettings = Field(default_factory=HTTPSettings)
+    application: Dict[str, Any] = Field(default_factory=dict)
+    questions: QuestionCountSettings = Field(default_factory=QuestionCountSettings)
+    storage: StorageSettings = Field(default_factory=StorageSettings)
+    keyword_index: KeywordIndexSettings = Field(default_factory=KeywordIndexSettings)
+    question_reuse: QuestionReuseSettings = Field(default_factory=QuestionReuseSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+    config_reload: ConfigReloadSettings = Field(default_factory=ConfigReloadSettings)
+    service: ServiceSettings = Field(default_factory=ServiceSettings)
+    sessions: SessionManagerSettings = Field(default_factory=SessionManagerSettings)
+    batch: BatchSettings = Field(default_factory=BatchSettings)
+
+
+# params.yaml
+
+class ModelSettings(Section):
+    """Model settings sent with an agent's calls"""
+    temperature: Optional[float] = Field(None, ge=0, le=2)
+    max_tokens: Optional[int] = Field(None, ge=1)
+    top_p: Optional[float] = Field(None, gt=0, le=1)
+
+
+class AutoTuneSettings(Section):
+    """Output budget tuning settings (agent_params.auto_tune)"""
+    enabled: bool = False
+    path: Optional[str] = None
+    percentile: float = Field(99, gt=0, le=100)
+    headroom: float = Field(1.25, ge=1)
+    min_samples: int = Field(20, ge=1)
+    window: int = Field(500, ge=1)
+    round_to: int = Field(50, ge=1)
+    apply: bool = False
+
+
+class AgentParams(ModelSettings):
+    """Shared and per-agent model settings (agent_params)"""
+    agents: Dict[str, Optional[ModelSettings]] = Field(default_factory=dict)
+    auto_tune: AutoTuneSettings = Field(default_factory=AutoTuneSettings)
+
+
+class PromptBudgetSettings(Section):
+    """Prompt size budgets (prompt_budget)"""
+    # None for no cap
+    max_answer_tokens: Optional[int] = Field(None, ge=1)
+    summarize_long_answers: bool = False
+    summarize_threshold_tokens: int = Field(1200, ge=1)
+    summary_tokens: int = Field(250, ge=1)
+    stages: Dict[str, int] = Field(default_factory=dict)
+
+
+class KeywordScoringSettings(Section):
+    """Local keyword scoring settings (keyword_scoring)"""
+    enabled: bool = True
+    history_weight: float = Field(0.3, ge=0, le=1)
+    min_history_sessions: int = Field(10, ge=0)
+    bm25_k1: float = Field(1.2, ge=0)
+    bm25_b: float = Field(0.75, ge=0, le=1)
+    long_tail_min_words: int = Field(3, ge=1)
+    dedup_threshold: float = Field(0.8, gt=0, le=1)
+
+
+class QuestionSpeculationSettings(Section):
+    """Background personalized question settings (speculation.personalized_questions)"""
+    enabled: bool = False
+    min_answers: int = Field(3, ge=1)
+    min_overlap: float = Field(0.5, ge=0, le=1)
+
+
+class KeywordDraftSettings(Section):
+    """Background keyword draft settings (speculation.keyword_draft)"""
+    enabled: bool = False
+    min_answers: int = Field(3, ge=1)
+    refresh_every: int = Field(2, ge=1)
+
+
+class SpeculationSettings(Section):
+    """Speculative generation settings (speculation)"""
+    personalized_questions: QuestionSpeculationSettings = Field(default_factory=QuestionSpeculationSettings)
+    keyword_draft: KeywordDraftSettings = Field(default_factory=KeywordDraftSettings)
+
+
+class ProcessSettings(Section):
+    """Process settings (process)"""
+    save_responses: bool = True
+    generate_icp: bool = True
+    generate_keywords: bool = True
+    generation_mode: Literal["two_stage", "fused"] = "two_stage"
+
+
+class ParamsConfig(Section):
+    """Contents of params.yaml"""
+    default_questions: List[str] = Field(min_length=1)
+    agent_params: AgentParams = Field(default_factory=AgentParams)
+    prompt_budget: PromptBudgetSettings = Field(default_factory=PromptBudgetSettings)
+    keyword_scoring: KeywordScoringSettings = Field(default_factory=KeywordScoringSettings)
+    speculation: SpeculationSettings = Field(default_factory=SpeculationSettings)
+    process: ProcessSettings = Field(default_factory=ProcessSettings)
+
+
+# prompts.yaml
+
+class AgentPrompt(Section):
+    """An agent's entry in prompts.yaml"""
+    system_prompt: str = Field(min_length=1)
+
+
+class PromptsConfig(RootModel[Dict[str, AgentPrompt]]):
+    """Contents of prompts.yaml, keyed by agent name"""
+
+
+# Models each file is validated with
+FILE_MODELS = {
+    "config": AppConfig,
+    "params": ParamsConfig,
+    "prompts": PromptsConfig,
+}
+
+
+def validate_file(name: str, data: Any) -> Any:
+    """Validate the contents of a configuration file
+
+    Args:
+        name: Name of the file without extension ("config", "params" or "prompts")
+        data: The parsed YAML content
+
+    Returns:
+        The validated model
+
+    Raises:
+        pydantic.ValidationError: If the content does not match the model
+    """
+    return FILE_MODELS[name].model_validate(data if data is not None else {})
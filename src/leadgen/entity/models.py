@@ -89,8 +89,12 @@ class IdealCustomerProfile(BaseModel):
 class QuestionSession(BaseModel):
     """Model representing a complete question session"""
     id: str
+    tenant_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
     default_questions: Dict[str, str] = Field(default_factory=dict)
+    generated_personalized_questions: List[str] = Field(default_factory=list)
     personalized_questions: Dict[str, str] = Field(default_factory=dict)
     keywords: List[Keyword] = Field(default_factory=list)
-    ideal_customer_profile: Optional[IdealCustomerProfile] = None
\ No newline at end of file
+    ideal_customer_profile: Optional[IdealCustomerProfile] = None
+    prompt_metrics: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    stage_metrics: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
\ No newline at end of file
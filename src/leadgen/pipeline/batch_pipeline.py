@@ -0,0 +1,208 @@
+# Headless batch runner for pre-answered questionnaires
+
+import json
+import os
+import asyncio
+import time
+from typing import Dict, List, Any, Optional, Set
+
+from leadgen.pipeline.lead_gen_pipeline import AsyncLeadGenPipeline
+from leadgen.services.registry import ServiceRegistry, get_registry
+from leadgen.utils.helpers import is_valid_session_id
+
+
+def match_answers(questions: List[str], answers: Any, auto_answer: Optional[str] = None) -> Dict[str, str]:
+    """Pair questions with the provided answers or the auto-answer rule
+
+    Args:
+        questions: Questions to answer
+        answers: Answers keyed by question text or given positionally
+        auto_answer: Template used for questions without an answer
+
+    Returns:
+        Dictionary mapping questions to answers
+
+    Raises:
+        ValueError: If a question has no answer and there is no auto_answer rule
+    """
+    answers = answers or {}
+    matched = {}
+    for index, question in enumerate(questions):
+        if isinstance(answers, list):
+            answer = answers[index] if index < len(answers) else None
+        else:
+            answer = answers.get(question)
+
+        if answer is None:
+            if auto_answer is None:
+                raise ValueError(f"No answer or auto_answer rule for question: {question}")
+            answer = auto_answer.format(question=question, index=index + 1)
+        matched[question] = answer
+    return matched
+
+
+class BatchRunner:
+    """Run personalized -> keywords -> ICP for many questionnaires concurrently
+
+    Each input line is a JSON object of the form::
+
+        {
+            "id": "customer-42",
+            "tenant_id": "acme",
+            "default_answers": {"<question>": "<answer>", ...} or ["<answer>", ...],
+            "personalized_answers": {"<question>": "<answer>", ...} or ["<answer>", ...],
+            "auto_answer": "Not sure yet ({question})"
+        }
+
+    ``personalized_answers`` is matched by question text or, for a list, by
+    position. Any generated question it does not cover is answered with the
+    ``auto_answer`` template, which may reference ``{question}`` and ``{index}``.
+    The optional ``tenant_id`` lets the record reuse personalized questions of
+    earlier sessions of the same tenant (see QuestionReuseIndex).
+    Results are appended to the output JSONL as each session finishes, and IDs
+    already marked ``ok`` in the output are skipped, so an interrupted run can
+    simply be started again.
+    """
+
+    def __init__(self, input_path: str, output_path: str, concurrency: Optional[int] = None,
+                 registry: Optional[ServiceRegistry] = None):
+        """Initialize the batch runner
+
+        Args:
+            input_path: Path to the input JSONL file
+            output_path: Path to the output JSONL file
+            concurrency: Maximum number of sessions in flight
+                (defaults to batch.concurrency in config.yaml)
+            registry: Service registry to take shared services from
+        """
+        self.registry = registry or get_registry()
+        config = self.registry.config_loader.get_config()
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = concurrency or config.get("batch", {}).get("concurrency", 8)
+        self.stats: Dict[str, Any] = {"completed": 0, "failed": 0, "skipped": 0}
+
+    def load_completed_ids(self) -> Set[str]:
+        """Get the IDs already completed successfully in the output file
+
+        Returns:
+            Set of completed session IDs
+        """
+        completed: Set[str] = set()
+        if not os.path.exists(self.output_path):
+            return completed
+
+        with open(self.output_path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written last line from a crashed run
+                    continue
+                if record.get("status") == "ok":
+                    completed.add(record["id"])
+        return completed
+
+    def load_records(self) -> List[Dict[str, Any]]:
+        """Load the questionnaire records from the input file
+
+        Returns:
+            List of input records
+        """
+        records = []
+        with open(self.input_path, "r") as file:
+            for line_number, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "id" not in record:
+                    raise ValueError(f"Input line {line_number} has no 'id' field")
+                records.append(record)
+        return records
+
+    async def run_session(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the generation stages for one questionnaire
+
+        Args:
+            record: Input record
+
+        Returns:
+            Output record for the session
+
+        Raises:
+            ValueError: If the record's id or tenant_id is not a valid ID
+        """
+        # The ID names the session's storage file, so it must not be able to leave the data directory
+        if not is_valid_session_id(record["id"]):
+            raise ValueError(f"Invalid id {record['id']!r}: use 1 to 64 letters, digits, hyphens or underscores")
+        tenant_id = record.get("tenant_id")
+        if tenant_id is not None and not is_valid_session_id(tenant_id):
+            raise ValueError(f"Invalid tenant_id {tenant_id!r}: use 1 to 64 letters, digits, hyphens or underscores")
+        started = time.perf_counter()
+        pipeline = AsyncLeadGenPipeline(self.registry, session_id=record["id"])
+        pipeline.session.tenant_id = tenant_id
+        auto_answer = record.get("auto_answer")
+
+        default_questions = pipeline.run_default_questions_stage()
+        await pipeline.process_default_answers(
+            match_answers(default_questions, record.get("default_answers"), auto_answer)
+        )
+
+        personalized_questions = await pipeline.run_personalized_questions_stage()
+        await pipeline.process_personalized_answers(
+            match_answers(personalized_questions, record.get("personalized_answers"), auto_answer)
+        )
+
+        await pipeline.run_keyword_generation_stage()
+        await pipeline.run_icp_generation_stage()
+
+        return {
+            "id": record["id"],
+            "status": "ok",
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "session": json.loads(pipeline.session.model_dump_json()),
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Process every pending record, streaming results to the output file
+
+        Returns:
+            Run statistics, including throughput in sessions per minute
+        """
+        completed_ids = self.load_completed_ids()
+        records = self.load_records()
+        # Records with invalid IDs stay pending, so they are reported as errors
+        pending = [r for r in records if not is_valid_session_id(r["id"]) or r["id"] not in completed_ids]
+        self.stats["skipped"] = len(records) - len(pending)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        with open(self.output_path, "a") as output_file:
+            async def worker(record: Dict[str, Any]) -> None:
+                async with semaphore:
+                    try:
+                        result = await self.run_session(record)
+                        self.stats["completed"] += 1
+                    except Exception as e:
+                        result = {"id": record["id"], "status": "error", "error": str(e)}
+                        self.stats["failed"] += 1
+                # Each line is written and flushed as soon as its session finishes
+                output_file.write(json.dumps(result) + "\n")
+                output_file.flush()
+
+            await asyncio.gather(*(worker(record) for record in pending))
+
+        elapsed = time.perf_counter() - started
+        self.stats["elapsed_seconds"] = round(elapsed, 3)
+        processed = self.stats["completed"] + self.stats["failed"]
+        self.stats["sessions_per_minute"] = round(processed / elapsed * 60, 2) if elapsed > 0 else 0.0
+        return self.stats
@@ -1,32 +1,61 @@
 # Lead generation pipeline for orchestrating the entire process
 
 import os
-from typing import Dict, List, Any, Optional
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, AsyncIterator, Iterator, Tuple
 
 from leadgen.agents.question_agents import (
     DefaultQuestionsAgent,
     PersonalizedQuestionsAgent,
     KeywordGenerationAgent,
-    ICPGenerationAgent
+    ICPGenerationAgent,
+    FusedKeywordICPAgent
 )
-from leadgen.config.config_loader import ConfigLoader
+from leadgen.pipeline.speculation import SpeculativeTask, context_overlap, get_speculation_stats
+from leadgen.services.instrumentation import StageRecorder, stage_scope, current_stage
+from leadgen.services.keyword_scoring import KeywordScorer
+from leadgen.services.prompt_compaction import PromptCompactor, QAContext
+from leadgen.services.registry import ServiceRegistry, get_registry
 from leadgen.entity.models import QuestionSession, Keyword, IdealCustomerProfile
-from leadgen.utils.helpers import generate_id, save_session_data, format_questions_for_display
+from leadgen.utils.async_helpers import run_sync, iter_sync, submit, run_in_writer
+from leadgen.utils.helpers import generate_id
 
+logger = logging.getLogger(__name__)
 
-class LeadGenPipeline:
-    """Pipeline for orchestrating the lead generation process"""
+
+class StageOrderError(ValueError):
+    """Raised when a stage is run before the stage it depends on has been completed"""
+
+
+class AsyncLeadGenPipeline:
+    """Async pipeline for orchestrating the lead generation process
+    
+    The LLM-backed stages are coroutines, so a single event loop can drive
+    many sessions concurrently.
+    """
     
-    def __init__(self):
-        """Initialize the lead generation pipeline"""
-        self.config_loader = ConfigLoader()
-        self.default_agent = DefaultQuestionsAgent()
-        self.personalized_agent = PersonalizedQuestionsAgent()
-        self.keyword_agent = KeywordGenerationAgent()
-        self.icp_agent = ICPGenerationAgent()
+    def __init__(self, registry: Optional[ServiceRegistry] = None, session_id: Optional[str] = None):
+        """Initialize the lead generation pipeline
+        
+        Args:
+            registry: Service registry to take shared services from
+                (defaults to the process-wide registry)
+            session_id: ID for the new session (a random ID is generated if omitted)
+        """
+        registry = registry or get_registry()
+        self.config_loader = registry.config_loader
+        self.llm_service = registry.llm_service
+        self.default_agent = DefaultQuestionsAgent(self.config_loader, self.llm_service)
+        self.personalized_agent = PersonalizedQuestionsAgent(self.config_loader, self.llm_service)
+        self.keyword_agent = KeywordGenerationAgent(self.config_loader, self.llm_service)
+        self.icp_agent = ICPGenerationAgent(self.config_loader, self.llm_service)
+        self.fused_agent = FusedKeywordICPAgent(self.config_loader, self.llm_service)
         
         # Create a new session
-        self.session = QuestionSession(id=generate_id())
+        self.session = QuestionSession(id=session_id or generate_id())
         
         # Load configuration
         self.config = self.config_loader.get_config()
@@ -36,6 +65,147 @@ class LeadGenPipeline:
         data_dir = self.config.get("storage", {}).get("path", "./data")
         os.makedirs(data_dir, exist_ok=True)
         self.data_dir = data_dir
+        self.storage = registry.session_storage
+        self.keyword_index = registry.keyword_index
+        self.instrumentation = registry.instrumentation
+        
+        # Personalized questions generated for earlier sessions with near-identical default answers
+        self.question_reuse = registry.question_reuse
+        self.last_question_reuse: Optional[Dict[str, Any]] = None
+        
+        # Local relevance scoring, tail classification and deduplication of generated keywords
+        scoring_config = self.params.get("keyword_scoring", {})
+        self.keyword_scorer = (
+            KeywordScorer.from_config(scoring_config, self.keyword_index)
+            if scoring_config.get("enabled", True) else None
+        )
+        
+        # Time from the start of a streamed ICP request to its first delta
+        self.icp_time_to_first_token: Optional[float] = None
+        
+        # Save the session at every stage boundary so a crash never repeats LLM calls
+        self.checkpoints_enabled = self.params.get("process", {}).get("save_responses", True)
+        
+        # "fused" generates keywords and the ICP in one call instead of two
+        self.fused_generation = self.params.get("process", {}).get("generation_mode", "two_stage") == "fused"
+        
+        # Compacted Q&A context, built once and shared by the keyword and ICP stages
+        self.prompt_compactor = PromptCompactor(
+            self.params.get("prompt_budget", {}),
+            llm_service=self.llm_service,
+            summarizer_prompt=self.config_loader.get_system_prompt("answer_summarizer_agent"),
+            summarizer_settings=self.config_loader.get_model_settings("answer_summarizer_agent")
+        )
+        self._qa_context: Optional[QAContext] = None
+        self._answer_summaries: Dict[str, str] = {}
+        
+        # Personalized questions generated in the background from partial default answers
+        self.speculation_config = self.params.get("speculation", {}).get("personalized_questions", {})
+        self._speculation: Optional[SpeculativeTask] = None
+        self.last_speculation: Optional[Dict[str, Any]] = None
+        
+        # Draft keywords refreshed in the background while personalized answers arrive
+        self.keyword_draft_config = self.params.get("speculation", {}).get("keyword_draft", {})
+        self._keyword_draft: Optional[SpeculativeTask] = None
+        self._keyword_draft_done: Optional[SpeculativeTask] = None
+        self._keyword_draft_pending: Optional[Dict[str, str]] = None
+        self.last_keyword_draft: Optional[Dict[str, Any]] = None
+    
+    @classmethod
+    def resume(cls, session_id: str, registry: Optional[ServiceRegistry] = None) -> "AsyncLeadGenPipeline":
+        """Create a pipeline that continues a stored session
+        
+        Args:
+            session_id: ID of the stored session
+            registry: Service registry to take shared services from
+            
+        Returns:
+            A pipeline positioned at the session's first incomplete stage
+        """
+        pipeline = cls(registry, session_id=session_id)
+        pipeline.load_session(session_id)
+        return pipeline
+    
+    @contextmanager
+    def _stage(self, stage: str) -> Iterator[StageRecorder]:
+        """Record the timing and LLM calls of a stage
+        
+        The metrics are stored in session.stage_metrics (persisted with the next
+        checkpoint) and reported to the instrumentation, also when the stage fails.
+        
+        Args:
+            stage: Stage name
+            
+        Yields:
+            The StageRecorder for the stage
+        """
+        recorder = None
+        try:
+            with stage_scope(stage) as recorder:
+                yield recorder
+        finally:
+            if recorder is not None:
+                self.session.stage_metrics[stage] = recorder.to_dict()
+                if self.instrumentation is not None:
+                    self.instrumentation.record_stage(self.session.id, recorder)
+    
+    async def checkpoint(self) -> Optional[str]:
+        """Save the session if checkpointing is enabled
+        
+        The storage and keyword index writes run on the shared writer thread, so
+        a slow disk never stalls the LLM calls and streams on the event loop.
+        
+        Returns:
+            Location of the saved session, or None if checkpointing is disabled
+        """
+        if not self.checkpoints_enabled:
+            return None
+        return await run_in_writer(self._save, self.session.model_copy(deep=True))
+    
+    def next_stage(self) -> Optional[str]:
+        """Get the first stage the session has not completed
+        
+        Returns:
+            One of "default_questions", "personalized_questions", "keyword_generation"
+            and "icp_generation", or None if every stage is complete
+        """
+        if not self.session.default_questions:
+            return "default_questions"
+        if not self.session.personalized_questions:
+            return "personalized_questions"
+        if not self.session.keywords:
+            return "keyword_generation"
+        if self.session.ideal_customer_profile is None:
+            return "icp_generation"
+        return None
+    
+    def has_background_work(self) -> bool:
+        """Check whether the pipeline holds speculative work the session has not used yet
+        
+        Returns:
+            True if background personalized questions or a keyword draft would be
+            lost by dropping the pipeline
+        """
+        if self._speculation is not None and not self.session.generated_personalized_questions:
+            return True
+        drafts = self._keyword_draft is not None or self._keyword_draft_done is not None
+        return drafts and not self.session.keywords
+    
+    def cancel_background_work(self) -> None:
+        """Cancel the background personalized questions and keyword drafts (on the running loop)
+        
+        Used before the pipeline is dropped; the session itself is unaffected.
+        """
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None and not speculation.task.done():
+            speculation.cancel()
+            get_speculation_stats("personalized_questions").record_cancel()
+        draft, self._keyword_draft = self._keyword_draft, None
+        if draft is not None and not draft.task.done():
+            draft.cancel()
+            get_speculation_stats("keyword_draft").record_cancel()
+        self._keyword_draft_done = None
+        self._keyword_draft_pending = None
     
     def run_default_questions_stage(self) -> List[str]:
         """Run the default questions stage
@@ -45,98 +215,531 @@ class LeadGenPipeline:
         """
         return self.default_agent.get_default_questions()
     
-    def process_default_answers(self, questions_and_answers: Dict[str, str]) -> None:
+    async def process_default_answers(self, questions_and_answers: Dict[str, str]) -> None:
         """Process the answers to the default questions
         
         Args:
             questions_and_answers: Dictionary mapping questions to answers
         """
         processed_qa = self.default_agent.process_answers(questions_and_answers)
+        self._qa_context = None
+        if processed_qa != self.session.default_questions:
+            # Questions generated from earlier answers no longer apply
+            self.session.generated_personalized_questions = []
         self.session.default_questions = processed_qa
+        await self.checkpoint()
     
-    def run_personalized_questions_stage(self) -> List[str]:
+    async def prewarm_connection(self) -> bool:
+        """Open a connection to the LLM API ahead of the next LLM-backed stage
+        
+        Returns:
+            True if a connection was established
+        """
+        if not self.config.get("http", {}).get("prewarm", True):
+            return False
+        return await self.llm_service.prewarm_async()
+    
+    async def observe_default_answers(self, answers: Dict[str, str]) -> None:
+        """Start generating personalized questions from the default answers given so far
+        
+        Called after each default answer. Once speculation.personalized_questions.min_answers
+        answers are in, generation starts in the background; it is restarted if later
+        answers add too much the running generation has not seen. Returns immediately.
+        
+        Args:
+            answers: Dictionary mapping the questions answered so far to their answers
+        """
+        if not self.speculation_config.get("enabled", False) or self.session.generated_personalized_questions:
+            return
+        
+        answered = {question: answer for question, answer in answers.items() if answer.strip()}
+        if len(answered) < self.speculation_config.get("min_answers", 3):
+            return
+        
+        min_overlap = self.speculation_config.get("min_overlap", 0.5)
+        if self._speculation is not None:
+            if context_overlap(self._speculation.snapshot, answered) >= min_overlap:
+                return
+            self._speculation.cancel()
+            get_speculation_stats("personalized_questions").record_cancel()
+        
+        num_questions = self.config.get("questions", {}).get("personalized_count", 10)
+        self._speculation = SpeculativeTask(
+            answered,
+            self.personalized_agent.generate_questions_async(initial_qa=answered, num_questions=num_questions),
+            stage="personalized_questions"
+        )
+        get_speculation_stats("personalized_questions").record_start()
+    
+    async def _take_reused_questions(self, num_questions: int) -> Optional[List[str]]:
+        """Reuse the questions of an earlier session of the same tenant with near-identical default answers
+        
+        Any background generation started by observe_default_answers is cancelled on a hit.
+        
+        Args:
+            num_questions: Number of personalized questions requested
+        
+        Returns:
+            The reused questions, or None if the index is disabled, the session has no
+            tenant, or there is no close enough match
+        """
+        if self.question_reuse is None or self.session.tenant_id is None:
+            return None
+        
+        match = await asyncio.to_thread(self.question_reuse.lookup, dict(self.session.default_questions), num_questions,
+                                        self.session.tenant_id, self.session.id)
+        if match is None:
+            self.last_question_reuse = {"hit": False}
+            return None
+        
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None:
+            speculation.cancel()
+            get_speculation_stats("personalized_questions").record_cancel()
+        self.last_question_reuse = {"hit": True, "similarity": match["similarity"], "source_session": match["session_id"]}
+        return match["questions"]
+    
+    async def _take_speculative_questions(self) -> Optional[List[str]]:
+        """Use the background personalized questions if they still fit the final answers
+        
+        Returns:
+            The speculatively generated questions, or None if there are none or they
+            were discarded (in which case the background generation is cancelled)
+        """
+        speculation, self._speculation = self._speculation, None
+        if speculation is None:
+            return None
+        
+        requested_at = time.perf_counter()
+        stats = get_speculation_stats("personalized_questions")
+        overlap = context_overlap(speculation.snapshot, self.session.default_questions)
+        if overlap < self.speculation_config.get("min_overlap", 0.5):
+            speculation.cancel()
+            stats.record_miss()
+            self.last_speculation = {"hit": False, "overlap": round(overlap, 3), "saved_seconds": 0.0}
+            logger.info("Speculative personalized questions discarded (overlap %.2f)", overlap)
+            return None
+        
+        try:
+            questions = await speculation.task
+        except Exception as e:
+            stats.record_miss()
+            self.last_speculation = {"hit": False, "overlap": round(overlap, 3), "saved_seconds": 0.0}
+            logger.warning("Speculative personalized questions failed, regenerating: %s", e)
+            return None
+        
+        saved = speculation.saved_seconds(requested_at)
+        stats.record_hit(saved)
+        if current_stage() is not None and speculation.recorder is not None:
+            current_stage().merge(speculation.recorder)
+        self.last_speculation = {"hit": True, "overlap": round(overlap, 3), "saved_seconds": round(saved, 3)}
+        logger.info("Speculative personalized questions used (overlap %.2f, saved %.2fs)", overlap, saved)
+        return questions
+    
+    async def run_personalized_questions_stage(self) -> List[str]:
         """Run the personalized questions stage
         
+        Questions already generated for this session (e.g. before a crash) are
+        returned without another LLM call. Otherwise the questions of an earlier
+        session with near-identical default answers are reused if the question
+        reuse index has one, and questions generated in the background by
+        observe_default_answers are used if they still fit.
+        
         Returns:
             List of personalized questions
         """
         if not self.session.default_questions:
-            raise ValueError("Default questions stage must be completed first")
+            raise StageOrderError("Default questions stage must be completed first")
+        
+        if self.session.generated_personalized_questions:
+            return list(self.session.generated_personalized_questions)
         
         num_questions = self.config.get("questions", {}).get("personalized_count", 10)
-        return self.personalized_agent.generate_questions(
-            initial_qa=self.session.default_questions,
-            num_questions=num_questions
+        with self._stage("personalized_questions"):
+            questions = await self._take_reused_questions(num_questions)
+            reused = questions is not None
+            if questions is None:
+                questions = await self._take_speculative_questions()
+            if questions is None:
+                questions = await self.personalized_agent.generate_questions_async(
+                    initial_qa=self.session.default_questions,
+                    num_questions=num_questions
+                )
+        
+        # Index every newly generated set, speculative or not, for later sessions to reuse
+        if not reused and self.question_reuse is not None and self.session.tenant_id is not None:
+            await run_in_writer(self.question_reuse.add, self.session.id, dict(self.session.default_questions),
+                                list(questions), num_questions, self.session.tenant_id)
+        
+        # Persist the generated questions before the user starts answering them
+        self.session.generated_personalized_questions = list(questions)
+        await self.checkpoint()
+        
+        return questions
+    
+    @property
+    def keyword_draft(self) -> Optional[List[str]]:
+        """Get the most recent background keyword draft
+        
+        Returns:
+            The draft keywords, or None if no draft has completed yet
+        """
+        if self._keyword_draft_done is None:
+            return None
+        return self._keyword_draft_done.task.result()[0]
+    
+    async def observe_personalized_answers(self, answers: Dict[str, str]) -> None:
+        """Refresh the background keyword draft with the personalized answers given so far
+        
+        Called after each personalized answer. Once speculation.keyword_draft.min_answers
+        answers are in, a draft is generated in the background and refreshed every
+        refresh_every new answers; at most one draft runs at a time, and answers
+        arriving meanwhile are picked up when it completes. Returns immediately.
+        
+        Args:
+            answers: Dictionary mapping the questions answered so far to their answers
+        """
+        if not self.keyword_draft_config.get("enabled", False) or self.fused_generation or self.session.keywords:
+            return
+        
+        answered = {question: answer for question, answer in answers.items() if answer.strip()}
+        if len(answered) < self.keyword_draft_config.get("min_answers", 3):
+            return
+        
+        latest = self._keyword_draft or self._keyword_draft_done
+        if latest is not None and len(answered) - len(latest.snapshot) < self.keyword_draft_config.get("refresh_every", 2):
+            return
+        
+        if self._keyword_draft is not None and not self._keyword_draft.task.done():
+            self._keyword_draft_pending = answered
+            return
+        self._start_keyword_draft(answered)
+    
+    def _start_keyword_draft(self, answers: Dict[str, str]) -> None:
+        """Start generating a keyword draft in the background (on the running loop)
+        
+        Args:
+            answers: Personalized answers to draft the keywords from
+        """
+        self._keyword_draft_pending = None
+        draft = SpeculativeTask(answers, self._generate_keyword_draft(answers), stage="keyword_generation")
+        draft.task.add_done_callback(lambda _: self._on_keyword_draft_done(draft))
+        self._keyword_draft = draft
+        get_speculation_stats("keyword_draft").record_start()
+    
+    async def _generate_keyword_draft(self, answers: Dict[str, str]) -> Tuple[List[str], Dict[str, Any]]:
+        """Generate draft keywords from the answers given so far
+        
+        The prompt is compacted to the keyword_generation budget like the final
+        one, since a draft that saw every answer is used as is.
+        
+        Args:
+            answers: Personalized answers to draft the keywords from
+            
+        Returns:
+            Tuple of (draft keywords, prompt-size metrics of the draft's prompt)
+        """
+        all_qa_data = {"Default Questions": self.session.default_questions, "Personalized Questions": answers}
+        context = await self.prompt_compactor.build(all_qa_data, self._answer_summaries)
+        formatted_qa, metrics = self.prompt_compactor.render(context, "keyword_generation")
+        keywords = await self.keyword_agent.generate_keywords_async(
+            all_qa_data=all_qa_data,
+            num_keywords=self.config.get("questions", {}).get("keyword_count", 10),
+            formatted_qa=formatted_qa
         )
+        return keywords, metrics
     
-    def process_personalized_answers(self, questions_and_answers: Dict[str, str]) -> None:
+    def _on_keyword_draft_done(self, draft: SpeculativeTask) -> None:
+        """Keep a completed draft and start the next one if answers arrived meanwhile
+        
+        A failed draft is dropped, but answers that arrived while it ran still
+        get a new draft.
+        
+        Args:
+            draft: The draft that finished
+        """
+        if draft.task.cancelled():
+            return
+        if draft.task.exception() is None:
+            self._keyword_draft_done = draft
+        if self._keyword_draft is draft and self._keyword_draft_pending is not None:
+            self._start_keyword_draft(self._keyword_draft_pending)
+    
+    async def _finalize_keyword_draft(self, num_keywords: int) -> Optional[List[str]]:
+        """Turn the background keyword draft into the final keywords
+        
+        A draft that saw every final answer is used as is; otherwise the draft is
+        updated with the missing answers in one small call.
+        
+        Args:
+            num_keywords: Number of keywords to generate
+            
+        Returns:
+            The final keywords, or None if there is no usable draft
+        """
+        running, self._keyword_draft = self._keyword_draft, None
+        self._keyword_draft_pending = None
+        if running is None and self._keyword_draft_done is None:
+            return None
+        
+        requested_at = time.perf_counter()
+        stats = get_speculation_stats("keyword_draft")
+        if running is not None and not running.task.done():
+            try:
+                await running.task
+            except Exception as e:
+                logger.warning("Background keyword draft failed: %s", e)
+        if running is not None and not running.task.cancelled() and running.task.exception() is None:
+            self._keyword_draft_done = running
+        
+        draft = self._keyword_draft_done
+        if draft is None:
+            stats.record_miss()
+            self.last_keyword_draft = {"used": "none", "saved_seconds": 0.0}
+            return None
+        if current_stage() is not None and draft.recorder is not None:
+            current_stage().merge(draft.recorder)
+        draft_keywords, metrics = draft.task.result()
+        # The keywords come from the draft's prompt, so its size is the stage's
+        self.session.prompt_metrics["keyword_generation"] = metrics
+        
+        missing = {
+            question: answer
+            for question, answer in self.session.personalized_questions.items()
+            if answer.strip() and draft.snapshot.get(question) != answer
+        }
+        if not missing:
+            saved = draft.saved_seconds(requested_at)
+            stats.record_hit(saved)
+            self.last_keyword_draft = {"used": "draft", "saved_seconds": round(saved, 3)}
+            logger.info("Keyword draft reused (saved %.2fs)", saved)
+            return draft_keywords
+        
+        refine_started = time.perf_counter()
+        try:
+            keywords = await self.keyword_agent.refine_keywords_async(draft_keywords, missing, num_keywords)
+        except Exception as e:
+            stats.record_miss()
+            self.last_keyword_draft = {"used": "none", "saved_seconds": 0.0}
+            logger.warning("Keyword draft refinement failed, regenerating: %s", e)
+            return None
+        # A full generation would have taken about as long as the draft did
+        saved = max(0.0, (draft.finished_at - draft.started_at) - (time.perf_counter() - refine_started))
+        stats.record_refine(saved)
+        self.last_keyword_draft = {"used": "refined", "new_answers": len(missing), "saved_seconds": round(saved, 3)}
+        logger.info("Keyword draft refined with %d new answers (saved %.2fs)", len(missing), saved)
+        return keywords
+    
+    async def process_personalized_answers(self, questions_and_answers: Dict[str, str]) -> None:
         """Process the answers to the personalized questions
         
         Args:
             questions_and_answers: Dictionary mapping questions to answers
         """
         processed_qa = self.personalized_agent.process_answers(questions_and_answers)
+        self._qa_context = None
         self.session.personalized_questions = processed_qa
+        await self.checkpoint()
     
-    def run_keyword_generation_stage(self) -> List[str]:
-        """Run the keyword generation stage
+    def _get_all_qa_data(self) -> Dict[str, Dict[str, str]]:
+        """Get the session's questions and answers grouped by stage
         
         Returns:
-            List of generated keywords
+            Dictionary mapping stage names to Q&A dictionaries
         """
-        if not self.session.personalized_questions:
-            raise ValueError("Personalized questions stage must be completed first")
-        
-        all_qa_data = {
+        return {
             "Default Questions": self.session.default_questions,
             "Personalized Questions": self.session.personalized_questions
         }
+    
+    async def _build_keywords(self, keywords: List[str]) -> List[Keyword]:
+        """Turn generated keyword texts into scored, classified and deduplicated Keyword objects
+        
+        Scoring reads the keyword index, so it runs in a worker thread.
+        
+        Args:
+            keywords: Keyword texts as generated
+            
+        Returns:
+            List of Keyword objects
+        """
+        if self.keyword_scorer is None:
+            return [Keyword(text=k) for k in keywords]
+        return await asyncio.to_thread(self.keyword_scorer.score, keywords, self._get_all_qa_data(), self.session.id)
+    
+    async def _render_qa_context(self, stage: str) -> str:
+        """Render the compacted Q&A context within a stage's token budget
+        
+        The context is built once per set of answers and reused across stages;
+        the resulting prompt-size metrics are recorded in the session.
+        
+        Args:
+            stage: Stage name as used in prompt_budget.stages
+            
+        Returns:
+            The formatted Q&A text for the stage's prompt
+        """
+        if self._qa_context is None:
+            self._qa_context = await self.prompt_compactor.build(self._get_all_qa_data(), self._answer_summaries)
+        formatted_qa, metrics = self.prompt_compactor.render(self._qa_context, stage)
+        self.session.prompt_metrics[stage] = metrics
+        return formatted_qa
+    
+    async def run_keyword_generation_stage(self) -> List[str]:
+        """Run the keyword generation stage
+        
+        A background keyword draft (see observe_personalized_answers) is reused
+        or cheaply updated instead of generating the keywords from scratch.
+        
+        Returns:
+            List of generated keywords
+        """
+        if not self.session.personalized_questions:
+            raise StageOrderError("Personalized questions stage must be completed first")
         
         num_keywords = self.config.get("questions", {}).get("keyword_count", 10)
-        keywords = self.keyword_agent.generate_keywords(
-            all_qa_data=all_qa_data,
-            num_keywords=num_keywords
-        )
+        with self._stage("keyword_generation"):
+            keywords = await self._finalize_keyword_draft(num_keywords)
+            if keywords is None:
+                all_qa_data = self._get_all_qa_data()
+                formatted_qa = await self._render_qa_context("keyword_generation")
+                keywords = await self.keyword_agent.generate_keywords_async(
+                    all_qa_data=all_qa_data,
+                    num_keywords=num_keywords,
+                    formatted_qa=formatted_qa
+                )
         
         # Convert to Keyword objects
-        keyword_objects = [Keyword(text=k) for k in keywords]
-        self.session.keywords = keyword_objects
+        self.session.keywords = await self._build_keywords(keywords)
+        await self.checkpoint()
         
-        return keywords
+        return [k.text for k in self.session.keywords]
     
-    def run_icp_generation_stage(self) -> Dict[str, Any]:
+    async def run_icp_generation_stage(self) -> Dict[str, Any]:
         """Run the ICP generation stage
         
         Returns:
             Dictionary containing the Ideal Customer Profile
         """
         if not self.session.keywords:
-            raise ValueError("Keyword generation stage must be completed first")
-        
-        all_qa_data = {
-            "Default Questions": self.session.default_questions,
-            "Personalized Questions": self.session.personalized_questions
-        }
+            raise StageOrderError("Keyword generation stage must be completed first")
         
+        all_qa_data = self._get_all_qa_data()
         keywords = [k.text for k in self.session.keywords]
         
-        icp_data = self.icp_agent.generate_icp(
-            all_qa_data=all_qa_data,
-            keywords=keywords
-        )
+        with self._stage("icp_generation"):
+            formatted_qa = await self._render_qa_context("icp_generation")
+            icp_data = await self.icp_agent.generate_icp_async(
+                all_qa_data=all_qa_data,
+                keywords=keywords,
+                formatted_qa=formatted_qa
+            )
         
         # Set the ICP in the session
         self.session.ideal_customer_profile = IdealCustomerProfile(summary=icp_data.get("profile"))
+        await self.checkpoint()
         
         return icp_data
     
+    async def run_fused_generation_stage(self) -> Dict[str, Any]:
+        """Run the keyword and ICP generation stages as a single LLM call
+        
+        Fills session.keywords and session.ideal_customer_profile together,
+        sending the Q&A context once instead of twice.
+        
+        Returns:
+            Dictionary with the generated keywords, the profile summary and the structured profile
+        """
+        if not self.session.personalized_questions:
+            raise StageOrderError("Personalized questions stage must be completed first")
+        
+        num_keywords = self.config.get("questions", {}).get("keyword_count", 10)
+        with self._stage("fused_generation"):
+            formatted_qa = await self._render_qa_context("fused_generation")
+            output = await self.fused_agent.generate_async(
+                all_qa_data=self._get_all_qa_data(),
+                num_keywords=num_keywords,
+                formatted_qa=formatted_qa
+            )
+        
+        self.session.keywords = await self._build_keywords(output.keywords)
+        self.session.ideal_customer_profile = output.profile
+        await self.checkpoint()
+        
+        return {
+            "keywords": [k.text for k in self.session.keywords],
+            "profile": output.profile.summary,
+            "structured_profile": output.profile.model_dump()
+        }
+    
+    async def run_icp_generation_stage_stream(self) -> AsyncIterator[str]:
+        """Run the ICP generation stage, yielding the profile as it is generated
+        
+        The full text is stored in the session once the stream completes, and
+        the time to the first delta is kept in icp_time_to_first_token.
+        
+        Yields:
+            Text deltas of the Ideal Customer Profile
+        """
+        if not self.session.keywords:
+            raise StageOrderError("Keyword generation stage must be completed first")
+        
+        all_qa_data = self._get_all_qa_data()
+        
+        keywords = [k.text for k in self.session.keywords]
+        
+        started = time.perf_counter()
+        self.icp_time_to_first_token = None
+        chunks = []
+        with self._stage("icp_generation"):
+            formatted_qa = await self._render_qa_context("icp_generation")
+            async for delta in self.icp_agent.generate_icp_stream(all_qa_data=all_qa_data, keywords=keywords,
+                                                                  formatted_qa=formatted_qa):
+                if self.icp_time_to_first_token is None:
+                    self.icp_time_to_first_token = time.perf_counter() - started
+                chunks.append(delta)
+                yield delta
+        
+        # Set the ICP in the session
+        self.session.ideal_customer_profile = IdealCustomerProfile(summary="".join(chunks))
+        await self.checkpoint()
+    
     def save_session(self) -> str:
-        """Save the current session
+        """Save the current session, blocking until it is written
         
         Returns:
             Path to the saved session file
         """
-        return save_session_data(self.session.dict(), self.data_dir)
+        return self._save(self.session)
+    
+    def _save(self, session: QuestionSession) -> str:
+        """Write a session to the storage and the keyword index (blocking)
+        
+        Args:
+            session: The session to save
+            
+        Returns:
+            Path to the saved session file
+        """
+        location = self.storage.save(session)
+        
+        # Keep the cross-session keyword index up to date as sessions are saved
+        if self.keyword_index is not None and (session.keywords or session.ideal_customer_profile):
+            self.keyword_index.index_session(session)
+        
+        return location
+    
+    def load_session(self, session_id: str) -> QuestionSession:
+        """Replace the current session with a stored one
+        
+        Args:
+            session_id: ID of the stored session
+            
+        Returns:
+            The loaded session
+        """
+        self.session = self.storage.load(session_id)
+        return self.session
     
     def get_session_summary(self) -> Dict[str, Any]:
         """Get a summary of the current session
@@ -151,4 +754,169 @@ class LeadGenPipeline:
             "personalized_questions_count": len(self.session.personalized_questions),
             "keywords_count": len(self.session.keywords),
             "has_icp": self.session.ideal_customer_profile is not None
-        }
\ No newline at end of file
+        }
+
+
+class LeadGenPipeline:
+    """Pipeline for orchestrating the lead generation process
+    
+    Thin synchronous wrapper around AsyncLeadGenPipeline. The LLM-backed
+    stages run on the shared background event loop.
+    """
+    
+    def __init__(self, registry: Optional[ServiceRegistry] = None, session_id: Optional[str] = None):
+        """Initialize the lead generation pipeline
+        
+        Args:
+            registry: Service registry to take shared services from
+                (defaults to the process-wide registry)
+            session_id: ID for the new session (a random ID is generated if omitted)
+        """
+        self.async_pipeline = AsyncLeadGenPipeline(registry, session_id=session_id)
+    
+    @classmethod
+    def resume(cls, session_id: str, registry: Optional[ServiceRegistry] = None) -> "LeadGenPipeline":
+        """Create a pipeline that continues a stored session
+        
+        Args:
+            session_id: ID of the stored session
+            registry: Service registry to take shared services from
+            
+        Returns:
+            A pipeline positioned at the session's first incomplete stage
+        """
+        pipeline = cls(registry, session_id=session_id)
+        pipeline.load_session(session_id)
+        return pipeline
+    
+    def next_stage(self) -> Optional[str]:
+        """Get the first stage the session has not completed
+        
+        Returns:
+            Name of the stage, or None if every stage is complete
+        """
+        return self.async_pipeline.next_stage()
+    
+    def __getattr__(self, name: str) -> Any:
+        """Expose the wrapped pipeline's attributes (session, config, agents, ...)"""
+        if name == "async_pipeline":
+            raise AttributeError(name)
+        return getattr(self.async_pipeline, name)
+    
+    def run_default_questions_stage(self) -> List[str]:
+        """Run the default questions stage
+        
+        Returns:
+            List of default questions
+        """
+        return self.async_pipeline.run_default_questions_stage()
+    
+    def process_default_answers(self, questions_and_answers: Dict[str, str]) -> None:
+        """Process the answers to the default questions
+        
+        Args:
+            questions_and_answers: Dictionary mapping questions to answers
+        """
+        run_sync(self.async_pipeline.process_default_answers(questions_and_answers))
+    
+    def observe_default_answers(self, answers: Dict[str, str]) -> None:
+        """Start generating personalized questions from the default answers given so far
+        
+        Returns immediately; generation continues on the background event loop.
+        
+        Args:
+            answers: Dictionary mapping the questions answered so far to their answers
+        """
+        run_sync(self.async_pipeline.observe_default_answers(dict(answers)))
+    
+    def prewarm_connection(self) -> None:
+        """Start opening a connection to the LLM API in the background
+        
+        Returns immediately, so it can be called while the user is still typing.
+        """
+        submit(self.async_pipeline.prewarm_connection())
+    
+    def run_personalized_questions_stage(self) -> List[str]:
+        """Run the personalized questions stage
+        
+        Returns:
+            List of personalized questions
+        """
+        return run_sync(self.async_pipeline.run_personalized_questions_stage())
+    
+    def observe_personalized_answers(self, answers: Dict[str, str]) -> None:
+        """Refresh the background keyword draft with the personalized answers given so far
+        
+        Returns immediately; the draft is generated on the background event loop.
+        
+        Args:
+            answers: Dictionary mapping the questions answered so far to their answers
+        """
+        run_sync(self.async_pipeline.observe_personalized_answers(dict(answers)))
+    
+    def process_personalized_answers(self, questions_and_answers: Dict[str, str]) -> None:
+        """Process the answers to the personalized questions
+        
+        Args:
+            questions_and_answers: Dictionary mapping questions to answers
+        """
+        run_sync(self.async_pipeline.process_personalized_answers(questions_and_answers))
+    
+    def run_keyword_generation_stage(self) -> List[str]:
+        """Run the keyword generation stage
+        
+        Returns:
+            List of generated keywords
+        """
+        return run_sync(self.async_pipeline.run_keyword_generation_stage())
+    
+    def run_icp_generation_stage(self) -> Dict[str, Any]:
+        """Run the ICP generation stage
+        
+        Returns:
+            Dictionary containing the Ideal Customer Profile
+        """
+        return run_sync(self.async_pipeline.run_icp_generation_stage())
+    
+    def run_fused_generation_stage(self) -> Dict[str, Any]:
+        """Run the keyword and ICP generation stages as a single LLM call
+        
+        Returns:
+            Dictionary with the generated keywords, the profile summary and the structured profile
+        """
+        return run_sync(self.async_pipeline.run_fused_generation_stage())
+    
+    def run_icp_generation_stage_stream(self) -> Iterator[str]:
+        """Run the ICP generation stage, yielding the profile as it is generated
+        
+        Returns:
+            Iterator of text deltas of the Ideal Customer Profile
+        """
+        return iter_sync(self.async_pipeline.run_icp_generation_stage_stream())
+    
+    def save_session(self) -> str:
+        """Save the current session
+        
+        Returns:
+            Path to the saved session file
+        """
+        return self.async_pipeline.save_session()
+    
+    def load_session(self, session_id: str) -> QuestionSession:
+        """Replace the current session with a stored one
+        
+        Args:
+            session_id: ID of the stored session
+            
+        Returns:
+            The loaded session
+        """
+        return self.async_pipeline.load_session(session_id)
+    
+    def get_session_summary(self) -> Dict[str, Any]:
+        """Get a summary of the current session
+        
+        Returns:
+            Dictionary containing a summary of the session
+        """
+        return self.async_pipeline.get_session_summary()
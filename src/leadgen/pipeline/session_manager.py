@@ -0,0 +1,429 @@
+# Bounded in-memory session manager with LRU eviction to the session storage
+
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Deque, Tuple
+
+from leadgen.entity.models import QuestionSession
+from leadgen.pipeline.lead_gen_pipeline import AsyncLeadGenPipeline
+from leadgen.services.registry import ServiceRegistry, get_registry
+from leadgen.utils.async_helpers import run_in_writer
+
+logger = logging.getLogger(__name__)
+
+
+class SessionManager:
+    """Keeps the sessions of a long-running service within a memory budget
+
+    Sessions live in one of three tiers, least recently used first out:
+
+    - live: the session's AsyncLeadGenPipeline, kept for the max_live most
+      recently used sessions and for sessions with a request in progress;
+    - compact: the session alone, as zlib-compressed JSON (a few hundred bytes
+      instead of the pipeline, its agents and the parsed session);
+    - spilled: saved to the session storage and dropped from memory once the
+      live and compact tiers exceed memory_budget_bytes.
+
+    acquire() brings a session back from any tier, so callers never see the
+    difference. A live pipeline holding speculative results (background
+    questions or a keyword draft) is compacted only after the idle ones, and
+    its background work is cancelled when it is.
+
+    The methods that touch the storage are coroutines for the background loop:
+    loads and saves run on the writer thread with the lock released, and the
+    lock only guards the tier bookkeeping.
+    """
+
+    def __init__(self, registry: Optional[ServiceRegistry] = None, memory_budget_bytes: int = 256 * 2 ** 20,
+                 max_live: int = 256, pipeline_overhead_bytes: int = 8192, compression_level: int = 6,
+                 rate_window_seconds: float = 300.0):
+        """Initialize the session manager
+
+        Args:
+            registry: Service registry to take shared services from
+            memory_budget_bytes: Memory the live and compact tiers may use together (estimated)
+            max_live: Most recently used sessions kept as live pipelines
+            pipeline_overhead_bytes: Estimated size of a pipeline beyond its session
+            compression_level: zlib level for the compact tier
+            rate_window_seconds: Window the eviction rate is measured over
+        """
+        self.registry = registry or get_registry()
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_live = max_live
+        self.pipeline_overhead_bytes = pipeline_overhead_bytes
+        self.compression_level = compression_level
+        self.rate_window_seconds = rate_window_seconds
+        self._live: "OrderedDict[str, AsyncLeadGenPipeline]" = OrderedDict()
+        self._live_sizes: Dict[str, int] = {}
+        self._compact: "OrderedDict[str, bytes]" = OrderedDict()
+        self._spilling: Dict[str, bytes] = {}
+        self._in_use: Dict[str, int] = {}
+        self._memory_bytes = 0
+        self._evictions: Deque[float] = deque()
+        self._lock = threading.RLock()
+        self.stats = {
+            "created": 0,
+            "compactions": 0,
+            "evictions": 0,
+            "rehydrated_compact": 0,
+            "rehydrated_storage": 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], registry: Optional[ServiceRegistry] = None) -> "SessionManager":
+        """Create a session manager from the sessions section of config.yaml
+
+        Args:
+            config: The sessions configuration dictionary
+            registry: Service registry to take shared services from
+
+        Returns:
+            A configured SessionManager
+        """
+        return cls(
+            registry=registry,
+            memory_budget_bytes=int(config.get("memory_budget_mb", 256) * 2 ** 20),
+            max_live=config.get("max_live", 256),
+            pipeline_overhead_bytes=config.get("pipeline_overhead_bytes", 8192),
+            compression_level=config.get("compression_level", 6),
+            rate_window_seconds=config.get("rate_window_seconds", 300.0),
+        )
+
+    def __contains__(self, session_id: str) -> bool:
+        """Whether a session is resident (live, compact or being spilled)"""
+        with self._lock:
+            return session_id in self._live or session_id in self._compact or session_id in self._spilling
+
+    def __len__(self) -> int:
+        """Number of resident sessions"""
+        with self._lock:
+            return len(self._live) + len(self._compact) + len(self._spilling)
+
+    async def exists(self, session_id: str) -> bool:
+        """Whether a session is resident or in the storage
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            True if acquire() can return the session
+        """
+        return session_id in self or await run_in_writer(self.registry.session_storage.exists, session_id)
+
+    def create(self, session_id: Optional[str] = None) -> AsyncLeadGenPipeline:
+        """Start a session and acquire it
+
+        Args:
+            session_id: ID for the new session (a random ID is generated if omitted)
+
+        Returns:
+            The new session's pipeline (call release() when done with it)
+        """
+        pipeline = AsyncLeadGenPipeline(self.registry, session_id=session_id)
+        with self._lock:
+            self.stats["created"] += 1
+            self._in_use[pipeline.session.id] = 1
+            self._add_live(pipeline.session.id, pipeline)
+        return pipeline
+
+    async def acquire(self, session_id: str) -> AsyncLeadGenPipeline:
+        """Get a session's pipeline, bringing it back from the compact tier or the storage
+
+        The session is not compacted or evicted until it is released. A session
+        that is only in the storage is loaded on the writer thread, after any
+        save of it still queued there.
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            The session's pipeline
+
+        Raises:
+            KeyError: If the session is neither resident nor in the storage
+        """
+        with self._lock:
+            self._in_use[session_id] = self._in_use.get(session_id, 0) + 1
+            pipeline = self._take_resident(session_id)
+            if pipeline is not None:
+                return pipeline
+
+        try:
+            session = await run_in_writer(self.registry.session_storage.load, session_id)
+        except BaseException:
+            with self._lock:
+                self._unpin(session_id)
+            raise
+        with self._lock:
+            # Another request for the session may have loaded it meanwhile
+            pipeline = self._live.get(session_id)
+            if pipeline is not None:
+                self._live.move_to_end(session_id)
+                return pipeline
+            pipeline = AsyncLeadGenPipeline(self.registry, session_id=session_id)
+            pipeline.session = session
+            self.stats["rehydrated_storage"] += 1
+            self._add_live(session_id, pipeline)
+            return pipeline
+
+    def _take_resident(self, session_id: str) -> Optional[AsyncLeadGenPipeline]:
+        """Get a resident session's pipeline, rehydrating it from compressed JSON if needed (lock must be held)
+
+        Returns:
+            The pipeline, or None if the session is only in the storage
+        """
+        pipeline = self._live.get(session_id)
+        if pipeline is not None:
+            self._live.move_to_end(session_id)
+            return pipeline
+
+        compact = self._compact.pop(session_id, None)
+        if compact is not None:
+            self._memory_bytes -= len(compact)
+        else:
+            # A spill still being written; the live copy supersedes it
+            compact = self._spilling.pop(session_id, None)
+            if compact is None:
+                return None
+        pipeline = AsyncLeadGenPipeline(self.registry, session_id=session_id)
+        pipeline.session = QuestionSession.model_validate_json(zlib.decompress(compact))
+        self.stats["rehydrated_compact"] += 1
+        self._add_live(session_id, pipeline)
+        return pipeline
+
+    async def release(self, session_id: str) -> None:
+        """Mark a request on a session as finished and bring memory back within the budget
+
+        Tiers are updated under the lock; the sessions spilled as a result are
+        then saved on the writer thread.
+
+        Args:
+            session_id: ID of the session
+        """
+        with self._lock:
+            self._unpin(session_id)
+            pipeline = self._live.get(session_id)
+            if pipeline is not None:
+                # The session may have grown during the request
+                self._memory_bytes -= self._live_sizes[session_id]
+                self._live_sizes[session_id] = self._estimate(pipeline)
+                self._memory_bytes += self._live_sizes[session_id]
+            spills = self._enforce()
+        await self._write_spills(spills)
+
+    def _unpin(self, session_id: str) -> None:
+        """Drop one in-use mark of a session (lock must be held)"""
+        count = self._in_use.get(session_id, 0) - 1
+        if count > 0:
+            self._in_use[session_id] = count
+        else:
+            self._in_use.pop(session_id, None)
+
+    def _estimate(self, pipeline: AsyncLeadGenPipeline) -> int:
+        """Estimate the memory a live pipeline uses"""
+        return self.pipeline_overhead_bytes + len(pipeline.session.model_dump_json())
+
+    def _add_live(self, session_id: str, pipeline: AsyncLeadGenPipeline) -> None:
+        """Put a pipeline in the live tier as the most recently used (lock must be held)"""
+        self._live[session_id] = pipeline
+        self._live_sizes[session_id] = self._estimate(pipeline)
+        self._memory_bytes += self._live_sizes[session_id]
+
+    def _enforce(self) -> List[Tuple[str, bytes]]:
+        """Compact the least recently used pipelines, then pick compact sessions to spill, until within limits (lock must be held)
+
+        Returns:
+            The sessions to spill, to be passed to _write_spills once the lock is released
+        """
+        while len(self._live) > self.max_live or (self._memory_bytes > self.memory_budget_bytes and self._live):
+            if not self._compact_one():
+                break
+        spills = []
+        while self._memory_bytes > self.memory_budget_bytes and self._compact:
+            session_id = next(iter(self._compact))
+            spills.append(self._start_spill(session_id, self._compact[session_id]))
+        return spills
+
+    def _compact_one(self) -> bool:
+        """Compact the least recently used idle pipeline, preferring ones without background work
+
+        Returns:
+            False if every live pipeline is in use
+        """
+        candidates = [session_id for session_id in self._live if session_id not in self._in_use]
+        if not candidates:
+            return False
+        session_id = next(
+            (candidate for candidate in candidates if not self._live[candidate].has_background_work()),
+            candidates[0]
+        )
+        self._compact[session_id] = self._compress(self._drop_live(session_id))
+        self._memory_bytes += len(self._compact[session_id])
+        self.stats["compactions"] += 1
+        return True
+
+    def _drop_live(self, session_id: str) -> AsyncLeadGenPipeline:
+        """Remove a pipeline from the live tier and cancel its background work (lock must be held)"""
+        pipeline = self._live.pop(session_id)
+        self._memory_bytes -= self._live_sizes.pop(session_id)
+        pipeline.cancel_background_work()
+        return pipeline
+
+    def _compress(self, pipeline: AsyncLeadGenPipeline) -> bytes:
+        """Get a pipeline's session as compressed JSON"""
+        return zlib.compress(pipeline.session.model_dump_json().encode("utf-8"), self.compression_level)
+
+    def _start_spill(self, session_id: str, compact: bytes) -> Tuple[str, bytes]:
+        """Move a session out of the memory budget while it is saved (lock must be held)
+
+        Until the save finishes it stays readable, so acquire() never loads an
+        older copy from the storage.
+        """
+        if session_id in self._compact:
+            self._memory_bytes -= len(self._compact.pop(session_id))
+        self._spilling[session_id] = compact
+        return session_id, compact
+
+    async def _write_spills(self, spills: List[Tuple[str, bytes]]) -> None:
+        """Save spilled sessions on the writer thread and drop them from memory
+
+        A session acquired again before its save is queued is not saved (its
+        live copy supersedes it). A session that fails to save is put back in
+        the compact tier (unless it was acquired meanwhile) and retried on a
+        later release.
+
+        Raises:
+            Exception: The first save error, after every spill was attempted
+        """
+        error: Optional[BaseException] = None
+        for session_id, compact in spills:
+            with self._lock:
+                if self._spilling.get(session_id) is not compact:
+                    # Acquired again (or spilled again with newer data) while earlier saves ran
+                    continue
+            # Queued on the writer in the same loop step as the check, so it can't overtake newer saves
+            try:
+                await run_in_writer(
+                    self.registry.session_storage.save, QuestionSession.model_validate_json(zlib.decompress(compact))
+                )
+            except Exception as e:
+                with self._lock:
+                    if self._spilling.get(session_id) is compact:
+                        del self._spilling[session_id]
+                        self._compact[session_id] = compact
+                        self._compact.move_to_end(session_id, last=False)
+                        self._memory_bytes += len(compact)
+                error = error or e
+                continue
+            with self._lock:
+                if self._spilling.get(session_id) is compact:
+                    del self._spilling[session_id]
+                self._record_eviction()
+            logger.debug("Session %s evicted to storage", session_id)
+        if error is not None:
+            raise error
+
+    async def evict(self, session_id: str) -> bool:
+        """Save a session to the storage and drop it from memory now
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            False if the session was not resident or is in use
+        """
+        with self._lock:
+            if session_id in self._in_use:
+                return False
+            if session_id in self._live:
+                spill = self._start_spill(session_id, self._compress(self._drop_live(session_id)))
+            elif session_id in self._compact:
+                spill = self._start_spill(session_id, self._compact[session_id])
+            else:
+                return False
+        await self._write_spills([spill])
+        return True
+
+    def _record_eviction(self) -> None:
+        """Count an eviction to the storage (lock must be held)"""
+        self._evictions.append(time.monotonic())
+        self.stats["evictions"] += 1
+
+    def eviction_rate(self) -> float:
+        """Get the number of evictions per minute over the rate window
+
+        Returns:
+            Evictions per minute
+        """
+        with self._lock:
+            cutoff = time.monotonic() - self.rate_window_seconds
+            while self._evictions and self._evictions[0] < cutoff:
+                self._evictions.popleft()
+            return len(self._evictions) * 60.0 / self.rate_window_seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the residency and eviction counters
+
+        Returns:
+            Dictionary with live, compact and in-use session counts, estimated
+            memory, the budget, the eviction rate and the cumulative counters
+        """
+        eviction_rate = self.eviction_rate()
+        with self._lock:
+            return {
+                "live": len(self._live),
+                "compact": len(self._compact),
+                "in_use": len(self._in_use),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "evictions_per_minute": round(eviction_rate, 3),
+                **self.stats,
+            }
+
+    def render_prometheus(self) -> str:
+        """Render the session metrics in the Prometheus text exposition format
+
+        Returns:
+            The exposition text
+        """
+        stats = self.get_stats()
+        lines = [
+            "# TYPE leadgen_sessions_resident gauge",
+            f'leadgen_sessions_resident{{tier="live"}} {stats["live"]}',
+            f'leadgen_sessions_resident{{tier="compact"}} {stats["compact"]}',
+            "# TYPE leadgen_sessions_in_use gauge",
+            f"leadgen_sessions_in_use {stats['in_use']}",
+            "# TYPE leadgen_sessions_memory_bytes gauge",
+            f"leadgen_sessions_memory_bytes {stats['memory_bytes']}",
+            "# TYPE leadgen_sessions_memory_budget_bytes gauge",
+            f"leadgen_sessions_memory_budget_bytes {stats['memory_budget_bytes']}",
+            "# TYPE leadgen_sessions_evictions_per_minute gauge",
+            f"leadgen_sessions_evictions_per_minute {stats['evictions_per_minute']:g}",
+            "# TYPE leadgen_sessions_created_total counter",
+            f"leadgen_sessions_created_total {stats['created']}",
+            "# TYPE leadgen_sessions_compactions_total counter",
+            f"leadgen_sessions_compactions_total {stats['compactions']}",
+            "# TYPE leadgen_sessions_evictions_total counter",
+            f"leadgen_sessions_evictions_total {stats['evictions']}",
+            "# TYPE leadgen_sessions_rehydrations_total counter",
+            f'leadgen_sessions_rehydrations_total{{source="compact"}} {stats["rehydrated_compact"]}',
+            f'leadgen_sessions_rehydrations_total{{source="storage"}} {stats["rehydrated_storage"]}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    async def spill_all(self) -> None:
+        """Save every resident session that is not in use to the storage (e.g. on shutdown)
+
+        The sessions are copied under the lock and written on the writer thread.
+        """
+        with self._lock:
+            sessions = [self._live[session_id].session.model_copy(deep=True)
+                        for session_id in self._live if session_id not in self._in_use]
+            compacts = list(self._compact.values())
+        sessions.extend(QuestionSession.model_validate_json(zlib.decompress(compact)) for compact in compacts)
+        storage = self.registry.session_storage
+        await run_in_writer(storage.save_many, sessions)
+        await run_in_writer(storage.flush)
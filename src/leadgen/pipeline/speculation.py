@@ -0,0 +1,175 @@
+# Helpers for speculative LLM work started while the user is still answering
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Awaitable, Optional
+
+from leadgen.services.instrumentation import StageRecorder, stage_scope
+from leadgen.services.keyword_index import tokenize, stem_token
+
+logger = logging.getLogger(__name__)
+
+
+def _answer_tokens(answers: Dict[str, str]) -> set:
+    """Get the stemmed tokens of a set of answers (question text is fixed, so it is left out)
+
+    Args:
+        answers: Dictionary mapping questions to answers
+
+    Returns:
+        Set of stemmed tokens
+    """
+    return {stem_token(token) for answer in answers.values() for token in tokenize(answer)}
+
+
+def context_overlap(speculated: Dict[str, str], final: Dict[str, str]) -> float:
+    """Measure how much of the final answers a speculative run already saw
+
+    Args:
+        speculated: Answers the speculative run was started with
+        final: Answers available now
+
+    Returns:
+        Fraction (0-1) of the final answers' distinct words present in the speculated answers
+    """
+    final_tokens = _answer_tokens(final)
+    if not final_tokens:
+        return 1.0
+    return len(final_tokens & _answer_tokens(speculated)) / len(final_tokens)
+
+
+class SpeculativeTask:
+    """A background LLM call started from a snapshot of partial answers"""
+
+    def __init__(self, snapshot: Dict[str, str], coro: Awaitable[Any], stage: Optional[str] = None):
+        """Start the task on the running event loop
+
+        Args:
+            snapshot: Answers the task was started with
+            coro: Coroutine producing the speculative result
+            stage: Stage the result is for; LLM calls made by the task are then
+                collected in recorder so the stage can take them over if it uses the result
+        """
+        self.snapshot = dict(snapshot)
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.recorder: Optional[StageRecorder] = None
+        if stage is None:
+            self.task = asyncio.ensure_future(coro)
+        else:
+            # The task copies the current context, so its calls land in this recorder
+            with stage_scope(stage) as self.recorder:
+                self.task = asyncio.ensure_future(coro)
+        self.task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: "asyncio.Future[Any]") -> None:
+        """Record the finish time and retrieve any exception so it is never reported as unhandled"""
+        self.finished_at = time.perf_counter()
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Speculative task failed: %s", task.exception())
+
+    def saved_seconds(self, requested_at: float) -> float:
+        """Get the wait time the speculation saved for a request made at requested_at
+
+        Args:
+            requested_at: perf_counter time at which the result was requested
+
+        Returns:
+            Seconds of generation that had already happened by the time of the request
+        """
+        end = requested_at if self.finished_at is None else min(self.finished_at, requested_at)
+        return max(0.0, end - self.started_at)
+
+    def cancel(self) -> None:
+        """Cancel the task if it is still running"""
+        self.task.cancel()
+
+
+class SpeculationStats:
+    """Process-wide counters for speculative generation"""
+
+    def __init__(self):
+        """Initialize the counters"""
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self.refined = 0
+        self.saved_seconds = 0.0
+
+    def record_start(self) -> None:
+        """Count a started speculation"""
+        with self._lock:
+            self.started += 1
+
+    def record_cancel(self) -> None:
+        """Count a speculation cancelled because the answers changed"""
+        with self._lock:
+            self.cancelled += 1
+
+    def record_hit(self, saved_seconds: float) -> None:
+        """Count a speculative result that was used
+
+        Args:
+            saved_seconds: Wait time saved by the speculation
+        """
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += saved_seconds
+
+    def record_refine(self, saved_seconds: float) -> None:
+        """Count a speculative result that was used after a cheap update call
+
+        Args:
+            saved_seconds: Wait time saved compared to a full generation
+        """
+        with self._lock:
+            self.refined += 1
+            self.saved_seconds += saved_seconds
+
+    def record_miss(self) -> None:
+        """Count a speculative result that was discarded at request time"""
+        with self._lock:
+            self.misses += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the counters
+
+        Returns:
+            Dictionary with counts, hit rate and total/average saved seconds
+        """
+        with self._lock:
+            used = self.hits + self.refined + self.misses
+            saving = self.hits + self.refined
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "refined": self.refined,
+                "misses": self.misses,
+                "cancelled": self.cancelled,
+                "hit_rate": saving / used if used else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "average_saved_seconds": round(self.saved_seconds / saving, 3) if saving else 0.0,
+            }
+
+
+_stats: Dict[str, SpeculationStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_speculation_stats(kind: str = "personalized_questions") -> SpeculationStats:
+    """Get the process-wide counters for one kind of speculation
+
+    Args:
+        kind: Speculation kind, e.g. "personalized_questions" or "keyword_draft"
+
+    Returns:
+        The shared SpeculationStats instance for the kind
+    """
+    with _stats_lock:
+        if kind not in _stats:
+            _stats[kind] = SpeculationStats()
+        return _stats[kind]
@@ -0,0 +1,61 @@
+# Shared pooled HTTP client for Groq API calls
+
+import importlib.util
+from typing import Dict, Any, List, Callable, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "https://api.groq.com"
+
+
+def http2_available() -> bool:
+    """Check whether the h2 package needed for HTTP/2 is installed
+
+    Returns:
+        True if httpx can negotiate HTTP/2
+    """
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(config: Dict[str, Any], response_hooks: Optional[List[Callable]] = None) -> httpx.AsyncClient:
+    """Create the pooled async HTTP client shared by every Groq model
+
+    Args:
+        config: The http section of config.yaml
+        response_hooks: Optional async httpx response hooks (e.g. the scheduler's header hook)
+
+    Returns:
+        A configured httpx.AsyncClient
+    """
+    limits = httpx.Limits(
+        max_connections=config.get("max_connections", 100),
+        max_keepalive_connections=config.get("max_keepalive_connections", 20),
+        keepalive_expiry=config.get("keepalive_expiry_seconds", 120),
+    )
+    timeout = httpx.Timeout(config.get("timeout_seconds", 60), connect=config.get("connect_timeout_seconds", 10))
+    return httpx.AsyncClient(
+        http2=config.get("http2", True) and http2_available(),
+        limits=limits,
+        timeout=timeout,
+        event_hooks={"response": list(response_hooks or [])},
+    )
+
+
+async def prewarm_connection(client: httpx.AsyncClient, base_url: Optional[str] = None) -> bool:
+    """Open a pooled connection to the API host ahead of the first real request
+
+    The response itself is irrelevant; the point is to complete DNS, TCP and
+    TLS setup so the connection sits in the keep-alive pool.
+
+    Args:
+        client: The shared HTTP client
+        base_url: API base URL (defaults to the public Groq endpoint)
+
+    Returns:
+        True if a connection was established
+    """
+    try:
+        await client.head(base_url or DEFAULT_BASE_URL)
+        return True
+    except httpx.HTTPError:
+        return False
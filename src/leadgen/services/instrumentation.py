@@ -0,0 +1,456 @@
+# Stage and LLM call instrumentation with Prometheus and span exports
+
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Iterator, Tuple, Callable, TypeVar
+
+from leadgen.utils.async_helpers import get_writer
+
+T = TypeVar("T")
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, from cache hits up to slow generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_stage: contextvars.ContextVar[Optional["StageRecorder"]] = contextvars.ContextVar(
+    "leadgen_current_stage", default=None
+)
+
+
+class StageRecorder:
+    """Collects the timing of one pipeline stage and of the LLM calls made during it"""
+
+    def __init__(self, stage: str):
+        """Start recording a stage
+
+        Args:
+            stage: Stage name
+        """
+        self.stage = stage
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.wall_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.calls: List[Dict[str, Any]] = []
+
+    def record_call(self, call: Dict[str, Any]) -> None:
+        """Add an LLM call made during the stage
+
+        Args:
+            call: Call metrics as built by LLMService
+        """
+        self.calls.append(call)
+
+    def merge(self, other: "StageRecorder") -> None:
+        """Take over the LLM calls of another recorder (e.g. background work whose result the stage used)
+
+        Args:
+            other: The recorder to take the calls from
+        """
+        self.calls.extend(other.calls)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Stop the stage clock
+
+        Args:
+            error: The exception the stage failed with, if any
+        """
+        self.wall_seconds = time.perf_counter() - self._started
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the stage metrics in the form stored on QuestionSession.stage_metrics
+
+        Returns:
+            Dictionary with the stage totals and the individual calls
+        """
+        ttfts = [call["ttft_seconds"] for call in self.calls if call.get("ttft_seconds") is not None]
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": round(self.wall_seconds or 0.0, 6),
+            "error": self.error,
+            "llm_calls": len(self.calls),
+            "queue_wait_seconds": round(sum(call["queue_wait_seconds"] for call in self.calls), 6),
+            "ttft_seconds": ttfts[0] if ttfts else None,
+            "input_tokens": sum(call["input_tokens"] for call in self.calls),
+            "output_tokens": sum(call["output_tokens"] for call in self.calls),
+            "retries": sum(call["retries"] for call in self.calls),
+            "calls": list(self.calls),
+        }
+
+
+class CallRecord:
+    """Timing and token usage of one LLM call, attributed to the stage it was made in"""
+
+    def __init__(self, agent: str, model: str):
+        """Start recording a call
+
+        Args:
+            agent: Name of the agent (or other caller) making the call
+            model: Name of the model
+        """
+        self.agent = agent
+        self.model = model
+        self.recorder = current_stage()
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.queue_wait_seconds = 0.0
+        self.ttft_seconds: Optional[float] = None
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.attempts = 0
+
+    def begin_attempt(self) -> None:
+        """Mark the start of an attempt; the wait before the first one is the queue wait"""
+        if self.attempts == 0:
+            self.queue_wait_seconds = time.perf_counter() - self._started
+        self.attempts += 1
+
+    def attempt(self, factory: Callable[[], T]) -> Callable[[], T]:
+        """Wrap an attempt factory (as passed to RequestScheduler.run) to count attempts
+
+        Args:
+            factory: Zero-argument function starting one attempt
+
+        Returns:
+            The wrapped factory
+        """
+        def start() -> T:
+            self.begin_attempt()
+            return factory()
+        return start
+
+    def mark_first_token(self) -> None:
+        """Record the time to the first streamed token (measured from the start of the call)"""
+        if self.ttft_seconds is None:
+            self.ttft_seconds = time.perf_counter() - self._started
+
+    def add_usage(self, input_tokens: int, output_tokens: int) -> None:
+        """Add token usage reported for an attempt
+
+        Args:
+            input_tokens: Prompt tokens
+            output_tokens: Generated tokens
+        """
+        self.input_tokens += input_tokens or 0
+        self.output_tokens += output_tokens or 0
+
+    def finish(self, status: str = "ok") -> Dict[str, Any]:
+        """Stop the clock and add the call to its stage
+
+        Args:
+            status: "ok", "error", "cached" or "cancelled"
+
+        Returns:
+            The call metrics
+        """
+        call = {
+            "agent": self.agent,
+            "model": self.model,
+            "stage": self.recorder.stage if self.recorder else None,
+            "status": status,
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self._started, 6),
+            "queue_wait_seconds": round(self.queue_wait_seconds, 6),
+            "ttft_seconds": round(self.ttft_seconds, 6) if self.ttft_seconds is not None else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "retries": max(0, self.attempts - 1),
+        }
+        if self.recorder is not None:
+            self.recorder.record_call(call)
+        return call
+
+
+def current_stage() -> Optional[StageRecorder]:
+    """Get the recorder of the stage the caller is running in
+
+    Returns:
+        The current StageRecorder, or None outside a stage
+    """
+    return _current_stage.get()
+
+
+@contextmanager
+def stage_scope(stage: str) -> Iterator[StageRecorder]:
+    """Record a stage: LLM calls made inside the block are attributed to it
+
+    The previous stage is restored with set() rather than reset(), so the scope
+    may also span the yields of an async generator.
+
+    Args:
+        stage: Stage name
+
+    Yields:
+        The StageRecorder for the stage
+    """
+    previous = _current_stage.get()
+    recorder = StageRecorder(stage)
+    _current_stage.set(recorder)
+    try:
+        yield recorder
+    except BaseException as e:
+        recorder.finish(e)
+        raise
+    else:
+        recorder.finish()
+    finally:
+        _current_stage.set(previous)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initialize an empty histogram
+
+        Args:
+            buckets: Upper bounds of the buckets in ascending order
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add an observation
+
+        Args:
+            value: Observed value
+        """
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format a label set for the Prometheus text format
+
+    Args:
+        labels: Label name/value pairs
+        extra: Optional additional pair (e.g. the le label of a bucket)
+
+    Returns:
+        The label set in braces, or an empty string
+    """
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _trace_id(session_id: str) -> str:
+    """Derive a stable 128-bit trace ID from a session ID"""
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+
+
+def _span_id() -> str:
+    """Generate a random 64-bit span ID"""
+    return os.urandom(8).hex()
+
+
+def _log_write_error(future: "Future[None]") -> None:
+    """Log a failed metrics write (nobody waits for them)"""
+    error = future.exception()
+    if error is not None:
+        logger.error("Writing metrics failed: %s", error)
+
+
+class Instrumentation:
+    """Process-wide aggregation and export of stage and LLM call metrics
+
+    Every LLM call and finished stage updates in-memory counters and histograms
+    labelled by stage, agent and model. They can be rendered in the Prometheus
+    text format (and are written to prometheus_path at most every
+    export_interval_seconds), and each stage and call can be appended to
+    spans_path as an OpenTelemetry-style span, one JSON object per line.
+
+    File writes made while recording go to the shared writer thread, so a slow
+    disk never blocks the event loop the stages run on.
+    """
+
+    def __init__(self, prometheus_path: Optional[str] = None, spans_path: Optional[str] = None,
+                 export_interval_seconds: float = 5.0):
+        """Initialize the instrumentation
+
+        Args:
+            prometheus_path: File the Prometheus text exposition is written to (None to disable)
+            spans_path: JSONL file spans are appended to (None to disable)
+            export_interval_seconds: Minimum time between Prometheus file writes
+        """
+        self.prometheus_path = prometheus_path
+        self.spans_path = spans_path
+        self.export_interval_seconds = export_interval_seconds
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self._last_export = 0.0
+        for path in (prometheus_path, spans_path):
+            directory = os.path.dirname(path) if path else ""
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        if prometheus_path:
+            atexit.register(self.export)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Instrumentation":
+        """Create the instrumentation from the metrics section of config.yaml
+
+        Args:
+            config: The metrics configuration dictionary
+
+        Returns:
+            A configured Instrumentation
+        """
+        return cls(
+            prometheus_path=config.get("prometheus_path"),
+            spans_path=config.get("spans_path"),
+            export_interval_seconds=config.get("export_interval_seconds", 5.0),
+        )
+
+    def _increment(self, name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+        """Add to a counter (lock must be held)"""
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def _observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        """Add an observation to a histogram (lock must be held)"""
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+    def record_call(self, call: Dict[str, Any]) -> None:
+        """Record one LLM call
+
+        Args:
+            call: Call metrics as built by LLMService
+        """
+        labels = {"stage": call.get("stage") or "none", "agent": call["agent"], "model": call["model"]}
+        with self._lock:
+            self._increment("leadgen_llm_calls_total", {**labels, "status": call["status"]})
+            if call["status"] == "cached":
+                return
+            self._observe("leadgen_llm_call_duration_seconds", labels, call["wall_seconds"])
+            self._observe("leadgen_llm_queue_wait_seconds", labels, call["queue_wait_seconds"])
+            if call.get("ttft_seconds") is not None:
+                self._observe("leadgen_llm_time_to_first_token_seconds", labels, call["ttft_seconds"])
+            self._increment("leadgen_llm_tokens_total", {**labels, "direction": "input"}, call["input_tokens"])
+            self._increment("leadgen_llm_tokens_total", {**labels, "direction": "output"}, call["output_tokens"])
+            self._increment("leadgen_llm_retries_total", labels, call["retries"])
+
+    def record_stage(self, session_id: str, recorder: StageRecorder) -> None:
+        """Record a finished stage and write its spans
+
+        Args:
+            session_id: ID of the session the stage belongs to
+            recorder: The finished stage
+        """
+        labels = {"stage": recorder.stage}
+        with self._lock:
+            self._increment("leadgen_stage_runs_total", {**labels, "status": "error" if recorder.error else "ok"})
+            self._observe("leadgen_stage_duration_seconds", labels, recorder.wall_seconds or 0.0)
+        if self.spans_path:
+            self._write_spans(session_id, recorder)
+        self.maybe_export()
+
+    def _write_spans(self, session_id: str, recorder: StageRecorder) -> None:
+        """Append a stage span and one child span per LLM call
+
+        Args:
+            session_id: ID of the session (used to derive the trace ID)
+            recorder: The finished stage
+        """
+        trace_id = _trace_id(session_id)
+        stage_span_id = _span_id()
+        start = int(recorder.started_at * 1e9)
+        spans = [{
+            "trace_id": trace_id,
+            "span_id": stage_span_id,
+            "parent_span_id": None,
+            "name": f"stage {recorder.stage}",
+            "start_time_unix_nano": start,
+            "end_time_unix_nano": start + int((recorder.wall_seconds or 0.0) * 1e9),
+            "status": "ERROR" if recorder.error else "OK",
+            "attributes": {"leadgen.session_id": session_id, "leadgen.stage": recorder.stage},
+        }]
+        for call in recorder.calls:
+            call_start = int(call["started_at"] * 1e9)
+            spans.append({
+                "trace_id": trace_id,
+                "span_id": _span_id(),
+                "parent_span_id": stage_span_id,
+                "name": f"llm {call['agent']}",
+                "start_time_unix_nano": call_start,
+                "end_time_unix_nano": call_start + int(call["wall_seconds"] * 1e9),
+                "status": "ERROR" if call["status"] == "error" else "OK",
+                "attributes": {
+                    "gen_ai.request.model": call["model"],
+                    "gen_ai.usage.input_tokens": call["input_tokens"],
+                    "gen_ai.usage.output_tokens": call["output_tokens"],
+                    "leadgen.queue_wait_seconds": call["queue_wait_seconds"],
+                    "leadgen.ttft_seconds": call.get("ttft_seconds"),
+                    "leadgen.retries": call["retries"],
+                    "leadgen.cached": call["status"] == "cached",
+                },
+            })
+        text = "".join(json.dumps(span) + "\n" for span in spans)
+        get_writer().submit(self._append_spans, text).add_done_callback(_log_write_error)
+
+    def _append_spans(self, text: str) -> None:
+        """Append serialized spans to the spans file (on the writer thread)"""
+        with open(self.spans_path, "a") as file:
+            file.write(text)
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format
+
+        Returns:
+            The exposition text
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def maybe_export(self) -> None:
+        """Write the Prometheus file if export_interval_seconds have passed since the last write"""
+        if self.prometheus_path and time.monotonic() - self._last_export >= self.export_interval_seconds:
+            # Set now, so calls made before the write runs don't queue more of them
+            self._last_export = time.monotonic()
+            get_writer().submit(self.export).add_done_callback(_log_write_error)
+
+    def export(self) -> None:
+        """Write the Prometheus file now (atomically, so scrapers never see a partial file)"""
+        if not self.prometheus_path:
+            return
+        self._last_export = time.monotonic()
+        temp_path = self.prometheus_path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(self.render_prometheus())
+        os.replace(temp_path, self.prometheus_path)
@@ -0,0 +1,389 @@
+# Cross-session inverted index over generated keywords and ICP text
+
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from leadgen.entity.models import QuestionSession
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+# Suffix rules applied in order; the first match wins (a light Porter-style stemmer)
+_SUFFIX_RULES: List[Tuple[str, str]] = [
+    ("sses", "ss"),
+    ("ies", "y"),
+    ("ational", "ate"),
+    ("ization", "ize"),
+    ("ments", "ment"),
+    ("ings", ""),
+    ("ing", ""),
+    ("edly", ""),
+    ("ed", ""),
+    ("ers", "er"),
+    ("es", "e"),
+    ("ss", "ss"),
+    ("s", ""),
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of tokens
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Normalize a keyword for exact lookup (lowercase, punctuation and spacing removed)
+
+    Args:
+        keyword: Keyword text
+
+    Returns:
+        Normalized keyword
+    """
+    return " ".join(tokenize(keyword))
+
+
+def stem_token(token: str) -> str:
+    """Reduce a token to its stem
+
+    Args:
+        token: Lowercase token
+
+    Returns:
+        Stemmed token
+    """
+    if len(token) <= 3:
+        return token
+    for suffix, replacement in _SUFFIX_RULES:
+        if token.endswith(suffix):
+            stem = token[: -len(suffix)] + replacement
+            # Keep at least three characters so short words aren't mangled
+            if len(stem) >= 3:
+                return stem
+            return token
+    return token
+
+
+def stem_keyword(keyword: str) -> str:
+    """Stem every token of a keyword
+
+    Args:
+        keyword: Keyword text
+
+    Returns:
+        Stemmed, normalized keyword
+    """
+    return " ".join(stem_token(token) for token in tokenize(keyword))
+
+
+class KeywordIndex:
+    """SQLite-backed inverted index over session keywords and ICP text
+
+    Postings map normalized keywords, their stems and ICP tokens to session
+    IDs. Counter tables (sessions per keyword per month and all time, sessions
+    per ICP token, and the number of indexed sessions) are maintained
+    incrementally, so aggregation, prefix and frequency queries never scan the
+    postings, and ICP searches start from the rarest query token. Re-indexing a session replaces
+    its previous postings, so it is safe to index on every save.
+    """
+
+    def __init__(self, path: str = "./data/keyword_index.sqlite3"):
+        """Initialize the index
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS indexed_sessions (
+                    session_id TEXT PRIMARY KEY, month TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS keyword_postings (
+                    term TEXT NOT NULL, stem TEXT NOT NULL, session_id TEXT NOT NULL,
+                    PRIMARY KEY (term, session_id));
+                CREATE INDEX IF NOT EXISTS idx_keyword_postings_stem ON keyword_postings(stem);
+                CREATE INDEX IF NOT EXISTS idx_keyword_postings_session ON keyword_postings(session_id);
+                CREATE TABLE IF NOT EXISTS keyword_counts (
+                    month TEXT NOT NULL, term TEXT NOT NULL, count INTEGER NOT NULL,
+                    PRIMARY KEY (month, term));
+                CREATE INDEX IF NOT EXISTS idx_keyword_counts_month_count ON keyword_counts(month, count DESC);
+                CREATE TABLE IF NOT EXISTS icp_postings (
+                    token TEXT NOT NULL, session_id TEXT NOT NULL,
+                    PRIMARY KEY (token, session_id));
+                CREATE INDEX IF NOT EXISTS idx_icp_postings_session ON icp_postings(session_id);
+                CREATE TABLE IF NOT EXISTS icp_token_counts (
+                    token TEXT PRIMARY KEY, sessions INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS index_counts (
+                    name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS keyword_totals (
+                    term TEXT PRIMARY KEY, sessions INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_keyword_totals_sessions ON keyword_totals(sessions DESC);
+                """
+            )
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """Fill the counter tables of an index written before they existed (inside a transaction)"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._conn.execute("DELETE FROM icp_token_counts")
+            self._conn.execute(
+                "INSERT INTO icp_token_counts (token, sessions) SELECT token, COUNT(*) FROM icp_postings GROUP BY token"
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO index_counts (name, value) SELECT 'sessions', COUNT(*) FROM indexed_sessions"
+            )
+        if version < 2:
+            self._conn.execute("DELETE FROM keyword_totals")
+            self._conn.execute(
+                "INSERT INTO keyword_totals (term, sessions) SELECT term, SUM(count) FROM keyword_counts GROUP BY term"
+            )
+        self._conn.execute(f"PRAGMA user_version = {max(version, 2)}")
+
+    def _remove_session(self, session_id: str) -> None:
+        """Remove a session's postings and counts (inside a transaction)
+
+        Args:
+            session_id: ID of the session
+        """
+        row = self._conn.execute(
+            "SELECT month FROM indexed_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return
+        month = row[0]
+        terms = [r[0] for r in self._conn.execute(
+            "SELECT term FROM keyword_postings WHERE session_id = ?", (session_id,)
+        )]
+        self._conn.executemany(
+            "UPDATE keyword_counts SET count = count - 1 WHERE month = ? AND term = ?",
+            [(month, term) for term in terms],
+        )
+        self._conn.execute("DELETE FROM keyword_counts WHERE month = ? AND count <= 0", (month,))
+        self._conn.executemany(
+            "UPDATE keyword_totals SET sessions = sessions - 1 WHERE term = ?", [(term,) for term in terms]
+        )
+        self._conn.executemany(
+            "DELETE FROM keyword_totals WHERE term = ? AND sessions <= 0", [(term,) for term in terms]
+        )
+        tokens = [r[0] for r in self._conn.execute(
+            "SELECT token FROM icp_postings WHERE session_id = ?", (session_id,)
+        )]
+        self._conn.executemany(
+            "UPDATE icp_token_counts SET sessions = sessions - 1 WHERE token = ?", [(token,) for token in tokens]
+        )
+        self._conn.executemany(
+            "DELETE FROM icp_token_counts WHERE token = ? AND sessions <= 0", [(token,) for token in tokens]
+        )
+        self._conn.execute("UPDATE index_counts SET value = value - 1 WHERE name = 'sessions'")
+        self._conn.execute("DELETE FROM keyword_postings WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM icp_postings WHERE session_id = ?", (session_id,))
+        self._conn.execute("DELETE FROM indexed_sessions WHERE session_id = ?", (session_id,))
+
+    def index_session(self, session: QuestionSession) -> None:
+        """Add or refresh a session's keywords and ICP text in the index
+
+        Args:
+            session: The session to index
+        """
+        month = session.created_at.strftime("%Y-%m")
+        terms = {normalize_keyword(k.text) for k in session.keywords}
+        terms.discard("")
+
+        icp_tokens = set()
+        profile = session.ideal_customer_profile
+        if profile is not None and profile.summary:
+            icp_tokens = {stem_token(token) for token in tokenize(profile.summary)}
+
+        with self._lock, self._conn:
+            self._remove_session(session.id)
+            if not terms and not icp_tokens:
+                return
+            self._conn.execute(
+                "INSERT INTO indexed_sessions (session_id, month) VALUES (?, ?)", (session.id, month)
+            )
+            self._conn.executemany(
+                "INSERT INTO keyword_postings (term, stem, session_id) VALUES (?, ?, ?)",
+                [(term, stem_keyword(term), session.id) for term in terms],
+            )
+            self._conn.executemany(
+                "INSERT INTO keyword_counts (month, term, count) VALUES (?, ?, 1) "
+                "ON CONFLICT(month, term) DO UPDATE SET count = count + 1",
+                [(month, term) for term in terms],
+            )
+            self._conn.executemany(
+                "INSERT INTO keyword_totals (term, sessions) VALUES (?, 1) "
+                "ON CONFLICT(term) DO UPDATE SET sessions = sessions + 1",
+                [(term,) for term in terms],
+            )
+            self._conn.executemany(
+                "INSERT INTO icp_postings (token, session_id) VALUES (?, ?)",
+                [(token, session.id) for token in icp_tokens],
+            )
+            self._conn.executemany(
+                "INSERT INTO icp_token_counts (token, sessions) VALUES (?, 1) "
+                "ON CONFLICT(token) DO UPDATE SET sessions = sessions + 1",
+                [(token,) for token in icp_tokens],
+            )
+            self._conn.execute(
+                "INSERT INTO index_counts (name, value) VALUES ('sessions', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+
+    def find_sessions(self, keyword: str, stemmed: bool = True, limit: int = 100) -> List[str]:
+        """Find sessions that targeted a keyword
+
+        Args:
+            keyword: Keyword to look up
+            stemmed: Match on stems (e.g. "softwares" finds "software") instead of exact terms
+            limit: Maximum number of session IDs to return
+
+        Returns:
+            List of session IDs
+        """
+        if stemmed:
+            query = "SELECT DISTINCT session_id FROM keyword_postings WHERE stem = ? LIMIT ?"
+            value = stem_keyword(keyword)
+        else:
+            query = "SELECT session_id FROM keyword_postings WHERE term = ? LIMIT ?"
+            value = normalize_keyword(keyword)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, (value, limit))]
+
+    def prefix_search(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Find indexed keywords starting with a prefix
+
+        Args:
+            prefix: Keyword prefix
+            limit: Maximum number of keywords to return
+
+        Returns:
+            List of {"keyword", "sessions"} dictionaries in keyword order
+        """
+        prefix = normalize_keyword(prefix)
+        if not prefix:
+            return []
+        # A range scan on the primary key: term >= prefix AND term < prefix with its last char bumped
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT term, sessions FROM keyword_totals WHERE term >= ? AND term < ? ORDER BY term LIMIT ?",
+                (prefix, upper, limit),
+            ).fetchall()
+        return [{"keyword": term, "sessions": count} for term, count in rows]
+
+    def top_keywords(self, k: int = 10, month: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the most frequent keywords
+
+        Args:
+            k: Number of keywords to return
+            month: Restrict to a month in YYYY-MM format (all time if omitted)
+
+        Returns:
+            List of {"keyword", "sessions"} dictionaries, most frequent first
+        """
+        with self._lock:
+            if month:
+                rows = self._conn.execute(
+                    "SELECT term, count FROM keyword_counts WHERE month = ? ORDER BY count DESC LIMIT ?",
+                    (month, k),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT term, sessions FROM keyword_totals ORDER BY sessions DESC LIMIT ?", (k,)
+                ).fetchall()
+        return [{"keyword": term, "sessions": count} for term, count in rows]
+
+    def search_icp(self, text: str, limit: int = 100) -> List[str]:
+        """Find sessions whose ICP mentions every word of a query
+
+        The postings of the rarest query token are scanned, and each of those
+        sessions is checked for the other tokens by primary key.
+
+        Args:
+            text: Query words
+            limit: Maximum number of session IDs to return
+
+        Returns:
+            List of session IDs
+        """
+        tokens = sorted({stem_token(token) for token in tokenize(text)})
+        if not tokens:
+            return []
+        placeholders = ", ".join("?" for _ in tokens)
+        with self._lock:
+            counts = dict(self._conn.execute(
+                f"SELECT token, sessions FROM icp_token_counts WHERE token IN ({placeholders})", tokens
+            ).fetchall())
+            if len(counts) < len(tokens):
+                # Some token is in no ICP at all
+                return []
+            rarest, *others = sorted(tokens, key=counts.get)
+            conditions = "".join(
+                " AND EXISTS (SELECT 1 FROM icp_postings q WHERE q.token = ? AND q.session_id = p.session_id)"
+                for _ in others
+            )
+            rows = self._conn.execute(
+                f"SELECT p.session_id FROM icp_postings p WHERE p.token = ?{conditions} LIMIT ?",
+                (rarest, *others, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def token_frequencies(self, tokens: List[str], exclude_session: Optional[str] = None) -> Tuple[int, Dict[str, int]]:
+        """Count the indexed sessions whose ICP mentions each of a set of stemmed tokens
+
+        Reads the counter tables, so the cost depends on the number of tokens,
+        not on the size of the history.
+
+        Args:
+            tokens: Stemmed tokens
+            exclude_session: Session to leave out of the counts (e.g. the one being scored)
+
+        Returns:
+            Tuple of (number of indexed sessions, {token: sessions mentioning it})
+        """
+        tokens = sorted(set(tokens))
+        placeholders = ", ".join("?" for _ in tokens)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_counts WHERE name = 'sessions'").fetchone()
+            total = row[0] if row else 0
+            frequencies = dict(self._conn.execute(
+                f"SELECT token, sessions FROM icp_token_counts WHERE token IN ({placeholders})", tokens
+            ).fetchall()) if tokens else {}
+            excluded = None
+            if exclude_session is not None:
+                excluded = self._conn.execute(
+                    "SELECT 1 FROM indexed_sessions WHERE session_id = ?", (exclude_session,)
+                ).fetchone()
+                own_tokens = self._conn.execute(
+                    f"SELECT token FROM icp_postings WHERE session_id = ? AND token IN ({placeholders})",
+                    (exclude_session, *tokens),
+                ).fetchall() if excluded and tokens else []
+        if excluded:
+            total -= 1
+            for (token,) in own_tokens:
+                frequencies[token] -= 1
+        return total, {token: count for token, count in frequencies.items() if count > 0}
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,248 @@
+# Local keyword relevance scoring, tail classification and near-duplicate removal
+
+import math
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from leadgen.entity.models import Keyword
+from leadgen.services.keyword_index import KeywordIndex, tokenize, stem_token
+
+# Function words left out of keyword queries so they don't dilute the score
+_STOPWORDS = {
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "into", "of", "on", "or", "our",
+    "the", "to", "vs", "with", "your",
+}
+
+SHORT_TAIL = "short-tail"
+LONG_TAIL = "long-tail"
+
+
+def keyword_terms(keyword: str) -> List[str]:
+    """Get the stemmed content tokens of a keyword
+
+    Args:
+        keyword: Keyword text
+
+    Returns:
+        List of stemmed tokens, without stopwords
+    """
+    return [stem_token(token) for token in tokenize(keyword) if token not in _STOPWORDS]
+
+
+def char_ngrams(text: str, n: int = 3) -> List[str]:
+    """Get the character n-grams of a keyword's stemmed form, ignoring spacing and hyphens
+
+    Args:
+        text: Keyword text
+        n: N-gram length
+
+    Returns:
+        List of distinct n-grams
+    """
+    compact = "".join(stem_token(token).replace("-", "") for token in tokenize(text))
+    padded = f"#{compact}#"
+    return sorted({padded[i:i + n] for i in range(max(1, len(padded) - n + 1))})
+
+
+class KeywordScorer:
+    """Scores generated keywords against a session's answers without an LLM call
+
+    The session score is BM25 of the keyword's terms against each answer,
+    summed over the answers and scaled so the best keyword scores 1. It is
+    blended with how specific the terms are across the ICPs of past sessions
+    (terms every profile mentions say little). Keywords are classified as
+    short-tail or long-tail by word count, and near-duplicates (the same stemmed
+    words, or character trigram Jaccard similarity at or above the threshold)
+    are collapsed onto the higher-scoring one.
+
+    score reads the keyword index, so call it from a worker thread.
+    """
+
+    def __init__(self, keyword_index: Optional[KeywordIndex] = None, k1: float = 1.2, b: float = 0.75,
+                 history_weight: float = 0.3, min_history_sessions: int = 10,
+                 long_tail_min_words: int = 3, dedup_threshold: float = 0.8):
+        """Initialize the scorer
+
+        Args:
+            keyword_index: Cross-session index providing historical term frequencies
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            history_weight: Weight of the cross-session specificity in the relevance score
+            min_history_sessions: Indexed sessions needed before the history is used
+            long_tail_min_words: Keywords with at least this many words are long-tail
+            dedup_threshold: Trigram Jaccard similarity at which keywords are duplicates
+        """
+        self.keyword_index = keyword_index
+        self.k1 = k1
+        self.b = b
+        self.history_weight = history_weight
+        self.min_history_sessions = min_history_sessions
+        self.long_tail_min_words = long_tail_min_words
+        self.dedup_threshold = dedup_threshold
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], keyword_index: Optional[KeywordIndex] = None) -> "KeywordScorer":
+        """Create a scorer from the keyword_scoring section of params.yaml
+
+        Args:
+            config: The keyword_scoring configuration dictionary
+            keyword_index: Cross-session index providing historical term frequencies
+
+        Returns:
+            A configured KeywordScorer
+        """
+        return cls(
+            keyword_index=keyword_index,
+            k1=config.get("bm25_k1", 1.2),
+            b=config.get("bm25_b", 0.75),
+            history_weight=config.get("history_weight", 0.3),
+            min_history_sessions=config.get("min_history_sessions", 10),
+            long_tail_min_words=config.get("long_tail_min_words", 3),
+            dedup_threshold=config.get("dedup_threshold", 0.8),
+        )
+
+    def classify(self, keyword: str) -> str:
+        """Classify a keyword by length
+
+        Args:
+            keyword: Keyword text
+
+        Returns:
+            "long-tail" or "short-tail"
+        """
+        return LONG_TAIL if len(tokenize(keyword)) >= self.long_tail_min_words else SHORT_TAIL
+
+    def _query_matrix(self, terms: List[List[str]]) -> Tuple[np.ndarray, Dict[str, int]]:
+        """Build the keyword x vocabulary matrix of term weights (each row sums to 1)
+
+        Args:
+            terms: Stemmed terms of each keyword
+
+        Returns:
+            Tuple of (matrix, vocabulary mapping terms to columns)
+        """
+        vocabulary: Dict[str, int] = {}
+        for keyword in terms:
+            for term in keyword:
+                vocabulary.setdefault(term, len(vocabulary))
+        queries = np.zeros((len(terms), len(vocabulary)))
+        for row, keyword in enumerate(terms):
+            for term in set(keyword):
+                queries[row, vocabulary[term]] = 1.0 / len(set(keyword))
+        return queries, vocabulary
+
+    def session_scores(self, terms: List[List[str]], documents: List[str]) -> np.ndarray:
+        """Score keywords against a session's answers with BM25
+
+        Args:
+            terms: Stemmed terms of each keyword
+            documents: Answer texts
+
+        Returns:
+            Scores in [0, 1], the best keyword scoring 1 (all zero if no keyword matches)
+        """
+        queries, vocabulary = self._query_matrix(terms)
+        if not vocabulary or not documents:
+            return np.zeros(len(terms))
+
+        tokenized = [[stem_token(token) for token in tokenize(document)] for document in documents]
+        lengths = np.array([len(tokens) for tokens in tokenized], dtype=float)
+        rows = [row for row, tokens in enumerate(tokenized) for token in tokens if token in vocabulary]
+        columns = [vocabulary[token] for tokens in tokenized for token in tokens if token in vocabulary]
+        tf = np.zeros((len(documents), len(vocabulary)))
+        np.add.at(tf, (np.array(rows, dtype=int), np.array(columns, dtype=int)), 1.0)
+
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log1p((len(documents) - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        term_scores = (idf * tf * (self.k1 + 1) / (tf + norm[:, None])).sum(axis=0)
+
+        scores = queries @ term_scores
+        best = scores.max()
+        return scores / best if best > 0 else scores
+
+    def history_specificity(self, terms: List[List[str]], session_id: Optional[str] = None) -> Optional[np.ndarray]:
+        """Score how specific each keyword's terms are across past sessions' ICPs
+
+        Args:
+            terms: Stemmed terms of each keyword
+            session_id: Session being scored (left out of the history)
+
+        Returns:
+            Specificity in [0, 1] per keyword, or None if there is too little history
+        """
+        if self.keyword_index is None:
+            return None
+        queries, vocabulary = self._query_matrix(terms)
+        total, frequencies = self.keyword_index.token_frequencies(list(vocabulary), exclude_session=session_id)
+        if total < self.min_history_sessions or not vocabulary:
+            return None
+        df = np.array([frequencies.get(term, 0) for term in vocabulary], dtype=float)
+        specificity = np.log((total + 1) / (df + 1)) / math.log(total + 1)
+        return queries @ specificity
+
+    def deduplicate(self, keywords: List[str], scores: np.ndarray) -> List[int]:
+        """Find the keywords to keep after collapsing near-duplicates
+
+        Args:
+            keywords: Keyword texts
+            scores: Relevance score of each keyword
+
+        Returns:
+            Indices of the kept keywords, in their original order
+        """
+        stems = [tuple(stem_token(token) for token in tokenize(keyword)) for keyword in keywords]
+        grams = [char_ngrams(keyword) for keyword in keywords]
+        vocabulary: Dict[str, int] = {}
+        for keyword_grams in grams:
+            for gram in keyword_grams:
+                vocabulary.setdefault(gram, len(vocabulary))
+        matrix = np.zeros((len(keywords), max(len(vocabulary), 1)))
+        for row, keyword_grams in enumerate(grams):
+            matrix[row, [vocabulary[gram] for gram in keyword_grams]] = 1.0
+
+        sizes = matrix.sum(axis=1)
+        intersection = matrix @ matrix.T
+        union = sizes[:, None] + sizes[None, :] - intersection
+        similarity = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+        kept: List[int] = []
+        kept_stems = set()
+        # Stable sort, so ties keep the model's order
+        for index in np.argsort(-scores, kind="stable"):
+            if stems[index] in kept_stems:
+                continue
+            if not kept or similarity[index, kept].max() < self.dedup_threshold:
+                kept.append(int(index))
+                kept_stems.add(stems[index])
+        return sorted(kept)
+
+    def score(self, keywords: List[str], all_qa_data: Dict[str, Dict[str, str]],
+              session_id: Optional[str] = None) -> List[Keyword]:
+        """Score, classify and deduplicate a session's generated keywords
+
+        Args:
+            keywords: Keyword texts as generated
+            all_qa_data: Dictionary mapping stage names to Q&A dictionaries
+            session_id: ID of the session (left out of the historical frequencies)
+
+        Returns:
+            Keyword objects with relevance_score and type set, near-duplicates removed
+        """
+        keywords = [keyword.strip() for keyword in keywords if keyword.strip()]
+        if not keywords:
+            return []
+
+        terms = [keyword_terms(keyword) for keyword in keywords]
+        documents = [answer for qa_dict in all_qa_data.values() for answer in qa_dict.values() if answer.strip()]
+        scores = self.session_scores(terms, documents)
+        specificity = self.history_specificity(terms, session_id)
+        if specificity is not None:
+            scores = (1 - self.history_weight) * scores + self.history_weight * specificity
+
+        return [
+            Keyword(text=keywords[index], relevance_score=round(float(scores[index]), 4),
+                    type=self.classify(keywords[index]))
+            for index in self.deduplicate(keywords, scores)
+        ]
@@ -0,0 +1,189 @@
+# Persistent content-addressed cache for LLM responses
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class LLMResponseCache:
+    """SQLite-backed cache of validated LLM outputs
+
+    Entries are keyed by a hash of everything that determines a response (model
+    name, system prompt, user prompt, model settings and output schema), expire
+    after a TTL, and are evicted least-recently-used first once the cache holds
+    more than max_entries.
+    """
+
+    def __init__(self, path: str = "./data/llm_cache.sqlite3", ttl_seconds: Optional[float] = None,
+                 max_entries: int = 10000):
+        """Initialize the cache
+
+        Args:
+            path: Path to the SQLite database file
+            ttl_seconds: Lifetime of an entry in seconds (None for no expiry)
+            max_entries: Maximum number of entries kept before LRU eviction
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name: str, system_prompt: str, prompt: str, model_settings: Optional[Dict[str, Any]] = None,
+                 output_type: Any = None) -> str:
+        """Build the cache key for an LLM call
+
+        Args:
+            model_name: Name of the model
+            system_prompt: System prompt of the agent
+            prompt: User prompt
+            model_settings: Model settings passed with the call
+            output_type: Output type of the agent (None for plain text)
+
+        Returns:
+            Hex digest identifying the call
+        """
+        if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+            schema = output_type.model_json_schema()
+        else:
+            schema = getattr(output_type, "__name__", "str")
+
+        payload = json.dumps(
+            [model_name, system_prompt, prompt, model_settings or {}, schema],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, output_type: Any = None) -> Any:
+        """Look up a cached output
+
+        Args:
+            key: Cache key from make_key
+            output_type: Output type to validate the cached value into
+
+        Returns:
+            The cached output, or None on a miss
+        """
+        return self.get_first([key], output_type)
+
+    def get_first(self, keys: List[str], output_type: Any = None) -> Any:
+        """Look up the first of several keys that has a live entry
+
+        Used to find an answer from any of a call's candidate models, preferring
+        the earlier ones. Counts as one hit or miss.
+
+        Args:
+            keys: Cache keys from make_key, in order of preference
+            output_type: Output type to validate the cached value into
+
+        Returns:
+            The cached output, or None on a miss
+        """
+        now = time.time()
+        placeholders = ", ".join("?" for _ in keys)
+        with self._lock:
+            rows = dict(
+                (key, (value, created_at)) for key, value, created_at in self._conn.execute(
+                    f"SELECT key, value, created_at FROM responses WHERE key IN ({placeholders})", keys
+                ).fetchall()
+            )
+            expired = [key for key, (_, created_at) in rows.items()
+                       if self.ttl_seconds is not None and now - created_at > self.ttl_seconds]
+            if expired:
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in expired])
+                self._entries -= len(expired)
+            key = next((key for key in keys if key in rows and key not in expired), None)
+            if key is None:
+                self.misses += 1
+                return None
+
+            value = rows[key][0]
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+            return output_type.model_validate_json(value)
+        return json.loads(value)
+
+    def set(self, key: str, output: Any) -> None:
+        """Store an output in the cache
+
+        Args:
+            key: Cache key from make_key
+            output: Validated output (a pydantic model or a JSON-serializable value)
+        """
+        if isinstance(output, BaseModel):
+            value = output.model_dump_json()
+        else:
+            value = json.dumps(output)
+
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if exists is None:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Evict least-recently-used entries down to 90% of max_entries (lock must be held)"""
+        target = int(self.max_entries * 0.9)
+        excess = self._entries - target
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        self._entries -= excess
+        self.evictions += excess
+
+    def clear(self) -> None:
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._entries = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the cache counters
+
+        Returns:
+            Dictionary with hits, misses, hit rate, evictions and entry count
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": self._entries,
+        }
@@ -1,24 +1,122 @@
 # LLM Service for handling interactions with Groq LLM
 
 import os
-from typing import List, Dict, Any, Optional
+import time
+import asyncio
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Awaitable, Callable, TYPE_CHECKING
 
-from pydantic_ai import Agent
-from pydantic_ai.models.groq import GroqModel
+import httpx
+
+from leadgen.services.http_client import create_http_client, prewarm_connection
+from leadgen.services.instrumentation import CallRecord, Instrumentation
+from leadgen.services.llm_cache import LLMResponseCache
+from leadgen.services.model_router import ModelRouter
+from leadgen.services.output_budgets import OutputBudgetTuner
+from leadgen.services.request_scheduler import RequestScheduler, estimate_tokens
+from leadgen.utils.async_helpers import run_in_writer, run_sync
+from leadgen.utils.tokens import count_tokens
+
+if TYPE_CHECKING:
+    # pydantic_ai and the Groq SDK are slow to import, so they are only loaded on first use
+    from pydantic_ai import Agent
+    from pydantic_ai.models.groq import GroqModel
+    from leadgen.services.mock_llm import MockLLMBackend
+
+logger = logging.getLogger(__name__)
+
+def _result_usage(result: Any) -> Tuple[int, int]:
+    """Get the input and output token counts reported for a Pydantic AI run
+    
+    Args:
+        result: A run or streamed run result
+        
+    Returns:
+        Tuple of (input tokens, output tokens)
+    """
+    usage = result.usage
+    # A method in older Pydantic AI releases, a property in newer ones
+    if callable(usage):
+        usage = usage()
+    input_tokens = getattr(usage, "input_tokens", None)
+    if input_tokens is None:
+        input_tokens = getattr(usage, "request_tokens", None)
+    output_tokens = getattr(usage, "output_tokens", None)
+    if output_tokens is None:
+        output_tokens = getattr(usage, "response_tokens", None)
+    return input_tokens or 0, output_tokens or 0
+
+
+async def _iter_with_timeout(stream: AsyncIterator[str], timeout: Optional[float]) -> AsyncIterator[str]:
+    """Iterate a stream, failing when the first item or the gap between items exceeds a timeout
+    
+    Args:
+        stream: The async iterator to read
+        timeout: Seconds to wait for each item (None for no timeout)
+        
+    Yields:
+        The stream's items
+    """
+    iterator = stream.__aiter__()
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(iterator.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+def _output_text(output: Any) -> str:
+    """Get the text of an output for token counting"""
+    if hasattr(output, "model_dump_json"):
+        return output.model_dump_json()
+    return output if isinstance(output, str) else str(output)
 
 
 class LLMService:
     """Service for interacting with Groq LLM using Pydantic AI"""
     
-    def __init__(self, model_name: str = "qwen/qwen3-32b"):
+    def __init__(self, model_name: str = "qwen/qwen3-32b", cache: Optional[LLMResponseCache] = None,
+                 scheduler: Optional[RequestScheduler] = None, base_url: Optional[str] = None,
+                 http_client: Optional[httpx.AsyncClient] = None, backend: Optional["MockLLMBackend"] = None,
+                 instrumentation: Optional[Instrumentation] = None, router: Optional[ModelRouter] = None,
+                 output_budgets: Optional[OutputBudgetTuner] = None):
         """Initialize the LLM service with the specified model
         
         Args:
-            model_name: The name of the Groq model to use
+            model_name: The name of the default Groq model
+            cache: Optional response cache consulted before every run_async call
+            scheduler: Optional request scheduler every model call goes through
+            base_url: Optional Groq API base URL (e.g. a local fake server)
+            http_client: Optional shared HTTP client for the Groq provider
+            backend: Optional local backend that answers run_async and run_stream_async
+                calls instead of Groq (no API key or network needed)
+            instrumentation: Optional process-wide metrics every call is reported to
+            router: Optional per-agent model routing with fallbacks and hedging
+                (defaults to model_name for every agent)
+            output_budgets: Optional tuner that records output lengths per agent
+                and may lower max_tokens to the observed need
         """
         self.model_name = model_name
-        self._check_api_key()
-        self.model = GroqModel(model_name)
+        self.router = router or ModelRouter(model_name)
+        self.output_budgets = output_budgets
+        self.cache = cache
+        self.scheduler = scheduler
+        self.base_url = base_url
+        self.http_client = http_client
+        self.backend = backend
+        self.instrumentation = instrumentation
+        if backend is None:
+            self._check_api_key()
+        self._models: Dict[str, "GroqModel"] = {}
+        self._groq_provider: Any = None
+        self._agent_cache: Dict[Tuple[str, str, Any], "Agent"] = {}
+        self._agent_lock = threading.Lock()
     
     def _check_api_key(self):
         """Check if the GROQ_API_KEY environment variable is set"""
@@ -28,21 +126,502 @@ class LLMService:
                 "Please set it before using the LLM service."
             )
     
-    def create_agent(self, system_prompt: str, output_type: Any = None) -> Agent:
+    @property
+    def model(self) -> "GroqModel":
+        """Get the default Groq model, creating it on first use
+        
+        Returns:
+            The configured GroqModel
+        """
+        return self.get_model(self.model_name)
+    
+    def get_model(self, model_name: str) -> "GroqModel":
+        """Get a Groq model by name, creating it on first use
+        
+        Args:
+            model_name: The name of the Groq model
+            
+        Returns:
+            The configured GroqModel
+        """
+        model = self._models.get(model_name)
+        if model is None:
+            with self._agent_lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._models[model_name] = self._create_model(model_name)
+        return model
+    
+    def _create_model(self, model_name: str) -> "GroqModel":
+        """Create a Groq model on the shared HTTP client
+        
+        Without a shared client, one is created with the scheduler's header hook.
+        All models share one Groq client.
+        
+        Args:
+            model_name: The name of the Groq model
+            
+        Returns:
+            The configured GroqModel
+        """
+        from pydantic_ai.models.groq import GroqModel
+        from pydantic_ai.providers.groq import GroqProvider
+        
+        if self.http_client is None and self.scheduler is None and self.base_url is None:
+            return GroqModel(model_name)
+        
+        if self._groq_provider is None:
+            from groq import AsyncGroq
+            
+            if self.http_client is None:
+                hooks = [self.scheduler.observe_response] if self.scheduler else []
+                self.http_client = create_http_client({}, hooks)
+            
+            groq_client = AsyncGroq(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url=self.base_url,
+                http_client=self.http_client,
+                # Retries are handled by the scheduler so that they respect the rate budgets
+                max_retries=0 if self.scheduler else 2,
+            )
+            self._groq_provider = GroqProvider(groq_client=groq_client)
+        return GroqModel(model_name, provider=self._groq_provider)
+    
+    async def prewarm_async(self) -> bool:
+        """Open a connection to the Groq API so the next request goes out on a hot connection
+        
+        Returns:
+            True if a connection was established
+        """
+        if self.http_client is None or self.backend is not None:
+            return False
+        return await prewarm_connection(self.http_client, self.base_url)
+    
+    def create_agent(self, system_prompt: str, output_type: Any = None, model_name: Optional[str] = None) -> "Agent":
         """Create a Pydantic AI agent with the specified system prompt
         
+        Agents are cached by model, system prompt and output type, so repeated
+        calls with the same arguments return the same Agent instance.
+        
         Args:
             system_prompt: The system prompt for the agent
             output_type: Optional output type for structured responses
+            model_name: Optional Groq model (defaults to the service's default model)
             
         Returns:
             A configured Pydantic AI agent
         """
-        if output_type:
-            return Agent(self.model, system_prompt=system_prompt, output_type=output_type)
-        return Agent(self.model, system_prompt=system_prompt)
+        model_name = model_name or self.model_name
+        key = (model_name, system_prompt, output_type)
+        agent = self._agent_cache.get(key)
+        if agent is not None:
+            return agent
+        
+        from pydantic_ai import Agent
+        
+        model = self.get_model(model_name)
+        with self._agent_lock:
+            agent = self._agent_cache.get(key)
+            if agent is None:
+                if output_type:
+                    agent = Agent(model, system_prompt=system_prompt, output_type=output_type)
+                else:
+                    agent = Agent(model, system_prompt=system_prompt)
+                self._agent_cache[key] = agent
+        return agent
+    
+    def _finish_call(self, call: CallRecord, status: str,
+                     model_settings: Optional[Dict[str, Any]] = None) -> None:
+        """Finish a call record and report it to the instrumentation and output budgets
+        
+        Args:
+            call: The call record
+            status: "ok", "error", "cached" or "cancelled"
+            model_settings: The configured model settings of the call
+        """
+        metrics = call.finish(status)
+        if self.instrumentation is not None:
+            self.instrumentation.record_call(metrics)
+        if self.output_budgets is not None and status == "ok":
+            self.output_budgets.record(call.agent, call.output_tokens, (model_settings or {}).get("max_tokens"))
+    
+    def _with_timeout(self, factory: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        """Limit each attempt made through a call factory to the router's timeout
+        
+        The timeout starts once the attempt holds its scheduler slot, so queueing
+        and retry backoff don't count against it; a timed-out attempt is retried
+        like any other retryable error.
+        
+        Args:
+            factory: Zero-argument function returning a new awaitable for each attempt
+            
+        Returns:
+            The wrapped factory
+        """
+        timeout = self.router.timeout_seconds
+        if timeout is None:
+            return factory
+        return lambda: asyncio.wait_for(factory(), timeout)
+    
+    async def _cache_lookup(self, models: List[str], system_prompt: str, prompt: str,
+                            model_settings: Optional[Dict[str, Any]], output_type: Any,
+                            call: CallRecord) -> Any:
+        """Look up a cached answer from any of a call's models, off the event loop
+        
+        Entries are stored under the model that answered, so an answer a fallback
+        gave is found again; the primary model's answer is preferred.
+        
+        Args:
+            models: The primary model followed by its fallbacks
+            system_prompt: The system prompt for the agent
+            prompt: The user prompt to send
+            model_settings: The configured model settings of the call
+            output_type: Output type of the call (None for plain text)
+            call: Call record, finished as cached on a hit
+            
+        Returns:
+            The cached output, or None on a miss
+        """
+        keys = [self.cache.make_key(model_name, system_prompt, prompt, model_settings, output_type)
+                for model_name in models]
+        cached = await asyncio.to_thread(self.cache.get_first, keys, output_type)
+        if cached is not None:
+            self._finish_call(call, "cached")
+        return cached
+    
+    async def _cache_store(self, model_name: str, system_prompt: str, prompt: str,
+                           model_settings: Optional[Dict[str, Any]], output_type: Any, output: Any) -> None:
+        """Store an answer under the model that gave it, on the writer thread
+        
+        Args:
+            model_name: The model that answered
+            system_prompt: The system prompt for the agent
+            prompt: The user prompt that was sent
+            model_settings: The configured model settings of the call
+            output_type: Output type of the call (None for plain text)
+            output: The validated output
+        """
+        key = self.cache.make_key(model_name, system_prompt, prompt, model_settings, output_type)
+        await run_in_writer(self.cache.set, key, output)
+    
+    def _tuned_settings(self, name: Optional[str],
+                        model_settings: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Get the model settings to send, with max_tokens lowered by the output budgets if they apply
+        
+        Args:
+            name: Name of the calling agent
+            model_settings: The configured model settings
+            
+        Returns:
+            The model settings for the request
+        """
+        if self.output_budgets is None:
+            return model_settings
+        return self.output_budgets.apply(name, model_settings)
+    
+    async def run_async(self, system_prompt: str, prompt: str, output_type: Any = None,
+                        model_settings: Optional[Dict[str, Any]] = None, name: Optional[str] = None) -> Any:
+        """Run a prompt through the cached agent for a system prompt and output type
+        
+        When a response cache is configured, identical calls are answered from
+        the cache without a network request. The model is chosen by the router
+        from the agent name, with its fallbacks and hedging.
+        
+        Args:
+            system_prompt: The system prompt for the agent
+            prompt: The user prompt to send
+            output_type: Optional output type for structured responses
+            model_settings: Optional model settings for this call
+            name: Name of the calling agent, used to route the call and label its metrics
+            
+        Returns:
+            The agent's output
+        """
+        models = self.router.route(name)
+        call = CallRecord(name or "unnamed", models[0])
+        if self.cache is not None:
+            cached = await self._cache_lookup(models, system_prompt, prompt, model_settings, output_type, call)
+            if cached is not None:
+                return cached
+        
+        estimated_tokens = estimate_tokens(system_prompt + prompt)
+        # The cache key uses the configured settings, so tuned caps don't invalidate cached answers
+        request_settings = self._tuned_settings(name, model_settings)
+        
+        async def run_model(model_name: str) -> Any:
+            if self.backend is not None:
+                output = await self._run_backend(system_prompt, prompt, output_type, request_settings,
+                                                 estimated_tokens, call)
+                call.add_usage(count_tokens(system_prompt + prompt), count_tokens(_output_text(output)))
+                return output
+            agent = self.create_agent(system_prompt=system_prompt, output_type=output_type, model_name=model_name)
+            result = await self._run_agent(agent, prompt, request_settings, estimated_tokens, call)
+            call.add_usage(*_result_usage(result))
+            return result.output
+        
+        try:
+            output = await self._run_routed(models, run_model, call)
+        except asyncio.CancelledError:
+            self._finish_call(call, "cancelled")
+            raise
+        except Exception:
+            self._finish_call(call, "error")
+            raise
+        self._finish_call(call, "ok", model_settings)
+        
+        if self.cache is not None:
+            await self._cache_store(call.model, system_prompt, prompt, model_settings, output_type, output)
+        return output
+    
+    async def _run_routed(self, models: List[str], run_model: Callable[[str], Awaitable[Any]],
+                          call: CallRecord) -> Any:
+        """Run a call on the first model that succeeds, in routing order
+        
+        Args:
+            models: The primary model followed by its fallbacks
+            run_model: Function running the call on a given model
+            call: Call record, updated with the model that answered
+            
+        Returns:
+            The output of the first successful model
+        """
+        for index, model_name in enumerate(models):
+            try:
+                output, call.model = await self._run_hedged(model_name, run_model)
+                return output
+            except Exception as e:
+                if index + 1 >= len(models):
+                    raise
+                self.router.record_fallback()
+                logger.warning("Model %s failed (%s), falling back to %s", model_name,
+                               type(e).__name__, models[index + 1])
+    
+    async def _run_hedged(self, model_name: str, run_model: Callable[[str], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Run a call on a model, hedging it once it is slow
+        
+        The router's timeout applies to each attempt (see _with_timeout), not to
+        the call as a whole.
+        
+        Args:
+            model_name: The model to call
+            run_model: Function running the call on a given model
+            
+        Returns:
+            Tuple of (output, name of the model that answered)
+        """
+        delay = self.router.hedge_delay(model_name)
+        started = time.perf_counter()
+        if delay is None:
+            output = await run_model(model_name)
+            self.router.observe_latency(model_name, time.perf_counter() - started)
+            return output, model_name
+        return await self._race(model_name, run_model, delay)
+    
+    async def _race(self, model_name: str, run_model: Callable[[str], Awaitable[Any]],
+                    delay: float) -> Tuple[Any, str]:
+        """Run a call and, if it has not finished after delay, a duplicate on the hedge model
+        
+        The first successful response wins and the other request is cancelled.
+        
+        Args:
+            model_name: The model to call
+            run_model: Function running the call on a given model
+            delay: Seconds to wait before sending the hedged request
+            
+        Returns:
+            Tuple of (output, name of the model that answered)
+        """
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(run_model(model_name))
+        tasks = {primary: model_name}
+        try:
+            done, pending = await asyncio.wait({primary}, timeout=delay)
+            if not done:
+                hedge_model = self.router.get_hedge_model(model_name)
+                tasks[asyncio.ensure_future(run_model(hedge_model))] = hedge_model
+                pending = set(tasks)
+            error: Optional[BaseException] = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            self.router.record_hedge(won=task is not primary)
+                        self.router.observe_latency(tasks[task], time.perf_counter() - started)
+                        return task.result(), tasks[task]
+                    error = task.exception()
+                if not pending:
+                    if len(tasks) > 1:
+                        self.router.record_hedge(won=False)
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def run_stream_async(self, system_prompt: str, prompt: str,
+                               model_settings: Optional[Dict[str, Any]] = None,
+                               name: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a plain-text response as it is generated
+        
+        A cache hit is yielded as a single delta; a miss is streamed from the
+        model and the full text is stored in the cache once complete. A model
+        that fails before its first delta is replaced by the next fallback model;
+        streamed calls are not hedged. The router's timeout limits each attempt's
+        wait for its first delta and the idle time between deltas.
+        
+        Args:
+            system_prompt: The system prompt for the agent
+            prompt: The user prompt to send
+            model_settings: Optional model settings for this call
+            name: Name of the calling agent, used to route the call and label its metrics
+            
+        Yields:
+            Text deltas in the order they are generated
+        """
+        models = self.router.route(name)
+        call = CallRecord(name or "unnamed", models[0])
+        if self.cache is not None:
+            cached = await self._cache_lookup(models, system_prompt, prompt, model_settings, None, call)
+            if cached is not None:
+                yield cached
+                return
+        
+        estimated_tokens = estimate_tokens(system_prompt + prompt)
+        request_settings = self._tuned_settings(name, model_settings)
+        chunks: List[str] = []
+        attempt = 0
+        model_index = 0
+        status = "cancelled"
+        try:
+            while True:
+                if self.scheduler is not None:
+                    await self.scheduler.acquire(estimated_tokens)
+                call.begin_attempt()
+                error: Optional[Exception] = None
+                try:
+                    deltas = self._stream_deltas(system_prompt, prompt, request_settings, call, models[model_index])
+                    async for delta in _iter_with_timeout(deltas, self.router.timeout_seconds):
+                        if not chunks:
+                            call.mark_first_token()
+                        chunks.append(delta)
+                        yield delta
+                except Exception as e:
+                    error = e
+                finally:
+                    if self.scheduler is not None:
+                        await self.scheduler.release(error)
+                
+                if error is None:
+                    break
+                # Only retry or fall back if nothing has been yielded to the caller yet
+                if chunks:
+                    status = "error"
+                    raise error
+                if (self.scheduler is not None and self.scheduler.is_retryable(error)
+                        and attempt < self.scheduler.max_retries):
+                    self.scheduler.record_error(error)
+                    await asyncio.sleep(self.scheduler.backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                if model_index + 1 >= len(models):
+                    status = "error"
+                    raise error
+                self.router.record_fallback()
+                logger.warning("Model %s failed (%s), falling back to %s", models[model_index],
+                               type(error).__name__, models[model_index + 1])
+                model_index += 1
+                attempt = 0
+                call.model = models[model_index]
+            status = "ok"
+        finally:
+            self._finish_call(call, status, model_settings)
+        
+        if self.cache is not None:
+            await self._cache_store(call.model, system_prompt, prompt, model_settings, None, "".join(chunks))
+    
+    async def _stream_deltas(self, system_prompt: str, prompt: str,
+                             model_settings: Optional[Dict[str, Any]] = None,
+                             call: Optional[CallRecord] = None,
+                             model_name: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream one attempt of a plain-text response from the backend or the Groq model
+        
+        Args:
+            system_prompt: The system prompt for the agent
+            prompt: The user prompt to send
+            model_settings: Optional model settings for this call
+            call: Optional call record the attempt's token usage is added to
+            model_name: Optional Groq model (defaults to the service's default model)
+            
+        Yields:
+            Text deltas in the order they are generated
+        """
+        if self.backend is not None:
+            deltas: List[str] = []
+            async for delta in self.backend.stream(system_prompt, prompt, model_settings):
+                deltas.append(delta)
+                yield delta
+            if call is not None:
+                call.add_usage(count_tokens(system_prompt + prompt), count_tokens("".join(deltas)))
+            return
+        
+        agent = self.create_agent(system_prompt=system_prompt, model_name=model_name)
+        async with agent.run_stream(prompt, model_settings=model_settings) as result:
+            async for delta in result.stream_text(delta=True):
+                yield delta
+            if call is not None:
+                call.add_usage(*_result_usage(result))
     
-    def generate_questions(self, agent: Agent, context: Dict[str, Any], num_questions: int = 10) -> List[str]:
+    async def _run_backend(self, system_prompt: str, prompt: str, output_type: Any = None,
+                           model_settings: Optional[Dict[str, Any]] = None,
+                           estimated_tokens: Optional[int] = None, call: Optional[CallRecord] = None) -> Any:
+        """Run a call on the local backend, going through the request scheduler when one is configured
+        
+        Args:
+            system_prompt: The system prompt for the agent
+            prompt: The user prompt to send
+            output_type: Optional output type for structured responses
+            model_settings: Optional model settings for this call
+            estimated_tokens: Estimated tokens for the call (estimated from the prompts if omitted)
+            call: Optional call record that counts the attempts
+            
+        Returns:
+            The backend's output
+        """
+        factory = self._with_timeout(lambda: self.backend.run(system_prompt, prompt, output_type, model_settings))
+        if call is not None:
+            factory = call.attempt(factory)
+        if self.scheduler is None:
+            return await factory()
+        
+        if estimated_tokens is None:
+            estimated_tokens = estimate_tokens(system_prompt + prompt)
+        return await self.scheduler.run(factory, estimated_tokens)
+    
+    async def _run_agent(self, agent: "Agent", prompt: str, model_settings: Optional[Dict[str, Any]] = None,
+                         estimated_tokens: Optional[int] = None, call: Optional[CallRecord] = None) -> Any:
+        """Run an agent, going through the request scheduler when one is configured
+        
+        Args:
+            agent: The Pydantic AI agent to run
+            prompt: The user prompt to send
+            model_settings: Optional model settings for this call
+            estimated_tokens: Estimated tokens for the call (estimated from the prompt if omitted)
+            call: Optional call record that counts the attempts
+            
+        Returns:
+            The agent run result
+        """
+        factory = self._with_timeout(lambda: agent.run(prompt, model_settings=model_settings))
+        if call is not None:
+            factory = call.attempt(factory)
+        if self.scheduler is None:
+            return await factory()
+        
+        if estimated_tokens is None:
+            estimated_tokens = estimate_tokens(prompt)
+        return await self.scheduler.run(factory, estimated_tokens)
+    
+    async def generate_questions_async(self, agent: "Agent", context: Dict[str, Any], num_questions: int = 10) -> List[str]:
         """Generate questions using the provided agent and context
         
         Args:
@@ -54,10 +633,14 @@ class LLMService:
             A list of generated questions
         """
         prompt = f"Based on the following information, generate {num_questions} relevant questions:\n\n{context}"
-        result = agent.run_sync(prompt)
+        result = await self._run_agent(agent, prompt)
         return result.output
     
-    def generate_keywords(self, agent: Agent, questions_and_answers: Dict[str, str]) -> List[str]:
+    def generate_questions(self, agent: "Agent", context: Dict[str, Any], num_questions: int = 10) -> List[str]:
+        """Synchronous wrapper around generate_questions_async"""
+        return run_sync(self.generate_questions_async(agent, context, num_questions))
+    
+    async def generate_keywords_async(self, agent: "Agent", questions_and_answers: Dict[str, str]) -> List[str]:
         """Generate keywords based on questions and answers
         
         Args:
@@ -69,10 +652,14 @@ class LLMService:
         """
         qa_text = "\n\n".join([f"Q: {q}\nA: {a}" for q, a in questions_and_answers.items()])
         prompt = f"Based on the following questions and answers, generate a list of relevant keywords:\n\n{qa_text}"
-        result = agent.run_sync(prompt)
+        result = await self._run_agent(agent, prompt)
         return result.output
     
-    def generate_ideal_customer_profile(self, agent: Agent, all_qa_data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_keywords(self, agent: "Agent", questions_and_answers: Dict[str, str]) -> List[str]:
+        """Synchronous wrapper around generate_keywords_async"""
+        return run_sync(self.generate_keywords_async(agent, questions_and_answers))
+    
+    async def generate_ideal_customer_profile_async(self, agent: "Agent", all_qa_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate an ideal customer profile based on all collected data
         
         Args:
@@ -90,5 +677,9 @@ class LLMService:
                 formatted_data += f"Q: {q}\nA: {a}\n"
         
         prompt = f"Based on all the following information, generate a detailed ideal customer profile:\n\n{formatted_data}"
-        result = agent.run_sync(prompt)
-        return result.output
\ No newline at end of file
+        result = await self._run_agent(agent, prompt)
+        return result.output
+    
+    def generate_ideal_customer_profile(self, agent: "Agent", all_qa_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Synchronous wrapper around generate_ideal_customer_profile_async"""
+        return run_sync(self.generate_ideal_customer_profile_async(agent, all_qa_data))
\ No newline at end of file
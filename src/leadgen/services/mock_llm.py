@@ -0,0 +1,361 @@
+# Local deterministic stand-in for the Groq model, for offline runs and benchmarks
+
+import re
+import json
+import math
+import random
+import asyncio
+import hashlib
+import threading
+import typing
+from typing import Dict, List, Any, Optional, AsyncIterator
+
+from pydantic import BaseModel
+
+from leadgen.utils.tokens import count_tokens
+
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+_COUNT_PATTERN = re.compile(r"\b(?:generate|return)\s+(\d+)\b", re.IGNORECASE)
+
+_STOPWORDS = {
+    "about", "above", "after", "also", "answer", "answers", "based", "been", "being", "business",
+    "following", "from", "generate", "generation", "have", "into", "information", "keywords", "lead",
+    "more", "most", "other", "question", "questions", "relevant", "should", "some", "such", "than",
+    "that", "their", "them", "then", "there", "these", "they", "this", "those", "what", "when",
+    "where", "which", "while", "will", "with", "would", "your", "yours",
+}
+
+_QUESTION_TEMPLATES = [
+    "How do you currently reach customers interested in {a}?",
+    "What budget do your buyers usually set aside for {a}?",
+    "Which competitors do prospects compare you with for {a} and {b}?",
+    "Who signs off on purchases related to {a} in a typical customer?",
+    "What objections do you hear most often about {a}?",
+    "How long does a typical {a} sales cycle take?",
+    "Which channels bring you the best {a} leads today?",
+    "What results do customers expect in the first months of using {a}?",
+    "How does {a} fit into your customers' existing {b} workflow?",
+    "Which customer segment gets the most value from {a}?",
+]
+
+_PROFILE_SECTIONS = [
+    "Demographics", "Firmographics", "Psychographics", "Behaviors",
+    "Pain Points", "Goals", "Buying Patterns",
+]
+
+
+class MockLLMError(Exception):
+    """Simulated API error carrying an HTTP status code, so the scheduler treats it like a real one"""
+
+    def __init__(self, status_code: int = 503):
+        """Initialize the error
+
+        Args:
+            status_code: Simulated HTTP status code
+        """
+        super().__init__(f"Simulated LLM error ({status_code})")
+        self.status_code = status_code
+
+
+class MockLLMBackend:
+    """Deterministic local LLM backend with simulated latency and token usage
+
+    Outputs depend only on the seed and the prompts, so identical calls always
+    return identical results. Structured outputs are built from the output
+    model's fields and validated against it; plain-text outputs read like a
+    short customer profile. Latency is drawn from a fixed, normal or long-tail
+    (log-normal) distribution, and streamed text is paced at tokens_per_second.
+    """
+
+    def __init__(self, seed: int = 0, distribution: str = "fixed", mean_seconds: float = 0.5,
+                 stddev_seconds: float = 0.1, tail_sigma: float = 1.0, tokens_per_second: float = 200.0,
+                 error_rate: float = 0.0):
+        """Initialize the backend
+
+        Args:
+            seed: Seed for outputs and latency draws
+            distribution: "fixed", "normal" or "long_tail"
+            mean_seconds: Fixed latency, mean of the normal distribution or median of the long tail
+            stddev_seconds: Standard deviation of the normal distribution
+            tail_sigma: Log-space standard deviation of the long-tail distribution
+            tokens_per_second: Output rate used to pace streamed responses
+            error_rate: Fraction of calls that fail with a simulated 503
+        """
+        if distribution not in ("fixed", "normal", "long_tail"):
+            raise ValueError(f"Unsupported latency distribution: {distribution}")
+        self.seed = seed
+        self.distribution = distribution
+        self.mean_seconds = mean_seconds
+        self.stddev_seconds = stddev_seconds
+        self.tail_sigma = tail_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.usage: Dict[str, int] = {"requests": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "MockLLMBackend":
+        """Create a backend from the llm.mock section of config.yaml
+
+        Args:
+            config: The llm.mock configuration dictionary
+
+        Returns:
+            A configured MockLLMBackend
+        """
+        latency = config.get("latency", {})
+        return cls(
+            seed=config.get("seed", 0),
+            distribution=latency.get("distribution", "fixed"),
+            mean_seconds=latency.get("mean_seconds", 0.5),
+            stddev_seconds=latency.get("stddev_seconds", 0.1),
+            tail_sigma=latency.get("tail_sigma", 1.0),
+            tokens_per_second=config.get("tokens_per_second", 200.0),
+            error_rate=config.get("error_rate", 0.0),
+        )
+
+    def sample_latency(self) -> float:
+        """Draw the time to the first token of a call
+
+        Returns:
+            Latency in seconds
+        """
+        with self._lock:
+            if self.distribution == "normal":
+                return max(0.0, self._rng.gauss(self.mean_seconds, self.stddev_seconds))
+            if self.distribution == "long_tail":
+                return self._rng.lognormvariate(math.log(max(self.mean_seconds, 1e-6)), self.tail_sigma)
+            return self.mean_seconds
+
+    def _should_fail(self) -> bool:
+        """Decide whether the next call fails
+
+        Returns:
+            True if a simulated error should be raised
+        """
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _record(self, prompt_text: str, output_text: str, error: bool = False) -> None:
+        """Add a call to the usage counters
+
+        Args:
+            prompt_text: System and user prompt sent
+            output_text: Text of the output
+            error: Whether the call failed
+        """
+        with self._lock:
+            self.usage["requests"] += 1
+            self.usage["input_tokens"] += count_tokens(prompt_text)
+            if error:
+                self.usage["errors"] += 1
+            else:
+                self.usage["output_tokens"] += count_tokens(output_text)
+
+    def _call_rng(self, system_prompt: str, prompt: str, output_type: Any) -> random.Random:
+        """Get the random generator that determines a call's output
+
+        Args:
+            system_prompt: The system prompt
+            prompt: The user prompt
+            output_type: The requested output type
+
+        Returns:
+            A Random seeded from the seed, the prompts and the output type
+        """
+        payload = json.dumps([self.seed, system_prompt, prompt, getattr(output_type, "__name__", "str")])
+        return random.Random(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+
+    @staticmethod
+    def _vocabulary(prompt: str) -> List[str]:
+        """Get the distinct content words of a prompt in order of appearance
+
+        Args:
+            prompt: The user prompt
+
+        Returns:
+            List of lowercase words
+        """
+        words: List[str] = []
+        for word in _WORD_PATTERN.findall(prompt):
+            word = word.lower()
+            if word not in _STOPWORDS and word not in words:
+                words.append(word)
+        return words or ["solution", "customer", "service", "growth", "platform"]
+
+    def _phrase(self, rng: random.Random, vocabulary: List[str], min_words: int = 1, max_words: int = 3) -> str:
+        """Build a short phrase of distinct words from the vocabulary"""
+        size = min(rng.randint(min_words, max_words), len(vocabulary))
+        return " ".join(rng.sample(vocabulary, size))
+
+    def _text(self, rng: random.Random, vocabulary: List[str], max_tokens: Optional[int] = None) -> str:
+        """Build a plain-text answer shaped like a customer profile
+
+        Args:
+            rng: Random generator for the call
+            vocabulary: Words to build the text from
+            max_tokens: Optional output token cap
+
+        Returns:
+            The text
+        """
+        lines = ["Ideal Customer Profile", ""]
+        for section in _PROFILE_SECTIONS:
+            items = ", ".join(self._phrase(rng, vocabulary) for _ in range(rng.randint(2, 4)))
+            lines.append(f"{section}: Customers focused on {items}.")
+        text = "\n".join(lines)
+        if max_tokens is not None and count_tokens(text) > max_tokens:
+            words = text.split(" ")
+            while words and count_tokens(" ".join(words)) > max_tokens:
+                words = words[: len(words) * 9 // 10]
+            text = " ".join(words)
+        return text
+
+    def _value(self, annotation: Any, name: str, rng: random.Random, vocabulary: List[str], count: int) -> Any:
+        """Build a value for a model field
+
+        Args:
+            annotation: The field's type annotation
+            name: The field's name
+            rng: Random generator for the call
+            vocabulary: Words to build strings from
+            count: Number of items requested by the prompt (for question and keyword lists)
+
+        Returns:
+            A value valid for the annotation
+        """
+        origin = typing.get_origin(annotation)
+        args = typing.get_args(annotation)
+        if origin is typing.Union:
+            options = [arg for arg in args if arg is not type(None)]
+            return self._value(options[0], name, rng, vocabulary, count) if options else None
+        if origin in (list, List):
+            size = count if name in ("questions", "keywords") else rng.randint(2, 4)
+            item_type = args[0] if args else str
+            items: List[Any] = []
+            attempts = 0
+            while len(items) < size and attempts < size * 10:
+                attempts += 1
+                item = self._value(item_type, name, rng, vocabulary, count)
+                if item not in items:
+                    items.append(item)
+            return items
+        if origin in (dict, Dict):
+            return {}
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return self._model(annotation, rng, vocabulary, count)
+        if annotation is bool:
+            return rng.random() < 0.5
+        if annotation is int:
+            return rng.randint(1, 100)
+        if annotation is float:
+            return round(rng.random(), 3)
+
+        if "question" in name:
+            template = rng.choice(_QUESTION_TEMPLATES)
+            return template.format(a=self._phrase(rng, vocabulary, 1, 2), b=rng.choice(vocabulary))
+        if "keyword" in name:
+            return self._phrase(rng, vocabulary, 1, 4)
+        if name == "summary":
+            return self._text(rng, vocabulary)
+        return self._phrase(rng, vocabulary)
+
+    def _model(self, output_type: Any, rng: random.Random, vocabulary: List[str], count: int) -> Dict[str, Any]:
+        """Build field values for a pydantic model
+
+        Args:
+            output_type: The pydantic model class
+            rng: Random generator for the call
+            vocabulary: Words to build strings from
+            count: Number of items requested by the prompt
+
+        Returns:
+            Dictionary of field values
+        """
+        return {
+            name: self._value(field.annotation, name, rng, vocabulary, count)
+            for name, field in output_type.model_fields.items()
+        }
+
+    def generate(self, system_prompt: str, prompt: str, output_type: Any = None,
+                 model_settings: Optional[Dict[str, Any]] = None) -> Any:
+        """Build the output for a call without any simulated delay
+
+        Args:
+            system_prompt: The system prompt
+            prompt: The user prompt
+            output_type: Optional pydantic model for structured output
+            model_settings: Optional model settings (max_tokens caps plain-text output)
+
+        Returns:
+            A validated output_type instance, or a string for plain-text calls
+        """
+        rng = self._call_rng(system_prompt, prompt, output_type)
+        vocabulary = self._vocabulary(prompt)
+        if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+            match = _COUNT_PATTERN.search(prompt)
+            count = int(match.group(1)) if match else 10
+            return output_type.model_validate(self._model(output_type, rng, vocabulary, count))
+        return self._text(rng, vocabulary, (model_settings or {}).get("max_tokens"))
+
+    async def run(self, system_prompt: str, prompt: str, output_type: Any = None,
+                  model_settings: Optional[Dict[str, Any]] = None) -> Any:
+        """Simulate a model call
+
+        Args:
+            system_prompt: The system prompt
+            prompt: The user prompt
+            output_type: Optional pydantic model for structured output
+            model_settings: Optional model settings for this call
+
+        Returns:
+            The output, after the simulated latency and generation time
+
+        Raises:
+            MockLLMError: For the fraction of calls set by error_rate
+        """
+        await asyncio.sleep(self.sample_latency())
+        if self._should_fail():
+            self._record(system_prompt + prompt, "", error=True)
+            raise MockLLMError(503)
+
+        output = self.generate(system_prompt, prompt, output_type, model_settings)
+        output_text = output.model_dump_json() if isinstance(output, BaseModel) else output
+        if self.tokens_per_second > 0:
+            await asyncio.sleep(count_tokens(output_text) / self.tokens_per_second)
+        self._record(system_prompt + prompt, output_text)
+        return output
+
+    async def stream(self, system_prompt: str, prompt: str,
+                     model_settings: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Simulate a streamed plain-text model call
+
+        Args:
+            system_prompt: The system prompt
+            prompt: The user prompt
+            model_settings: Optional model settings for this call
+
+        Yields:
+            Text deltas paced at tokens_per_second
+
+        Raises:
+            MockLLMError: For the fraction of calls set by error_rate (before the first delta)
+        """
+        await asyncio.sleep(self.sample_latency())
+        if self._should_fail():
+            self._record(system_prompt + prompt, "", error=True)
+            raise MockLLMError(503)
+
+        text = self.generate(system_prompt, prompt, None, model_settings)
+        words = text.split(" ")
+        for start in range(0, len(words), 4):
+            delta = " ".join(words[start:start + 4])
+            if start + 4 < len(words):
+                delta += " "
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(count_tokens(delta) / self.tokens_per_second)
+            yield delta
+        self._record(system_prompt + prompt, text)
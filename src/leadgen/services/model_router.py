@@ -0,0 +1,144 @@
+# Per-agent model routing with fallback chains and hedged requests
+
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Deque
+
+
+class ModelRouter:
+    """Chooses the model for each agent and tracks latencies for hedged requests
+
+    Each agent (by its prompts.yaml name) maps to a primary model, falling back
+    to the default model. When a call to the primary fails or times out, the
+    fallback models are tried in order. With hedging enabled, a call that has
+    not finished after the hedge percentile of the model's recent latencies is
+    duplicated on the hedge model and the first successful response is used.
+    """
+
+    def __init__(self, default_model: str, agent_models: Optional[Dict[str, str]] = None,
+                 fallback_models: Optional[List[str]] = None, timeout_seconds: Optional[float] = None,
+                 hedge_percentile: Optional[float] = None, hedge_model: Optional[str] = None,
+                 hedge_min_samples: int = 20, latency_window: int = 200):
+        """Initialize the router
+
+        Args:
+            default_model: Model used by agents without an entry in agent_models
+            agent_models: Mapping of agent names to models
+            fallback_models: Models tried in order when the primary fails or times out
+            timeout_seconds: Time after which an attempt counts as failed (None for no timeout)
+            hedge_percentile: Latency percentile (0-100) after which a call is hedged (None to disable)
+            hedge_model: Model for hedged requests (defaults to the first fallback other than
+                the primary, or the primary itself)
+            hedge_min_samples: Latencies to observe for a model before its calls are hedged
+            latency_window: Number of recent latencies kept per model
+        """
+        self.default_model = default_model
+        self.agent_models = dict(agent_models or {})
+        self.fallback_models = list(fallback_models or [])
+        self.timeout_seconds = timeout_seconds
+        self.hedge_percentile = hedge_percentile
+        self.hedge_model = hedge_model
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_window = latency_window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"fallbacks": 0, "hedges": 0, "hedge_wins": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], model_prefix: str = "") -> "ModelRouter":
+        """Create a router from the llm section of config.yaml
+
+        Args:
+            config: The llm configuration dictionary
+            model_prefix: Prefix added to every model name (e.g. to keep mock
+                responses apart from real ones in the response cache)
+
+        Returns:
+            A configured ModelRouter
+        """
+        hedging = config.get("hedging", {})
+        hedge_model = hedging.get("model")
+        return cls(
+            default_model=model_prefix + config.get("model", "qwen/qwen3-32b"),
+            agent_models={agent: model_prefix + model for agent, model in (config.get("agent_models") or {}).items()},
+            fallback_models=[model_prefix + model for model in config.get("fallback_models") or []],
+            timeout_seconds=config.get("timeout_seconds"),
+            hedge_percentile=hedging.get("percentile") if hedging.get("enabled", False) else None,
+            hedge_model=model_prefix + hedge_model if hedge_model else None,
+            hedge_min_samples=hedging.get("min_samples", 20),
+            latency_window=hedging.get("window", 200),
+        )
+
+    def route(self, agent: Optional[str] = None) -> List[str]:
+        """Get the models to try for an agent's call, in order
+
+        Args:
+            agent: Name of the calling agent
+
+        Returns:
+            The primary model followed by the fallback models
+        """
+        primary = self.agent_models.get(agent, self.default_model) if agent else self.default_model
+        return [primary] + [model for model in self.fallback_models if model != primary]
+
+    def get_hedge_model(self, model: str) -> str:
+        """Get the model a hedged request for model is sent to
+
+        Args:
+            model: The model of the original request
+
+        Returns:
+            The hedge model
+        """
+        if self.hedge_model:
+            return self.hedge_model
+        return next((fallback for fallback in self.fallback_models if fallback != model), model)
+
+    def observe_latency(self, model: str, seconds: float) -> None:
+        """Add the latency of a successful call
+
+        Args:
+            model: The model that answered
+            seconds: Time the call took
+        """
+        with self._lock:
+            latencies = self._latencies.get(model)
+            if latencies is None:
+                latencies = self._latencies[model] = deque(maxlen=self.latency_window)
+            latencies.append(seconds)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Get the time after which a call to model should be hedged
+
+        Args:
+            model: The model of the call
+
+        Returns:
+            The hedge_percentile latency of the model's recent calls, or None if
+            hedging is disabled or too few calls have been observed
+        """
+        if self.hedge_percentile is None:
+            return None
+        with self._lock:
+            latencies = sorted(self._latencies.get(model, ()))
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        index = min(len(latencies) - 1, max(0, math.ceil(self.hedge_percentile / 100 * len(latencies)) - 1))
+        return latencies[index]
+
+    def record_fallback(self) -> None:
+        """Count a call that moved on to a fallback model"""
+        with self._lock:
+            self.stats["fallbacks"] += 1
+
+    def record_hedge(self, won: bool) -> None:
+        """Count a hedged request
+
+        Args:
+            won: Whether the hedged request answered first
+        """
+        with self._lock:
+            self.stats["hedges"] += 1
+            if won:
+                self.stats["hedge_wins"] += 1
@@ -0,0 +1,161 @@
+# Output-token budgets per agent, tuned from the output lengths actually observed
+
+import os
+import json
+import math
+import atexit
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Deque
+
+
+class OutputBudgetTuner:
+    """Records output token counts per agent and proposes tighter max_tokens caps
+
+    A proposal is the given percentile of the agent's recent output lengths
+    plus headroom, rounded up to a multiple of round_to and never above the
+    configured cap. With apply enabled, proposals replace the configured caps
+    of the agents that have enough samples.
+    """
+
+    def __init__(self, path: Optional[str] = None, percentile: float = 99.0, headroom: float = 1.25,
+                 min_samples: int = 20, window: int = 500, round_to: int = 50, apply: bool = False):
+        """Initialize the tuner, loading previously recorded counts
+
+        Args:
+            path: JSON file the counts are kept in across runs (None to keep them in memory)
+            percentile: Percentile (0-100) of observed output lengths a cap must cover
+            headroom: Factor applied on top of the percentile
+            min_samples: Calls to observe for an agent before proposing a cap
+            window: Number of recent counts kept per agent
+            round_to: Proposals are rounded up to a multiple of this
+            apply: Whether run_async calls use the proposed caps
+        """
+        self.path = path
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window = window
+        self.round_to = round_to
+        self.apply_proposals = apply
+        self._counts: Dict[str, Deque[int]] = {}
+        self._caps: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, "r") as file:
+                stored = json.load(file)
+            for agent, counts in stored.get("output_tokens", {}).items():
+                self._counts[agent] = deque(counts, maxlen=window)
+            self._caps.update(stored.get("max_tokens", {}))
+        if path:
+            atexit.register(self.save)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "OutputBudgetTuner":
+        """Create a tuner from the agent_params.auto_tune section of params.yaml
+
+        Args:
+            config: The auto_tune configuration dictionary
+
+        Returns:
+            A configured OutputBudgetTuner
+        """
+        return cls(
+            path=config.get("path"),
+            percentile=config.get("percentile", 99.0),
+            headroom=config.get("headroom", 1.25),
+            min_samples=config.get("min_samples", 20),
+            window=config.get("window", 500),
+            round_to=config.get("round_to", 50),
+            apply=config.get("apply", False),
+        )
+
+    def record(self, agent: str, output_tokens: int, max_tokens: Optional[int] = None) -> None:
+        """Add the output length of a successful call
+
+        Args:
+            agent: Name of the agent
+            output_tokens: Tokens the call generated
+            max_tokens: The cap the call ran with, if any
+        """
+        with self._lock:
+            counts = self._counts.get(agent)
+            if counts is None:
+                counts = self._counts[agent] = deque(maxlen=self.window)
+            counts.append(output_tokens)
+            if max_tokens is not None:
+                self._caps[agent] = max_tokens
+            self._dirty = True
+
+    def _proposal(self, agent: str, counts: List[int]) -> Optional[int]:
+        """Compute the proposed cap for an agent (lock must be held)"""
+        if len(counts) < self.min_samples:
+            return None
+        ordered = sorted(counts)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+        proposed = math.ceil(ordered[index] * self.headroom / self.round_to) * self.round_to
+        cap = self._caps.get(agent)
+        return min(proposed, cap) if cap else proposed
+
+    def propose(self) -> Dict[str, Dict[str, Any]]:
+        """Get the observed output lengths and proposed caps of every agent
+
+        Returns:
+            Dictionary keyed by agent with samples, p50, the tuned percentile,
+            max, current cap and proposed cap (None until min_samples calls are in)
+        """
+        proposals: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for agent, counts in sorted(self._counts.items()):
+                ordered = sorted(counts)
+                index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+                proposals[agent] = {
+                    "samples": len(ordered),
+                    "p50": ordered[(len(ordered) - 1) // 2],
+                    f"p{self.percentile:g}": ordered[index],
+                    "max": ordered[-1],
+                    "current_max_tokens": self._caps.get(agent),
+                    "proposed_max_tokens": self._proposal(agent, ordered),
+                }
+        return proposals
+
+    def apply(self, agent: Optional[str], model_settings: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Lower a call's max_tokens to the agent's proposed cap when apply is enabled
+
+        Args:
+            agent: Name of the calling agent
+            model_settings: The call's configured model settings
+
+        Returns:
+            The model settings to use
+        """
+        if not self.apply_proposals or not agent:
+            return model_settings
+        with self._lock:
+            counts = self._counts.get(agent)
+            proposed = self._proposal(agent, list(counts)) if counts else None
+        if proposed is None:
+            return model_settings
+        current = (model_settings or {}).get("max_tokens")
+        if current is not None and current <= proposed:
+            return model_settings
+        return {**(model_settings or {}), "max_tokens": proposed}
+
+    def save(self) -> None:
+        """Write the recorded counts to path (atomically)"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            data = {
+                "output_tokens": {agent: list(counts) for agent, counts in self._counts.items()},
+                "max_tokens": dict(self._caps),
+            }
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,246 @@
+# Token-budgeted compaction of Q&A context for the keyword and ICP stages
+
+import re
+import asyncio
+from typing import Dict, Any, Optional, Tuple
+
+from leadgen.utils.helpers import format_all_qa_for_prompt
+from leadgen.utils.tokens import count_tokens
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+_ELLIPSIS = " [...] "
+
+
+def clean_answer(answer: str) -> str:
+    """Collapse whitespace and drop repeated sentences from an answer
+
+    Args:
+        answer: Raw answer text
+
+    Returns:
+        Cleaned answer text
+    """
+    seen = set()
+    sentences = []
+    for sentence in _SENTENCE_PATTERN.split(answer):
+        sentence = " ".join(sentence.split())
+        key = sentence.lower()
+        if sentence and key not in seen:
+            seen.add(key)
+            sentences.append(sentence)
+    return " ".join(sentences)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shorten text to about max_tokens, keeping its beginning and end
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget for the result
+
+    Returns:
+        The text itself if it fits, otherwise its head and tail joined by an ellipsis
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    words = text.split()
+    # Binary search for the number of words whose head (2/3) + tail (1/3) fits the budget
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        head = middle * 2 // 3
+        candidate = " ".join(words[:head]) + _ELLIPSIS + " ".join(words[len(words) - (middle - head):])
+        if count_tokens(candidate) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    head = low * 2 // 3
+    return " ".join(words[:head]) + _ELLIPSIS + " ".join(words[len(words) - (low - head):])
+
+
+class QAContext:
+    """Q&A context for a session, compacted once and shared by the keyword and ICP stages
+
+    Answers are cleaned (whitespace collapsed, repeated sentences removed) and
+    optionally summarized once when the context is built. Rendering for a
+    stage then trims the longest answers until the stage's token budget is met;
+    each rendering is memoized per budget.
+    """
+
+    def __init__(self, sections: Dict[str, Dict[str, str]], original_tokens: int, summarized_answers: int = 0):
+        """Initialize the context
+
+        Args:
+            sections: Cleaned Q&A dictionaries keyed by section title
+            original_tokens: Token count of the Q&A before compaction
+            summarized_answers: Number of answers replaced by an LLM summary
+        """
+        self.sections = sections
+        self.original_tokens = original_tokens
+        self.summarized_answers = summarized_answers
+        self._rendered: Dict[Tuple[Optional[int], Optional[int]], Tuple[str, Dict[str, Any]]] = {}
+
+    def render(self, budget: Optional[int] = None, max_answer_tokens: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """Render the context within a token budget
+
+        Args:
+            budget: Token budget for the whole Q&A text (None for unlimited)
+            max_answer_tokens: Cap applied to every answer before fitting the budget
+
+        Returns:
+            Tuple of the formatted Q&A text and its prompt-size metrics
+        """
+        cache_key = (budget, max_answer_tokens)
+        if cache_key in self._rendered:
+            return self._rendered[cache_key]
+
+        answers = {
+            (section, question): answer
+            for section, qa_dict in self.sections.items()
+            for question, answer in qa_dict.items()
+        }
+        rendered = {
+            key: truncate_to_tokens(answer, max_answer_tokens) if max_answer_tokens else answer
+            for key, answer in answers.items()
+        }
+        sizes = {key: count_tokens(answer) for key, answer in rendered.items()}
+
+        def build() -> str:
+            sections: Dict[str, Dict[str, str]] = {section: {} for section in self.sections}
+            for (section, question), answer in rendered.items():
+                sections[section][question] = answer
+            return format_all_qa_for_prompt(sections)
+
+        text = build()
+        tokens = count_tokens(text)
+
+        # Shrink the longest answer by a quarter at a time until the budget is met,
+        # tracking the total incrementally and re-counting exactly at the end
+        while budget is not None and tokens > budget and sizes:
+            key = max(sizes, key=sizes.get)
+            if sizes[key] <= 16:
+                break
+            shortened = truncate_to_tokens(answers[key], sizes[key] * 3 // 4)
+            new_size = count_tokens(shortened)
+            tokens -= sizes[key] - new_size
+            rendered[key] = shortened
+            sizes[key] = new_size
+
+        text = build()
+        tokens = count_tokens(text)
+        truncated = sum(1 for key, answer in rendered.items() if answer != answers[key])
+        metrics = {
+            "original_tokens": self.original_tokens,
+            "prompt_tokens": tokens,
+            "budget": budget,
+            "truncated_answers": truncated,
+            "summarized_answers": self.summarized_answers,
+        }
+        self._rendered[cache_key] = (text, metrics)
+        return text, metrics
+
+
+class PromptCompactor:
+    """Builds QAContext objects according to the prompt_budget section of params.yaml"""
+
+    def __init__(self, budget_config: Dict[str, Any], llm_service: Any = None, summarizer_prompt: Optional[str] = None,
+                 summarizer_settings: Optional[Dict[str, Any]] = None):
+        """Initialize the compactor
+
+        Args:
+            budget_config: The prompt_budget configuration dictionary
+            llm_service: LLM service used to summarize over-long answers
+            summarizer_prompt: System prompt for the answer summarizer
+            summarizer_settings: Model settings for the summarizer calls
+        """
+        self.max_answer_tokens = budget_config.get("max_answer_tokens")
+        self.stage_budgets: Dict[str, int] = budget_config.get("stages", {})
+        self.summarize = bool(budget_config.get("summarize_long_answers", False)) and llm_service is not None
+        self.summarize_threshold = budget_config.get("summarize_threshold_tokens", 1200)
+        self.summary_tokens = budget_config.get("summary_tokens", 250)
+        self.llm_service = llm_service
+        self.summarizer_prompt = summarizer_prompt or "Summarize the answer, keeping every concrete fact."
+        self.summarizer_settings = summarizer_settings
+
+    async def build(self, sections: Dict[str, Dict[str, str]], summaries: Optional[Dict[str, str]] = None) -> QAContext:
+        """Clean, and if configured summarize, the Q&A for a session
+
+        Over-long answers are summarized concurrently, so several of them cost
+        one summarizer round trip rather than one each.
+
+        Args:
+            sections: Q&A dictionaries keyed by section title
+            summaries: Previously generated summaries keyed by answer text; new
+                summaries are added to it so they are never generated twice
+
+        Returns:
+            The compacted context
+        """
+        original_tokens = count_tokens(format_all_qa_for_prompt(sections))
+        summaries = summaries if summaries is not None else {}
+
+        cleaned = {
+            section: {question: clean_answer(answer) for question, answer in qa_dict.items()}
+            for section, qa_dict in sections.items()
+        }
+        long_answers = set()
+        if self.summarize:
+            long_answers = {
+                answer for qa_dict in cleaned.values() for answer in qa_dict.values()
+                if count_tokens(answer) > self.summarize_threshold
+            }
+
+        # Each distinct answer is summarized once, all of them at the same time
+        missing = {
+            answer: question
+            for qa_dict in cleaned.values() for question, answer in qa_dict.items()
+            if answer in long_answers and answer not in summaries
+        }
+        if missing:
+            tasks = [asyncio.ensure_future(self._summarize(question, answer)) for answer, question in missing.items()]
+            try:
+                summaries.update(zip(missing, await asyncio.gather(*tasks)))
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        summarized = 0
+        for qa_dict in cleaned.values():
+            for question, answer in qa_dict.items():
+                if answer in long_answers:
+                    qa_dict[question] = summaries[answer]
+                    summarized += 1
+
+        return QAContext(cleaned, original_tokens, summarized)
+
+    async def _summarize(self, question: str, answer: str) -> str:
+        """Summarize one over-long answer with the summarizer agent
+
+        Args:
+            question: The question the answer belongs to
+            answer: The cleaned answer
+
+        Returns:
+            The summary
+        """
+        return await self.llm_service.run_async(
+            system_prompt=self.summarizer_prompt,
+            prompt=f"Summarize this answer to \"{question}\" in at most "
+                   f"{self.summary_tokens} tokens:\n\n{answer}",
+            model_settings=self.summarizer_settings,
+            name="answer_summarizer_agent",
+        )
+
+    def render(self, context: QAContext, stage: str) -> Tuple[str, Dict[str, Any]]:
+        """Render a context within a stage's token budget
+
+        Args:
+            context: The compacted context
+            stage: Stage name as used in prompt_budget.stages
+
+        Returns:
+            Tuple of the formatted Q&A text and its prompt-size metrics
+        """
+        return context.render(self.stage_budgets.get(stage), self.max_answer_tokens)
@@ -0,0 +1,277 @@
+# Nearest-neighbour reuse of personalized questions across sessions with near-identical default answers
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from leadgen.services.keyword_index import tokenize, stem_token
+
+logger = logging.getLogger(__name__)
+
+
+def hash_vector(answers: List[str], dimensions: int = 1024) -> np.ndarray:
+    """Embed a list of answers with a signed hashing vectorizer
+
+    Features are the stemmed unigrams and bigrams of each answer, prefixed with
+    the answer's position so that the same words given to different questions
+    don't match. Weights are 1 + log(tf), and the vector is L2-normalized, so the
+    dot product of two vectors is their cosine similarity.
+
+    Args:
+        answers: Answers in question order
+        dimensions: Size of the vector
+
+    Returns:
+        The normalized float32 vector
+    """
+    counts: Dict[str, int] = {}
+    for position, answer in enumerate(answers):
+        tokens = [stem_token(token) for token in tokenize(answer)]
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            key = f"{position}:{feature}"
+            counts[key] = counts.get(key, 0) + 1
+
+    vector = np.zeros(dimensions, dtype=np.float32)
+    if not counts:
+        return vector
+    hashes = np.array([zlib.crc32(key.encode("utf-8")) for key in counts], dtype=np.uint64)
+    weights = 1.0 + np.log(np.array(list(counts.values()), dtype=np.float32))
+    signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, (hashes % np.uint64(dimensions)).astype(np.int64), signs * weights)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class _Group:
+    """The entries of one group, held as a ring buffer of vectors
+
+    The matrix grows by doubling up to max_entries rows. Once it is full, a new
+    entry overwrites the oldest row, so adding never copies the whole matrix.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int):
+        """Initialize an empty group
+
+        Args:
+            dimensions: Size of the vectors
+            max_entries: Most entries kept
+        """
+        self.max_entries = max_entries
+        self.matrix = np.zeros((0, dimensions), dtype=np.float32)
+        self.session_ids: List[str] = []
+        self.questions: List[List[str]] = []
+        self.rows: Dict[str, int] = {}
+        # Row holding the oldest entry once the buffer is full
+        self.cursor = 0
+
+    def put(self, session_id: str, vector: np.ndarray, questions: List[str]) -> Optional[str]:
+        """Store an entry, replacing the session's earlier one or the oldest entry
+
+        Args:
+            session_id: ID of the session
+            vector: The session's answer vector
+            questions: The session's personalized questions
+
+        Returns:
+            ID of the session whose entry was overwritten to make room, if any
+        """
+        row = self.rows.get(session_id)
+        evicted = None
+        if row is None:
+            count = len(self.session_ids)
+            if count < self.max_entries:
+                if count == len(self.matrix):
+                    grown = np.zeros((min(self.max_entries, max(16, 2 * count)), self.matrix.shape[1]), dtype=np.float32)
+                    grown[:count] = self.matrix
+                    self.matrix = grown
+                row = count
+                self.session_ids.append(session_id)
+                self.questions.append(list(questions))
+            else:
+                row = self.cursor
+                self.cursor = (self.cursor + 1) % self.max_entries
+                evicted = self.session_ids[row]
+                del self.rows[evicted]
+                self.session_ids[row] = session_id
+            self.rows[session_id] = row
+        self.matrix[row] = vector
+        self.questions[row] = list(questions)
+        return evicted
+
+
+class QuestionReuseIndex:
+    """SQLite-backed nearest-neighbour index from default answers to generated personalized questions
+
+    Entries are grouped by tenant, the set of default questions and the number
+    of personalized questions requested, so only compatible sessions of the same
+    tenant are compared. Questions name the business they were written for, so
+    sessions without a tenant are neither stored nor matched. The vectors of a
+    group are loaded into one NumPy matrix on first use, and a lookup is a single
+    matrix-vector product.
+    """
+
+    def __init__(self, path: str = "./data/question_reuse.sqlite3", threshold: float = 0.92,
+                 dimensions: int = 1024, max_entries: int = 20000):
+        """Initialize the index
+
+        Args:
+            path: Path to the SQLite database file
+            threshold: Cosine similarity at or above which stored questions are reused
+            dimensions: Size of the hashed answer vectors
+            max_entries: Most recent entries kept per group
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.threshold = threshold
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._groups: Dict[str, _Group] = {}
+        self.stats = {"lookups": 0, "hits": 0, "similarity_sum": 0.0, "hit_similarity_sum": 0.0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS question_reuse (
+                    session_id TEXT PRIMARY KEY, question_set TEXT NOT NULL, created_at REAL NOT NULL,
+                    dimensions INTEGER NOT NULL, vector BLOB NOT NULL, questions TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_question_reuse_set ON question_reuse(question_set, created_at);
+                """
+            )
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "QuestionReuseIndex":
+        """Create an index from the question_reuse section of config.yaml
+
+        Args:
+            config: The question_reuse configuration dictionary
+
+        Returns:
+            A configured QuestionReuseIndex
+        """
+        return cls(
+            path=config.get("path", "./data/question_reuse.sqlite3"),
+            threshold=config.get("threshold", 0.92),
+            dimensions=config.get("dimensions", 1024),
+            max_entries=config.get("max_entries", 20000),
+        )
+
+    @staticmethod
+    def _group_key(tenant_id: str, default_qa: Dict[str, str], num_questions: int) -> str:
+        """Get the group of a session: its tenant, default questions and the number of questions requested"""
+        payload = json.dumps([tenant_id, list(default_qa), num_questions])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _load_group(self, group: str) -> _Group:
+        """Get a group's entries, loading them on first use (lock must be held)"""
+        if group not in self._groups:
+            # The newest max_entries rows, oldest first, so the ring buffer overwrites the oldest
+            rows = self._conn.execute(
+                "SELECT session_id, vector, questions FROM ("
+                "SELECT session_id, vector, questions, created_at FROM question_reuse "
+                "WHERE question_set = ? AND dimensions = ? ORDER BY created_at DESC LIMIT ?"
+                ") ORDER BY created_at",
+                (group, self.dimensions, self.max_entries),
+            ).fetchall()
+            entries = _Group(self.dimensions, self.max_entries)
+            for session_id, vector, questions in rows:
+                entries.put(session_id, np.frombuffer(vector, dtype=np.float32), json.loads(questions))
+            self._groups[group] = entries
+        return self._groups[group]
+
+    def lookup(self, default_qa: Dict[str, str], num_questions: int, tenant_id: str,
+               exclude_session: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Find stored questions generated from near-identical default answers
+
+        Blocking (SQLite on first use of a group, then a matrix product); call it from a worker thread.
+
+        Args:
+            default_qa: Dictionary mapping the default questions to the session's answers
+            num_questions: Number of personalized questions requested
+            tenant_id: Tenant of the session; only its own sessions are searched
+            exclude_session: Session to leave out (e.g. the one asking)
+
+        Returns:
+            {"questions", "similarity", "session_id"} for the nearest stored session if its
+            similarity reaches the threshold, otherwise None
+        """
+        vector = hash_vector(list(default_qa.values()), self.dimensions)
+        with self._lock:
+            entries = self._load_group(self._group_key(tenant_id, default_qa, num_questions))
+            count = len(entries.session_ids)
+            similarities = entries.matrix[:count] @ vector
+            if exclude_session in entries.rows:
+                similarities[entries.rows[exclude_session]] = -1.0
+            best = int(np.argmax(similarities)) if count else -1
+            similarity = float(similarities[best]) if best >= 0 else 0.0
+            hit = best >= 0 and similarity >= self.threshold
+            match = {"questions": list(entries.questions[best]), "similarity": round(similarity, 4),
+                     "session_id": entries.session_ids[best]} if hit else None
+            self.stats["lookups"] += 1
+            self.stats["similarity_sum"] += max(similarity, 0.0)
+            if hit:
+                self.stats["hits"] += 1
+                self.stats["hit_similarity_sum"] += similarity
+            hit_rate = self.stats["hits"] / self.stats["lookups"]
+        logger.info("Question reuse %s (nearest similarity %.3f, threshold %.2f, %d candidates, hit rate %.1f%%)",
+                    "hit" if hit else "miss", similarity, self.threshold, count, hit_rate * 100)
+        return match
+
+    def add(self, session_id: str, default_qa: Dict[str, str], questions: List[str], num_questions: int,
+            tenant_id: str) -> None:
+        """Store the personalized questions generated for a session's default answers
+
+        Args:
+            session_id: ID of the session
+            default_qa: Dictionary mapping the default questions to the session's answers
+            questions: The generated personalized questions
+            num_questions: Number of personalized questions requested, as passed to lookup
+                (the model may return a different number)
+            tenant_id: Tenant of the session
+        """
+        group = self._group_key(tenant_id, default_qa, num_questions)
+        vector = hash_vector(list(default_qa.values()), self.dimensions)
+        with self._lock, self._conn:
+            evicted = self._load_group(group).put(session_id, vector, questions)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO question_reuse "
+                "(session_id, question_set, created_at, dimensions, vector, questions) VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, group, time.time(), self.dimensions, vector.tobytes(), json.dumps(questions)),
+            )
+            if evicted is not None:
+                self._conn.execute("DELETE FROM question_reuse WHERE session_id = ?", (evicted,))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the lookup counters
+
+        Returns:
+            Dictionary with lookups, hits, hit_rate, and the mean nearest similarity
+            of all lookups and of hits
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        lookups, hits = stats["lookups"], stats["hits"]
+        return {
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "mean_similarity": round(stats["similarity_sum"] / lookups, 4) if lookups else 0.0,
+            "mean_hit_similarity": round(stats["hit_similarity_sum"] / hits, 4) if hits else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,237 @@
+# Process-wide registry of shared services for the leadgen application
+
+import atexit
+import threading
+from typing import Optional, TYPE_CHECKING
+
+from leadgen.config.config_loader import get_config_loader
+
+if TYPE_CHECKING:
+    # Services are imported when first built, so commands that never reach
+    # the LLM (e.g. keyword queries) don't pay for httpx, pydantic and the Groq SDK
+    from leadgen.services.instrumentation import Instrumentation
+    from leadgen.services.keyword_index import KeywordIndex
+    from leadgen.services.llm_cache import LLMResponseCache
+    from leadgen.services.llm_service import LLMService
+    from leadgen.services.output_budgets import OutputBudgetTuner
+    from leadgen.services.question_reuse import QuestionReuseIndex
+    from leadgen.services.request_scheduler import RequestScheduler
+    from leadgen.services.session_storage import SessionStorage
+
+
+class ServiceRegistry:
+    """Holds the ConfigLoader and LLMService shared by every agent and pipeline
+
+    The registry is created once per process (see get_registry) so that all agents
+    reuse the same Groq model, pooled HTTP client and cached Agent objects. The
+    configuration comes from the process-wide loader of its directory, so it is
+    parsed and validated once however many registries are created.
+    """
+
+    def __init__(self, config_dir: Optional[str] = None):
+        """Initialize the service registry
+
+        Args:
+            config_dir: Directory containing configuration files (defaults to the one
+                found by resolve_config_dir)
+        """
+        self.config_loader = get_config_loader(config_dir)
+        self._llm_service: Optional["LLMService"] = None
+        self._session_storage: Optional["SessionStorage"] = None
+        self._keyword_index: Optional["KeywordIndex"] = None
+        self._instrumentation: Optional["Instrumentation"] = None
+        self._output_budgets: Optional["OutputBudgetTuner"] = None
+        self._question_reuse: Optional["QuestionReuseIndex"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def llm_service(self) -> "LLMService":
+        """Get the shared LLM service, creating it on first use
+
+        Returns:
+            The process-wide LLMService instance
+        """
+        if self._llm_service is None:
+            instrumentation = self.instrumentation
+            output_budgets = self.output_budgets
+            with self._lock:
+                if self._llm_service is None:
+                    from leadgen.services.http_client import create_http_client
+                    from leadgen.services.llm_service import LLMService
+                    from leadgen.services.model_router import ModelRouter
+
+                    config = self.config_loader.get_config()
+                    llm_config = config.get("llm", {})
+                    scheduler = self._create_scheduler()
+                    if llm_config.get("provider", "groq") == "mock":
+                        from leadgen.services.mock_llm import MockLLMBackend
+
+                        backend = MockLLMBackend.from_config(llm_config.get("mock", {}))
+                        # Model names only label the mock calls; the prefix keeps them apart in the cache
+                        router = ModelRouter.from_config(llm_config, model_prefix=f"mock-{backend.seed}/")
+                        self._llm_service = LLMService(
+                            model_name=router.default_model,
+                            cache=self._create_cache(),
+                            scheduler=scheduler,
+                            backend=backend,
+                            instrumentation=instrumentation,
+                            router=router,
+                            output_budgets=output_budgets,
+                        )
+                    else:
+                        hooks = [scheduler.observe_response] if scheduler else []
+                        router = ModelRouter.from_config(llm_config)
+                        self._llm_service = LLMService(
+                            model_name=router.default_model,
+                            cache=self._create_cache(),
+                            scheduler=scheduler,
+                            base_url=llm_config.get("base_url"),
+                            http_client=create_http_client(config.get("http", {}), hooks),
+                            instrumentation=instrumentation,
+                            router=router,
+                            output_budgets=output_budgets,
+                        )
+        return self._llm_service
+
+    @property
+    def session_storage(self) -> "SessionStorage":
+        """Get the shared session storage backend, creating it on first use
+
+        Returns:
+            The storage backend selected by storage.type in config.yaml
+        """
+        if self._session_storage is None:
+            with self._lock:
+                if self._session_storage is None:
+                    from leadgen.services.session_storage import create_session_storage
+
+                    storage_config = self.config_loader.get_config().get("storage", {})
+                    self._session_storage = create_session_storage(storage_config)
+                    # Write out any buffered sessions when the process exits
+                    atexit.register(self._session_storage.flush)
+        return self._session_storage
+
+    @property
+    def keyword_index(self) -> Optional["KeywordIndex"]:
+        """Get the shared keyword index, creating it on first use
+
+        Returns:
+            The keyword index, or None if keyword_index.enabled is false
+        """
+        index_config = self.config_loader.get_config().get("keyword_index", {})
+        if not index_config.get("enabled", False):
+            return None
+        if self._keyword_index is None:
+            with self._lock:
+                if self._keyword_index is None:
+                    from leadgen.services.keyword_index import KeywordIndex
+
+                    self._keyword_index = KeywordIndex(index_config.get("path", "./data/keyword_index.sqlite3"))
+        return self._keyword_index
+
+    @property
+    def instrumentation(self) -> Optional["Instrumentation"]:
+        """Get the shared stage and LLM call metrics, creating them on first use
+
+        Returns:
+            The instrumentation, or None if metrics.enabled is false
+        """
+        metrics_config = self.config_loader.get_config().get("metrics", {})
+        if not metrics_config.get("enabled", False):
+            return None
+        if self._instrumentation is None:
+            with self._lock:
+                if self._instrumentation is None:
+                    from leadgen.services.instrumentation import Instrumentation
+
+                    self._instrumentation = Instrumentation.from_config(metrics_config)
+        return self._instrumentation
+
+    @property
+    def output_budgets(self) -> Optional["OutputBudgetTuner"]:
+        """Get the shared output budget tuner, creating it on first use
+
+        Returns:
+            The tuner, or None if agent_params.auto_tune.enabled is false
+        """
+        tune_config = self.config_loader.get_agent_params().get("auto_tune", {})
+        if not tune_config.get("enabled", False):
+            return None
+        if self._output_budgets is None:
+            with self._lock:
+                if self._output_budgets is None:
+                    from leadgen.services.output_budgets import OutputBudgetTuner
+
+                    self._output_budgets = OutputBudgetTuner.from_config(tune_config)
+        return self._output_budgets
+
+    @property
+    def question_reuse(self) -> Optional["QuestionReuseIndex"]:
+        """Get the shared personalized question reuse index, creating it on first use
+
+        Returns:
+            The reuse index, or None if question_reuse.enabled is false
+        """
+        reuse_config = self.config_loader.get_config().get("question_reuse", {})
+        if not reuse_config.get("enabled", False):
+            return None
+        if self._question_reuse is None:
+            with self._lock:
+                if self._question_reuse is None:
+                    from leadgen.services.question_reuse import QuestionReuseIndex
+
+                    self._question_reuse = QuestionReuseIndex.from_config(reuse_config)
+        return self._question_reuse
+
+    def _create_scheduler(self) -> Optional["RequestScheduler"]:
+        """Create the request scheduler described by the rate_limits section of config.yaml
+
+        Returns:
+            The request scheduler, or None if rate limiting is disabled
+        """
+        rate_limits = self.config_loader.get_config().get("rate_limits", {})
+        if not rate_limits.get("enabled", False):
+            return None
+        from leadgen.services.request_scheduler import RequestScheduler
+        return RequestScheduler.from_config(rate_limits)
+
+    def _create_cache(self) -> Optional["LLMResponseCache"]:
+        """Create the LLM response cache described by the cache section of config.yaml
+
+        Returns:
+            The response cache, or None if caching is disabled
+        """
+        cache_config = self.config_loader.get_config().get("cache", {})
+        if not cache_config.get("enabled", False):
+            return None
+        from leadgen.services.llm_cache import LLMResponseCache
+        return LLMResponseCache(
+            path=cache_config.get("path", "./data/llm_cache.sqlite3"),
+            ttl_seconds=cache_config.get("ttl_seconds"),
+            max_entries=cache_config.get("max_entries", 10000),
+        )
+
+
+_registry: Optional[ServiceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ServiceRegistry:
+    """Get the process-wide service registry, creating it on first use
+
+    Returns:
+        The shared ServiceRegistry instance
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
+
+
+def reset_registry() -> None:
+    """Drop the process-wide registry so the next call builds a fresh one"""
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,338 @@
+# Rate-limit-aware request scheduler for Groq calls
+
+import re
+import time
+import random
+import asyncio
+from typing import Dict, Any, Optional, Callable, Awaitable, TypeVar
+
+import httpx
+
+from leadgen.utils.tokens import count_tokens
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens a prompt will consume
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count
+    """
+    return count_tokens(text) + 1
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a rate-limit reset duration such as "2m59.56s", "7.66s", "120ms" or "30"
+
+    Args:
+        value: Duration string from a response header
+
+    Returns:
+        Duration in seconds, or None if the value cannot be parsed
+    """
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute: float):
+        """Initialize the bucket full
+
+        Args:
+            per_minute: Capacity of the bucket and its refill rate per minute
+        """
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60.0)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Get how long to wait before amount tokens are available
+
+        Args:
+            amount: Number of tokens needed
+
+        Returns:
+            Seconds to wait (0 if available now)
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def consume(self, amount: float) -> None:
+        """Take tokens from the bucket
+
+        Args:
+            amount: Number of tokens to take
+        """
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def set_limit(self, per_minute: float) -> None:
+        """Change the capacity and refill rate
+
+        Args:
+            per_minute: New capacity and refill rate per minute
+        """
+        self._refill()
+        self.capacity = float(per_minute)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def cap_remaining(self, remaining: float) -> None:
+        """Lower the available tokens to what the server reports as remaining
+
+        Args:
+            remaining: Remaining budget reported by the server
+        """
+        self._refill()
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class RequestScheduler:
+    """Schedules LLM calls within requests/tokens-per-minute budgets
+
+    Every call waits for a concurrency slot and for enough request and token
+    budget. Retryable failures (429, 5xx, transport errors) are retried with
+    jittered exponential backoff, and the concurrency limit is halved on such
+    errors and grown back slowly on success (AIMD). Rate-limit headers seen by
+    observe_response keep the buckets in line with the server's view.
+    """
+
+    def __init__(self, requests_per_minute: float = 60, tokens_per_minute: float = 6000,
+                 max_concurrency: int = 8, min_concurrency: int = 1, max_retries: int = 5,
+                 backoff_base_seconds: float = 0.5, backoff_max_seconds: float = 30.0):
+        """Initialize the scheduler
+
+        Args:
+            requests_per_minute: Request budget per minute
+            tokens_per_minute: Token budget per minute
+            max_concurrency: Upper bound for concurrent in-flight calls
+            min_concurrency: Lower bound the adaptive limit never drops below
+            max_retries: Maximum retries for a retryable failure
+            backoff_base_seconds: Base delay for exponential backoff
+            backoff_max_seconds: Maximum delay between retries
+        """
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "rate_limited": 0, "server_errors": 0}
+        self._condition: Optional[asyncio.Condition] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RequestScheduler":
+        """Create a scheduler from the rate_limits section of config.yaml
+
+        Args:
+            config: The rate_limits configuration dictionary
+
+        Returns:
+            A configured RequestScheduler
+        """
+        return cls(
+            requests_per_minute=config.get("requests_per_minute", 60),
+            tokens_per_minute=config.get("tokens_per_minute", 6000),
+            max_concurrency=config.get("max_concurrency", 8),
+            min_concurrency=config.get("min_concurrency", 1),
+            max_retries=config.get("max_retries", 5),
+            backoff_base_seconds=config.get("backoff_base_seconds", 0.5),
+            backoff_max_seconds=config.get("backoff_max_seconds", 30.0),
+        )
+
+    def _get_condition(self) -> asyncio.Condition:
+        """Get the condition guarding the concurrency slots (created on the running loop)"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait for a concurrency slot and enough request/token budget
+
+        Args:
+            estimated_tokens: Estimated tokens the call will consume
+        """
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < max(self.min_concurrency, int(self.concurrency_limit)))
+            self.in_flight += 1
+
+        try:
+            while True:
+                wait = max(
+                    self.blocked_until - time.monotonic(),
+                    self.request_bucket.wait_time(1),
+                    self.token_bucket.wait_time(estimated_tokens),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        except BaseException:
+            await self.release()
+            raise
+
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(estimated_tokens)
+        self.stats["requests"] += 1
+
+    async def release(self, error: Optional[BaseException] = None) -> None:
+        """Free a concurrency slot and adapt the concurrency limit
+
+        Args:
+            error: The error the call failed with, if any
+        """
+        if error is not None and self.is_retryable(error):
+            self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+        elif error is None:
+            self.concurrency_limit = min(float(self.max_concurrency),
+                                         self.concurrency_limit + 1.0 / max(self.concurrency_limit, 1.0))
+
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    @staticmethod
+    def get_status_code(error: BaseException) -> Optional[int]:
+        """Get the HTTP status code carried by an error, if any
+
+        Args:
+            error: Exception raised by the model call
+
+        Returns:
+            The status code or None
+        """
+        status = getattr(error, "status_code", None)
+        if status is None and isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+        return status
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Check whether an error is worth retrying
+
+        Args:
+            error: Exception raised by the model call
+
+        Returns:
+            True for rate limits, server errors, timeouts and transport errors
+        """
+        # Transport errors arrive wrapped (httpx -> groq -> Pydantic AI), so look down the cause chain
+        cause, seen = error, set()
+        while cause is not None and id(cause) not in seen:
+            if isinstance(cause, (httpx.TransportError, asyncio.TimeoutError)):
+                return True
+            seen.add(id(cause))
+            cause = cause.__cause__ or cause.__context__
+        return self.get_status_code(error) in RETRYABLE_STATUS_CODES
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Get the jittered exponential backoff delay for a retry
+
+        Args:
+            attempt: Zero-based retry attempt
+
+        Returns:
+            Delay in seconds ("full jitter")
+        """
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int) -> T:
+        """Run a model call under the scheduler, retrying retryable failures
+
+        Args:
+            call: Zero-argument function returning a new awaitable for each attempt
+            estimated_tokens: Estimated tokens the call will consume
+
+        Returns:
+            The call's result
+        """
+        attempt = 0
+        while True:
+            await self.acquire(estimated_tokens)
+            try:
+                result = await call()
+            except asyncio.CancelledError as e:
+                # e.g. the losing request of a hedged pair; free its slot without adapting the limit
+                await self.release(e)
+                raise
+            except Exception as e:
+                await self.release(e)
+                if not self.is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                self.record_error(e)
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            await self.release()
+            return result
+
+    def record_error(self, error: BaseException) -> None:
+        """Count a retried error
+
+        Args:
+            error: The retryable error
+        """
+        self.stats["retries"] += 1
+        status = self.get_status_code(error)
+        if status == 429:
+            self.stats["rate_limited"] += 1
+        elif status is not None and status >= 500:
+            self.stats["server_errors"] += 1
+
+    async def observe_response(self, response: httpx.Response) -> None:
+        """httpx response hook that tunes the buckets from rate-limit headers
+
+        Args:
+            response: Response received from the Groq API
+        """
+        headers = response.headers
+
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens and limit_tokens.isdigit():
+            self.token_bucket.set_limit(float(limit_tokens))
+
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_tokens and remaining_tokens.isdigit():
+            self.token_bucket.cap_remaining(float(remaining_tokens))
+
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests and remaining_requests.isdigit() and int(remaining_requests) == 0:
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests", ""))
+            if reset:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+
+        if response.status_code == 429:
+            retry_after = parse_duration(headers.get("retry-after", "")) \
+                or parse_duration(headers.get("x-ratelimit-reset-tokens", ""))
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
@@ -0,0 +1,343 @@
+# Session storage backends for the leadgen application
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+
+from leadgen.entity.models import QuestionSession
+from leadgen.utils.helpers import is_valid_session_id
+
+# Stage completion levels stored alongside each session
+STAGE_NONE = 0
+STAGE_DEFAULT_QUESTIONS = 1
+STAGE_PERSONALIZED_QUESTIONS = 2
+STAGE_KEYWORDS = 3
+STAGE_ICP = 4
+
+
+def get_completed_stage(session: QuestionSession) -> int:
+    """Get the last completed stage of a session
+
+    Args:
+        session: The session to inspect
+
+    Returns:
+        One of the STAGE_* levels
+    """
+    if session.ideal_customer_profile is not None:
+        return STAGE_ICP
+    if session.keywords:
+        return STAGE_KEYWORDS
+    if session.personalized_questions:
+        return STAGE_PERSONALIZED_QUESTIONS
+    if session.default_questions:
+        return STAGE_DEFAULT_QUESTIONS
+    return STAGE_NONE
+
+
+class SessionStorage:
+    """Interface for session storage backends"""
+
+    def save(self, session: QuestionSession) -> str:
+        """Save a session, replacing any previous version with the same ID
+
+        Args:
+            session: The session to save
+
+        Returns:
+            Location of the saved session
+        """
+        raise NotImplementedError
+
+    def save_many(self, sessions: Iterable[QuestionSession]) -> None:
+        """Save several sessions
+
+        Args:
+            sessions: Sessions to save
+        """
+        for session in sessions:
+            self.save(session)
+
+    def load(self, session_id: str) -> QuestionSession:
+        """Load a session by ID
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            The stored session
+
+        Raises:
+            KeyError: If no session with this ID is stored
+        """
+        raise NotImplementedError
+
+    def exists(self, session_id: str) -> bool:
+        """Check whether a session is stored
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            True if the session exists
+        """
+        try:
+            self.load(session_id)
+            return True
+        except KeyError:
+            return False
+
+    def flush(self) -> None:
+        """Write out any buffered sessions"""
+
+    def close(self) -> None:
+        """Flush and release any resources held by the backend"""
+        self.flush()
+
+
+class LocalSessionStorage(SessionStorage):
+    """Stores each session as a JSON file in a directory
+
+    Sessions are saved as ``<session id>.json``, so saving and loading never
+    list the directory. Files written under the historical
+    ``<timestamp>_<session id>.json`` naming stay readable: the first lookup
+    that misses indexes them with one directory scan, and the next save of such
+    a session moves it to the new name.
+    """
+
+    def __init__(self, path: str = "./data"):
+        """Initialize the local storage
+
+        Args:
+            path: Directory to store session files in
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._legacy_paths: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _path(self, session_id: str) -> str:
+        """Get the file a session is saved to
+
+        Raises:
+            ValueError: If the ID is not a valid session ID (e.g. it contains a path separator)
+        """
+        if not is_valid_session_id(session_id):
+            raise ValueError(f"Invalid session ID: {session_id!r}")
+        return os.path.join(self.path, f"{session_id}.json")
+
+    def _legacy_path(self, session_id: str) -> Optional[str]:
+        """Find a session file with the historical timestamped name
+
+        The directory is scanned once per storage; this process never writes
+        timestamped files, so the index stays valid.
+
+        Args:
+            session_id: ID of the session
+
+        Returns:
+            Path of the newest timestamped file for the session, or None
+        """
+        with self._lock:
+            if self._legacy_paths is None:
+                legacy_paths: Dict[str, str] = {}
+                # Sorted so the newest file of a session wins
+                for name in sorted(entry.name for entry in os.scandir(self.path) if entry.is_file()):
+                    prefix, separator, rest = name.partition("_")
+                    if not (separator and prefix.isdigit() and rest.endswith(".json")):
+                        continue
+                    # <date>_<time>_<session id>.json
+                    clock, separator, legacy_id = rest.partition("_")
+                    if separator and clock.isdigit():
+                        legacy_paths[legacy_id[:-len(".json")]] = os.path.join(self.path, name)
+                self._legacy_paths = legacy_paths
+            file_path = self._legacy_paths.get(session_id)
+        return file_path if file_path and os.path.exists(file_path) else None
+
+    def save(self, session: QuestionSession) -> str:
+        file_path = self._path(session.id)
+
+        # Write to a temporary file first so a crash never leaves a truncated session
+        temp_path = file_path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(session.model_dump_json(indent=2))
+        os.replace(temp_path, file_path)
+
+        # A timestamped file seen by an earlier lookup is now superseded
+        with self._lock:
+            legacy_path = self._legacy_paths.pop(session.id, None) if self._legacy_paths else None
+        if legacy_path is not None and os.path.exists(legacy_path):
+            os.remove(legacy_path)
+        return file_path
+
+    def load(self, session_id: str) -> QuestionSession:
+        if not is_valid_session_id(session_id):
+            raise KeyError(f"Session not found: {session_id}")
+        try:
+            with open(self._path(session_id), "r") as file:
+                return QuestionSession.model_validate_json(file.read())
+        except FileNotFoundError:
+            pass
+
+        file_path = self._legacy_path(session_id)
+        if file_path is None:
+            raise KeyError(f"Session not found: {session_id}")
+        with open(file_path, "r") as file:
+            return QuestionSession.model_validate_json(file.read())
+
+    def exists(self, session_id: str) -> bool:
+        if not is_valid_session_id(session_id):
+            return False
+        return os.path.exists(self._path(session_id)) or self._legacy_path(session_id) is not None
+
+
+class SQLiteSessionStorage(SessionStorage):
+    """Stores sessions in an indexed SQLite database
+
+    Sessions are keyed by ID (primary key), with secondary indexes on creation
+    time and completed stage. Saves are buffered and written batch_size at a
+    time in a single transaction; a batch_size of 1 commits every save.
+    """
+
+    def __init__(self, path: str = "./data/sessions.sqlite3", batch_size: int = 1):
+        """Initialize the SQLite storage
+
+        Args:
+            path: Path to the SQLite database file
+            batch_size: Number of saves buffered before they are written together
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._pending: Dict[str, QuestionSession] = {}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, created_at TEXT NOT NULL, updated_at TEXT NOT NULL, "
+                "completed_stage INTEGER NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_completed_stage ON sessions(completed_stage, created_at)"
+            )
+
+    def _write(self, sessions: Iterable[QuestionSession]) -> None:
+        """Write sessions in one transaction (lock must be held)
+
+        Args:
+            sessions: Sessions to write
+        """
+        now = datetime.now().isoformat()
+        rows = [
+            (s.id, s.created_at.isoformat(), now, get_completed_stage(s), s.model_dump_json())
+            for s in sessions
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (id, created_at, updated_at, completed_stage, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def save(self, session: QuestionSession) -> str:
+        with self._lock:
+            # Buffer a copy so later in-place edits don't leak into the pending write
+            self._pending[session.id] = session.model_copy(deep=True)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return f"{self.path}#{session.id}"
+
+    def save_many(self, sessions: Iterable[QuestionSession]) -> None:
+        with self._lock:
+            self.flush()
+            self._write(sessions)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._write(self._pending.values())
+                self._pending.clear()
+
+    def load(self, session_id: str) -> QuestionSession:
+        with self._lock:
+            pending = self._pending.get(session_id)
+            if pending is not None:
+                return pending.model_copy(deep=True)
+            row = self._conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Session not found: {session_id}")
+        return QuestionSession.model_validate_json(row[0])
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id in self._pending:
+                return True
+            row = self._conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row is not None
+
+    def list_session_ids(self, completed_stage: Optional[int] = None, since: Optional[datetime] = None,
+                         limit: int = 100) -> List[str]:
+        """List session IDs, newest first, using the secondary indexes
+
+        Args:
+            completed_stage: Only return sessions at this completed stage
+            since: Only return sessions created at or after this time
+            limit: Maximum number of IDs to return
+
+        Returns:
+            List of session IDs
+        """
+        self.flush()
+        query = "SELECT id FROM sessions"
+        conditions: List[str] = []
+        args: List[Any] = []
+        if completed_stage is not None:
+            conditions.append("completed_stage = ?")
+            args.append(completed_stage)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            args.append(since.isoformat())
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, args)]
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+
+def create_session_storage(storage_config: Dict[str, Any]) -> SessionStorage:
+    """Create the storage backend selected by the storage section of config.yaml
+
+    Args:
+        storage_config: The storage configuration dictionary
+
+    Returns:
+        The configured SessionStorage
+
+    Raises:
+        ValueError: If storage.type is not supported
+    """
+    storage_type = storage_config.get("type", "local")
+    path = storage_config.get("path", "./data")
+    if storage_type == "local":
+        return LocalSessionStorage(path)
+    if storage_type == "sqlite":
+        return SQLiteSessionStorage(
+            path=storage_config.get("sqlite_path") or os.path.join(path, "sessions.sqlite3"),
+            batch_size=storage_config.get("batch_size", 1),
+        )
+    raise ValueError(f"Unsupported storage type: {storage_type}")
@@ -0,0 +1,109 @@
+# Async helpers for driving coroutines from synchronous code
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_writer: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the process-wide event loop used by the synchronous wrappers
+
+    The loop runs forever in a daemon thread. Running every synchronous call on
+    the same loop keeps async HTTP connection pools valid between calls and lets
+    background work (e.g. pre-fetching) progress while the caller is blocked
+    on user input.
+
+    Returns:
+        The running background event loop
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="leadgen-loop", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def get_writer() -> concurrent.futures.ThreadPoolExecutor:
+    """Get the process-wide executor for blocking storage writes
+
+    A single thread keeps writes in the order they were issued (a session's
+    checkpoints never overtake each other) and keeps SQLite writers from
+    contending with each other.
+
+    Returns:
+        The single-threaded writer executor
+    """
+    global _writer
+    if _writer is None:
+        with _loop_lock:
+            if _writer is None:
+                _writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="leadgen-writer")
+    return _writer
+
+
+async def run_in_writer(function: Callable[..., T], *args: Any) -> T:
+    """Run a blocking write on the writer thread without blocking the running loop
+
+    Args:
+        function: Blocking function to call
+        *args: Arguments for the function
+
+    Returns:
+        The function's result
+    """
+    return await asyncio.get_running_loop().run_in_executor(get_writer(), functools.partial(function, *args))
+
+
+def submit(coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+    """Schedule a coroutine on the background loop without waiting for it
+
+    Args:
+        coro: Coroutine to schedule
+
+    Returns:
+        A concurrent future resolving to the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the background loop and block until it finishes
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    return submit(coro).result()
+
+
+def iter_sync(async_iterator: AsyncIterator[T]) -> Iterator[T]:
+    """Consume an async iterator from synchronous code
+
+    Args:
+        async_iterator: Async iterator to consume on the background loop
+
+    Yields:
+        Items produced by the async iterator
+    """
+    async def _next() -> T:
+        return await async_iterator.__anext__()
+
+    while True:
+        try:
+            yield run_sync(_next())
+        except StopAsyncIteration:
+            return
@@ -1,10 +1,11 @@
 # Helper utilities for the leadgen application
 
-import os
-import json
+import re
 import uuid
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any
+
+# Session IDs become file names, so they are limited to characters that cannot leave a directory
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
 
 
 def generate_id() -> str:
@@ -16,49 +17,16 @@ def generate_id() -> str:
     return str(uuid.uuid4())
 
 
-def save_session_data(session_data: Dict[str, Any], directory: str = "data") -> str:
-    """Save session data to a JSON file
-    
-    Args:
-        session_data: The session data to save
-        directory: Directory to save the data in
-        
-    Returns:
-        Path to the saved file
-    """
-    # Ensure the directory exists
-    os.makedirs(directory, exist_ok=True)
-    
-    # Generate a filename based on timestamp and session ID
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    session_id = session_data.get("id", generate_id())
-    filename = f"{timestamp}_{session_id}.json"
-    file_path = os.path.join(directory, filename)
-    
-    # Convert datetime objects to strings
-    session_data_copy = json.loads(json.dumps(session_data, default=str))
-    
-    # Save the data
-    with open(file_path, "w") as file:
-        json.dump(session_data_copy, file, indent=2)
-    
-    return file_path
-
-
-def load_session_data(file_path: str) -> Dict[str, Any]:
-    """Load session data from a JSON file
+def is_valid_session_id(session_id: Any) -> bool:
+    """Check whether a value can be used as a session ID
     
     Args:
-        file_path: Path to the JSON file
+        session_id: Candidate ID, e.g. from a request body or an input record
         
     Returns:
-        Dictionary containing the session data
+        True for 1 to 64 letters, digits, hyphens and underscores
     """
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Session data file not found: {file_path}")
-    
-    with open(file_path, "r") as file:
-        return json.load(file)
+    return isinstance(session_id, str) and SESSION_ID_PATTERN.fullmatch(session_id) is not None
 
 
 def format_questions_for_display(questions: List[str]) -> str:
@@ -85,6 +53,22 @@ def format_qa_for_prompt(questions_and_answers: Dict[str, str]) -> str:
     return "\n\n".join([f"Q: {q}\nA: {a}" for q, a in questions_and_answers.items()])
 
 
+def format_all_qa_for_prompt(all_qa_data: Dict[str, Dict[str, str]]) -> str:
+    """Format questions and answers from several stages for use in a prompt
+    
+    Args:
+        all_qa_data: Dictionary mapping stage names to Q&A dictionaries
+        
+    Returns:
+        Formatted string with a header per stage followed by its questions and answers
+    """
+    formatted_data = ""
+    for stage, qa_dict in all_qa_data.items():
+        formatted_data += f"\n\n--- {stage} ---\n"
+        formatted_data += format_qa_for_prompt(qa_dict)
+    return formatted_data
+
+
 def extract_keywords_from_text(text: str) -> List[str]:
     """Extract keywords from text (simple implementation)
     
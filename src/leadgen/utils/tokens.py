@@ -0,0 +1,30 @@
+# Local token counting for prompt budgeting
+
+import re
+
+# Words, numbers and individual punctuation marks, roughly how BPE tokenizers pre-split text
+_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of model tokens in a text without calling the API
+
+    Text is pre-split into words, digit runs and punctuation; long words count
+    as one token per four characters and digit runs as one token per three,
+    which tracks BPE tokenizers closely enough for budgeting.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Estimated token count
+    """
+    total = 0
+    for piece in _PIECE_PATTERN.findall(text):
+        if piece.isdigit():
+            total += (len(piece) + 2) // 3
+        elif piece.isalpha():
+            total += max(1, (len(piece) + 3) // 4) if len(piece) > 6 else 1
+        else:
+            total += 1
+    return total
@@ -0,0 +1,38 @@
+# Shared pytest setup: run the tests against the source tree without installing the package
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from typing import Dict, Any
+
+import pytest
+import yaml
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+
+
+def load_config_file(name: str) -> Dict[str, Any]:
+    """Load one of the shipped configuration files"""
+    with open(os.path.join(CONFIG_DIR, f"{name}.yaml"), "r") as file:
+        return yaml.safe_load(file)
+
+
+@pytest.fixture
+def mock_config_dir(tmp_path):
+    """The shipped configuration with a fast mock provider and nothing written outside tmp_path"""
+    config = load_config_file("config")
+    config["llm"].update(provider="mock", fallback_models=[], mock={
+        "seed": 1, "latency": {"mean_seconds": 0.0}, "tokens_per_second": 100000,
+    })
+    config["storage"] = {"type": "local", "path": str(tmp_path / "sessions")}
+    for section in ("rate_limits", "keyword_index", "question_reuse", "cache", "metrics"):
+        config[section] = {"enabled": False}
+    params = load_config_file("params")
+    params["agent_params"]["auto_tune"] = {"enabled": False}
+    params["speculation"] = {}
+
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    for name, content in (("config", config), ("params", params), ("prompts", load_config_file("prompts"))):
+        (config_dir / f"{name}.yaml").write_text(yaml.safe_dump(content))
+    return str(config_dir)
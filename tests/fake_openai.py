@@ -0,0 +1,241 @@
+# Local fake of the OpenAI-compatible chat completions endpoint served by Groq, over HTTP/1.1 or HTTP/2
+
+import ssl
+import json
+import time
+import asyncio
+import datetime
+import ipaddress
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+# (delay in seconds, status code, extra response headers)
+Behaviour = Tuple[float, int, Dict[str, str]]
+
+
+def create_certificate(directory: str) -> Tuple[str, str]:
+    """Create a self-signed certificate for 127.0.0.1
+
+    Args:
+        directory: Directory to write the PEM files to
+
+    Returns:
+        Tuple of (certificate path, key path)
+    """
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+                       critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = f"{directory}/cert.pem", f"{directory}/key.pem"
+    with open(cert_path, "wb") as file:
+        file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as file:
+        file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                     serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def completion(content: str) -> Dict[str, Any]:
+    """Build a chat completion response body
+
+    Args:
+        content: Assistant message text
+
+    Returns:
+        The response body
+    """
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake-model",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+    }
+
+
+class FakeOpenAIServer:
+    """Answers POST /openai/v1/chat/completions with a fixed reply
+
+    Queued behaviours make the next POST requests slow or fail; other requests
+    (e.g. the HEAD of a prewarm) are answered right away. With a certificate the
+    server speaks TLS and offers HTTP/2 through ALPN.
+    """
+
+    def __init__(self, certificate: Optional[Tuple[str, str]] = None, reply: str = "pong"):
+        """Initialize the server
+
+        Args:
+            certificate: Tuple of (certificate path, key path) to serve TLS with
+            reply: Assistant message returned by successful completions
+        """
+        self.certificate = certificate
+        self.reply = reply
+        self.behaviours: List[Behaviour] = []
+        self.connections = 0
+        # (HTTP version, method, path) of every request received
+        self.requests: List[Tuple[str, str, str]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def base_url(self) -> str:
+        """Base URL of the running server"""
+        port = self._server.sockets[0].getsockname()[1]
+        return f"{'https' if self.certificate else 'http'}://127.0.0.1:{port}"
+
+    @property
+    def completions(self) -> List[Tuple[str, str, str]]:
+        """Chat completion requests received"""
+        return [request for request in self.requests if request[1] == "POST"]
+
+    def queue(self, status: int = 200, delay: float = 0.0, headers: Optional[Dict[str, str]] = None) -> None:
+        """Queue the behaviour of the next chat completion request
+
+        Args:
+            status: Status code to answer with
+            delay: Seconds to wait before answering
+            headers: Extra response headers
+        """
+        self.behaviours.append((delay, status, headers or {}))
+
+    async def __aenter__(self) -> "FakeOpenAIServer":
+        context = None
+        if self.certificate is not None:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(*self.certificate)
+            context.set_alpn_protocols(["h2", "http/1.1"])
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, ssl=context)
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._server.close()
+        handlers = list(self._handlers)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _respond(self, method: str) -> Tuple[int, bytes, Dict[str, str]]:
+        """Apply the next queued behaviour to a request
+
+        Returns:
+            Tuple of (status, body, extra headers)
+        """
+        if method != "POST":
+            return 200, b"", {}
+        delay, status, headers = self.behaviours.pop(0) if self.behaviours else (0.0, 200, {})
+        if delay:
+            await asyncio.sleep(delay)
+        if status == 200:
+            body = completion(self.reply)
+        else:
+            body = {"error": {"message": f"Fake error {status}", "type": "fake_error"}}
+        return status, json.dumps(body).encode("utf-8"), headers
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one connection"""
+        self.connections += 1
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        ssl_object = writer.get_extra_info("ssl_object")
+        try:
+            if ssl_object is not None and ssl_object.selected_alpn_protocol() == "h2":
+                await self._serve_http2(reader, writer)
+            else:
+                await self._serve_http1(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+    async def _serve_http1(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve keep-alive HTTP/1.1 requests until the client closes the connection"""
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                return
+            lines = head.decode("latin-1").split("\r\n")
+            method, path, _ = lines[0].split(" ", 2)
+            headers = {key.strip().lower(): value.strip()
+                       for key, value in (line.split(":", 1) for line in lines[1:] if line)}
+            await reader.readexactly(int(headers.get("content-length", 0)))
+            self.requests.append(("HTTP/1.1", method, path))
+
+            status, body, extra = await self._respond(method)
+            response = [f"HTTP/1.1 {status} Fake", "content-type: application/json", f"content-length: {len(body)}"]
+            response += [f"{key}: {value}" for key, value in extra.items()]
+            writer.write(("\r\n".join(response) + "\r\n\r\n").encode("latin-1") + (body if method != "HEAD" else b""))
+            await writer.drain()
+
+    async def _serve_http2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve multiplexed HTTP/2 streams until the client closes the connection"""
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.exceptions
+
+        connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+        streams: Dict[int, Dict[str, str]] = {}
+        tasks: Set["asyncio.Task[None]"] = set()
+
+        async def respond(stream_id: int, headers: Dict[str, str]) -> None:
+            status, body, extra = await self._respond(headers[":method"])
+            try:
+                connection.send_headers(stream_id, [
+                    (":status", str(status)),
+                    ("content-type", "application/json"),
+                    ("content-length", str(len(body))),
+                    *extra.items(),
+                ], end_stream=not body)
+                if body:
+                    connection.send_data(stream_id, body, end_stream=True)
+                writer.write(connection.data_to_send())
+            except h2.exceptions.StreamClosedError:
+                # The client gave up on the request (e.g. it timed out)
+                pass
+
+        try:
+            while True:
+                data = await reader.read(65535)
+                if not data:
+                    return
+                for event in connection.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        streams[event.stream_id] = dict(event.headers)
+                    elif isinstance(event, h2.events.DataReceived):
+                        connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        headers = streams.pop(event.stream_id)
+                        self.requests.append(("HTTP/2", headers[":method"], headers[":path"]))
+                        task = asyncio.ensure_future(respond(event.stream_id, headers))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        writer.write(connection.data_to_send())
+                        return
+                writer.write(connection.data_to_send())
+                await writer.drain()
+        finally:
+            for task in list(tasks):
+                task.cancel()
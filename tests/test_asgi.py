@@ -0,0 +1,182 @@
+# Tests for the ASGI service, driven through raw scope/receive/send calls against the mock provider
+
+import json
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple
+
+import pytest
+
+from leadgen.api.asgi import LeadGenApp
+from leadgen.services.registry import ServiceRegistry
+
+
+@pytest.fixture
+def app(mock_config_dir):
+    return LeadGenApp(ServiceRegistry(mock_config_dir))
+
+
+async def request(app: LeadGenApp, method: str, path: str,
+                  body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """Send one request through the ASGI interface
+
+    Returns:
+        Tuple of (status, response headers, response body)
+    """
+    scope = {"type": "http", "http_version": "1.1", "method": method, "path": path, "query_string": b"",
+             "headers": [(b"content-type", b"application/json")]}
+    messages = [{"type": "http.request", "body": json.dumps(body).encode("utf-8") if body is not None else b"",
+                 "more_body": False}]
+    sent: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start = sent[0]
+    assert start["type"] == "http.response.start"
+    assert all(message["type"] == "http.response.body" for message in sent[1:])
+    assert not sent[-1].get("more_body", False)
+    headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in start["headers"]}
+    return start["status"], headers, b"".join(message.get("body", b"") for message in sent[1:])
+
+
+async def call(app: LeadGenApp, method: str, path: str,
+               body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+    """Send one request and decode its JSON response"""
+    status, _, payload = await request(app, method, path, body)
+    return status, json.loads(payload)
+
+
+async def answer_until_keywords(app: LeadGenApp, session_id: str) -> None:
+    """Run a session through the stages before the ICP"""
+    base = f"/sessions/{session_id}"
+    assert (await call(app, "POST", f"{base}/default-answers", {"auto_answer": "We sell CRM software ({index})"}))[0] == 200
+    assert (await call(app, "POST", f"{base}/personalized-questions"))[0] == 200
+    assert (await call(app, "POST", f"{base}/personalized-answers", {"auto_answer": "Mid-sized clinics"}))[0] == 200
+    assert (await call(app, "POST", f"{base}/keywords"))[0] == 200
+
+
+def test_create_session_returns_the_default_questions(app):
+    status, body = asyncio.run(call(app, "POST", "/sessions", {"session_id": "s-1"}))
+    assert status == 201
+    assert body["session_id"] == "s-1"
+    assert body["default_questions"] == app.registry.config_loader.get_default_questions()
+    assert app.registry.session_storage.exists("s-1")
+
+
+def test_session_ids_are_taken_once(app):
+    async def scenario():
+        first, second = await asyncio.gather(*(call(app, "POST", "/sessions", {"session_id": "same"}) for _ in range(2)))
+        return sorted([first[0], second[0]])
+
+    assert asyncio.run(scenario()) == [201, 409]
+
+
+def test_session_ids_that_could_leave_the_storage_directory_are_rejected(app, tmp_path):
+    async def scenario():
+        return [await call(app, "POST", "/sessions", {"session_id": session_id})
+                for session_id in ("../../escaped", "a/b", "..", "", "x" * 65, 42)]
+
+    for status, body in asyncio.run(scenario()):
+        assert status == 400
+        assert "session_id" in body["error"]
+    assert not (tmp_path / "escaped.json").exists()
+    assert asyncio.run(call(app, "GET", "/sessions/.."))[0] == 404
+
+
+def test_stages_run_in_order(app):
+    async def scenario():
+        status, created = await call(app, "POST", "/sessions", {})
+        assert status == 201
+        session_id = created["session_id"]
+        base = f"/sessions/{session_id}"
+        stages = [created["next_stage"]]
+
+        status, body = await call(app, "POST", f"{base}/default-answers", {"answers": ["Acme CRM"] * 5})
+        assert status == 200
+        stages.append(body["next_stage"])
+
+        status, body = await call(app, "POST", f"{base}/personalized-questions")
+        assert status == 200 and body["questions"]
+        stages.append(body["next_stage"])
+
+        answers = [f"Answer {index}" for index in range(len(body["questions"]))]
+        status, body = await call(app, "POST", f"{base}/personalized-answers", {"answers": answers})
+        assert status == 200
+        stages.append(body["next_stage"])
+
+        status, body = await call(app, "POST", f"{base}/keywords")
+        assert status == 200 and body["keywords"]
+        stages.append(body["next_stage"])
+
+        status, body = await call(app, "POST", f"{base}/icp")
+        assert status == 200 and body["profile"]
+        stages.append(body["next_stage"])
+
+        status, body = await call(app, "GET", base)
+        assert status == 200
+        return stages, body
+
+    stages, session = asyncio.run(scenario())
+    # Generating the personalized questions leaves the stage open until they are answered
+    assert stages == ["default_questions", "personalized_questions", "personalized_questions",
+                      "keyword_generation", "icp_generation", None]
+    assert session["session"]["ideal_customer_profile"] is not None
+
+
+def test_out_of_order_stages_are_conflicts(app):
+    async def scenario():
+        _, created = await call(app, "POST", "/sessions", {})
+        base = f"/sessions/{created['session_id']}"
+        return [
+            await call(app, "POST", f"{base}/keywords"),
+            await call(app, "POST", f"{base}/icp"),
+            await call(app, "POST", f"{base}/personalized-answers", {"answers": ["a"]}),
+            await call(app, "POST", f"{base}/default-answers", {"answers": ["too few"]}),
+        ]
+
+    keywords, icp, personalized_answers, bad_answers = asyncio.run(scenario())
+    assert keywords[0] == 409 and "must be completed first" in keywords[1]["error"]
+    assert icp[0] == 409
+    assert personalized_answers[0] == 409
+    # Answers that don't match the questions are the client's error, not a stage conflict
+    assert bad_answers[0] == 400
+
+
+def test_unknown_sessions_are_not_found(app):
+    async def scenario():
+        return [
+            await call(app, "GET", "/sessions/missing"),
+            await call(app, "POST", "/sessions/missing/keywords"),
+            await call(app, "GET", "/sessions/missing/icp/stream"),
+        ]
+
+    for status, body in asyncio.run(scenario()):
+        assert status == 404
+        assert "missing" in body["error"]
+
+
+def test_icp_stream_sends_deltas_then_done(app):
+    async def scenario():
+        _, created = await call(app, "POST", "/sessions", {})
+        session_id = created["session_id"]
+        conflict = await call(app, "GET", f"/sessions/{session_id}/icp/stream")
+        await answer_until_keywords(app, session_id)
+        stream = await request(app, "GET", f"/sessions/{session_id}/icp/stream")
+        _, session = await call(app, "GET", f"/sessions/{session_id}")
+        return conflict, stream, session
+
+    conflict, (status, headers, body), session = asyncio.run(scenario())
+    assert conflict[0] == 409
+    assert status == 200
+    assert headers["content-type"] == "text/event-stream"
+
+    events = [event.split("\n") for event in body.decode("utf-8").strip().split("\n\n")]
+    deltas = [json.loads(lines[0][len("data: "):])["delta"] for lines in events[:-1]]
+    assert deltas and all(lines[0].startswith("data: ") for lines in events[:-1])
+    assert events[-1][0] == "event: done"
+    assert json.loads(events[-1][1][len("data: "):])["next_stage"] is None
+    assert session["session"]["ideal_customer_profile"] is not None
@@ -0,0 +1,26 @@
+# Tests for the headless batch runner against the mock provider
+
+import os
+import json
+import asyncio
+
+from leadgen.pipeline.batch_pipeline import BatchRunner
+from leadgen.services.registry import ServiceRegistry
+
+
+def test_records_with_unsafe_ids_fail_without_touching_storage(mock_config_dir, tmp_path):
+    records = [{"id": "good-1"}, {"id": "../../escaped"}, {"id": ["not", "a", "string"]}, {"id": ""}]
+    input_path, output_path = tmp_path / "input.jsonl", tmp_path / "output.jsonl"
+    input_path.write_text("".join(json.dumps({**record, "auto_answer": "Answer {index}"}) + "\n" for record in records))
+
+    registry = ServiceRegistry(mock_config_dir)
+    stats = asyncio.run(BatchRunner(str(input_path), str(output_path), concurrency=2, registry=registry).run())
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert (stats["completed"], stats["failed"]) == (1, 3)
+    assert {json.dumps(result["id"]): result["status"] for result in results} == {
+        '"good-1"': "ok", '"../../escaped"': "error", '["not", "a", "string"]': "error", '""': "error",
+    }
+    assert all("Invalid id" in result["error"] for result in results if result["status"] == "error")
+    assert sorted(os.listdir(tmp_path / "sessions")) == ["good-1.json"]
+    assert not (tmp_path / "escaped.json").exists()
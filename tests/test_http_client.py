@@ -0,0 +1,160 @@
+# Tests for the pooled HTTP client and the request scheduler against a local fake Groq server
+
+import time
+import asyncio
+from typing import Dict, Any, Optional
+
+import pytest
+
+from fake_openai import FakeOpenAIServer, create_certificate
+from leadgen.services.http_client import create_http_client
+from leadgen.services.llm_service import LLMService
+from leadgen.services.request_scheduler import RequestScheduler
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory):
+    pytest.importorskip("cryptography")
+    return create_certificate(str(tmp_path_factory.mktemp("tls")))
+
+
+@pytest.fixture
+def trusted_certificate(certificate, monkeypatch):
+    # httpx reads SSL_CERT_FILE when the client is created
+    monkeypatch.setenv("SSL_CERT_FILE", certificate[0])
+    return certificate
+
+
+def scheduler(**kwargs: Any) -> RequestScheduler:
+    """Create a scheduler with short backoffs and no rate budget in the way"""
+    settings = {"requests_per_minute": 10000, "tokens_per_minute": 10 ** 7, "max_retries": 2,
+                "backoff_base_seconds": 0.01, "backoff_max_seconds": 0.05}
+    settings.update(kwargs)
+    return RequestScheduler(**settings)
+
+
+def service(server: FakeOpenAIServer, http_config: Dict[str, Any],
+            request_scheduler: Optional[RequestScheduler] = None) -> LLMService:
+    """Create an LLM service calling the fake server through a pooled client"""
+    hooks = [request_scheduler.observe_response] if request_scheduler else []
+    return LLMService(
+        "fake-model",
+        base_url=server.base_url,
+        http_client=create_http_client(http_config, hooks),
+        scheduler=request_scheduler,
+    )
+
+
+def test_http2_calls_share_one_prewarmed_connection(trusted_certificate):
+    pytest.importorskip("h2")
+
+    async def scenario():
+        async with FakeOpenAIServer(trusted_certificate) as server:
+            llm = service(server, {"http2": True})
+            assert await llm.prewarm_async()
+            for index in range(3):
+                assert await llm.run_async("system", f"ping {index}") == "pong"
+            replies = await asyncio.gather(*(llm.run_async("system", f"burst {index}") for index in range(5)))
+            await llm.http_client.aclose()
+            return server, replies
+
+    server, replies = asyncio.run(scenario())
+    assert replies == ["pong"] * 5
+    assert server.connections == 1
+    assert len(server.completions) == 8
+    assert {version for version, _, _ in server.requests} == {"HTTP/2"}
+
+
+def test_http1_keepalive_reuses_the_connection():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            llm = service(server, {"http2": False})
+            for index in range(5):
+                assert await llm.run_async("system", f"ping {index}") == "pong"
+            await llm.http_client.aclose()
+            return server
+
+    server = asyncio.run(scenario())
+    assert server.connections == 1
+    assert [version for version, _, _ in server.completions] == ["HTTP/1.1"] * 5
+
+
+def test_timed_out_call_is_retried():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            request_scheduler = scheduler()
+            llm = service(server, {"http2": False, "timeout_seconds": 0.3}, request_scheduler)
+            server.queue(delay=2.0)
+            reply = await llm.run_async("system", "ping")
+            await llm.http_client.aclose()
+            return server, request_scheduler, reply
+
+    server, request_scheduler, reply = asyncio.run(scenario())
+    assert reply == "pong"
+    assert len(server.completions) == 2
+    assert request_scheduler.stats["retries"] == 1
+
+
+def test_rate_limit_and_server_errors_are_retried_after_backoff():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            request_scheduler = scheduler()
+            llm = service(server, {"http2": False}, request_scheduler)
+            server.queue(429, headers={"retry-after": "0.2"})
+            server.queue(503)
+            started = time.monotonic()
+            reply = await llm.run_async("system", "ping")
+            elapsed = time.monotonic() - started
+            await llm.http_client.aclose()
+            return server, request_scheduler, reply, elapsed
+
+    server, request_scheduler, reply, elapsed = asyncio.run(scenario())
+    assert reply == "pong"
+    assert len(server.completions) == 3
+    assert request_scheduler.stats["rate_limited"] == 1
+    assert request_scheduler.stats["server_errors"] == 1
+    # The retry-after header blocks the next attempt
+    assert elapsed >= 0.2
+
+
+def test_client_errors_are_not_retried():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            request_scheduler = scheduler()
+            llm = service(server, {"http2": False}, request_scheduler)
+            server.queue(400)
+            try:
+                with pytest.raises(Exception) as error:
+                    await llm.run_async("system", "ping")
+            finally:
+                await llm.http_client.aclose()
+            return server, request_scheduler, error.value
+
+    server, request_scheduler, error = asyncio.run(scenario())
+    assert RequestScheduler.get_status_code(error) == 400
+    assert len(server.completions) == 1
+    assert request_scheduler.stats["retries"] == 0
+
+
+def test_retries_stop_at_max_retries():
+    async def scenario():
+        async with FakeOpenAIServer() as server:
+            request_scheduler = scheduler(max_retries=1)
+            llm = service(server, {"http2": False}, request_scheduler)
+            for _ in range(3):
+                server.queue(503)
+            try:
+                with pytest.raises(Exception) as error:
+                    await llm.run_async("system", "ping")
+            finally:
+                await llm.http_client.aclose()
+            return server, error.value
+
+    server, error = asyncio.run(scenario())
+    assert RequestScheduler.get_status_code(error) == 503
+    assert len(server.completions) == 2
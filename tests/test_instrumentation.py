@@ -0,0 +1,50 @@
+# Tests for the stage and call metrics
+
+import json
+import time
+import threading
+
+from leadgen.services.instrumentation import Instrumentation, StageRecorder
+from leadgen.utils.async_helpers import get_writer
+
+
+def finished_stage(stage: str) -> StageRecorder:
+    recorder = StageRecorder(stage)
+    recorder.record_call({
+        "agent": "keyword_generation_agent", "model": "model", "status": "ok", "started_at": time.time(),
+        "wall_seconds": 0.2, "queue_wait_seconds": 0.0, "ttft_seconds": None,
+        "input_tokens": 100, "output_tokens": 20, "retries": 0,
+    })
+    recorder.finish()
+    return recorder
+
+
+def test_spans_are_written_on_the_writer_thread(tmp_path, monkeypatch):
+    spans_path = tmp_path / "spans.jsonl"
+    instrumentation = Instrumentation(spans_path=str(spans_path))
+    writer_threads = []
+    append = instrumentation._append_spans
+
+    def record_thread(text: str) -> None:
+        writer_threads.append(threading.current_thread().name)
+        append(text)
+
+    monkeypatch.setattr(instrumentation, "_append_spans", record_thread)
+    instrumentation.record_stage("s1", finished_stage("keyword_generation"))
+    instrumentation.record_stage("s1", finished_stage("icp_generation"))
+    get_writer().submit(lambda: None).result()
+
+    spans = [json.loads(line) for line in spans_path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["stage keyword_generation", "llm keyword_generation_agent",
+                                                "stage icp_generation", "llm keyword_generation_agent"]
+    assert spans[1]["parent_span_id"] == spans[0]["span_id"]
+    assert len({span["trace_id"] for span in spans}) == 1
+    assert writer_threads and all(name.startswith("leadgen-writer") for name in writer_threads)
+
+
+def test_the_prometheus_file_is_exported_in_the_background(tmp_path):
+    path = tmp_path / "metrics.prom"
+    instrumentation = Instrumentation(prometheus_path=str(path), export_interval_seconds=0)
+    instrumentation.record_stage("s1", finished_stage("keyword_generation"))
+    get_writer().submit(lambda: None).result()
+    assert 'leadgen_stage_runs_total{stage="keyword_generation",status="ok"} 1' in path.read_text()
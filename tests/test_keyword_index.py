@@ -0,0 +1,124 @@
+# Tests for the cross-session keyword index
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from leadgen.entity.models import QuestionSession, Keyword, IdealCustomerProfile
+from leadgen.services.keyword_index import KeywordIndex, normalize_keyword, stem_keyword, stem_token
+
+
+def session(session_id: str, keywords, summary: str = "", month: int = 1) -> QuestionSession:
+    return QuestionSession(
+        id=session_id,
+        created_at=datetime(2026, month, 15),
+        keywords=[Keyword(text=text) for text in keywords],
+        ideal_customer_profile=IdealCustomerProfile(summary=summary) if summary else None,
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+def test_normalizing_and_stemming():
+    assert normalize_keyword("  CRM-Software, for Dentists! ") == "crm-software for dentists"
+    assert stem_keyword("dental clinics") == stem_keyword("Dental Clinic")
+    assert [stem_token(token) for token in ("companies", "marketing", "services")] == ["company", "market", "service"]
+
+
+def test_token_frequencies_count_sessions_per_icp_token(index):
+    index.index_session(session("s1", ["crm"], "Dental clinics in Europe"))
+    index.index_session(session("s2", ["crm"], "Dental labs"))
+    index.index_session(session("s3", ["erp"], "Logistics firms"))
+    clinic, dental, europe = stem_token("clinics"), stem_token("dental"), stem_token("europe")
+
+    assert index.token_frequencies([clinic, dental, "missing"]) == (3, {clinic: 1, dental: 2})
+    assert index.token_frequencies([dental, europe], exclude_session="s1") == (2, {dental: 1})
+    assert index.token_frequencies([dental], exclude_session="unknown") == (3, {dental: 2})
+
+    # Re-indexing replaces the session's contribution
+    index.index_session(session("s1", ["crm"], "Logistics firms"))
+    assert index.token_frequencies([clinic, dental]) == (3, {dental: 1})
+    index.index_session(session("s1", [], ""))
+    assert index.token_frequencies([dental]) == (2, {dental: 1})
+
+
+def test_counters_are_rebuilt_for_an_index_written_before_they_existed(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    index = KeywordIndex(path)
+    index.index_session(session("s1", ["crm"], "Dental clinics"))
+    index.index_session(session("s2", ["crm"], "Dental labs"))
+    index.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM icp_token_counts")
+        conn.execute("DELETE FROM index_counts")
+        conn.execute("PRAGMA user_version = 0")
+
+    index = KeywordIndex(path)
+    assert index.token_frequencies([stem_token("dental")]) == (2, {stem_token("dental"): 2})
+    index.close()
+
+
+def test_aggregates_follow_reindexing(index):
+    index.index_session(session("s1", ["CRM software", "dental crm"], "Dental clinics in Europe", month=1))
+    index.index_session(session("s2", ["crm software"], "Dental labs", month=2))
+    index.index_session(session("s3", ["erp"], "Logistics firms in Europe", month=2))
+
+    assert index.top_keywords(1) == [{"keyword": "crm software", "sessions": 2}]
+    assert index.top_keywords(1, month="2026-01")[0]["sessions"] == 1
+    assert index.prefix_search("crm") == [{"keyword": "crm software", "sessions": 2}]
+    assert sorted(index.search_icp("dental")) == ["s1", "s2"]
+    assert index.search_icp("europe dental") == ["s1"]
+    assert index.search_icp("dental unknown") == []
+
+    index.index_session(session("s2", ["erp"], "Logistics firms", month=2))
+    assert index.prefix_search("crm") == [{"keyword": "crm software", "sessions": 1}]
+    assert index.top_keywords(1) == [{"keyword": "erp", "sessions": 2}]
+    assert index.search_icp("dental") == ["s1"]
+
+
+def test_keyword_totals_are_rebuilt_for_an_older_index(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    index = KeywordIndex(path)
+    index.index_session(session("s1", ["crm"], month=1))
+    index.index_session(session("s2", ["crm"], month=2))
+    index.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM keyword_totals")
+        conn.execute("PRAGMA user_version = 1")
+
+    index = KeywordIndex(path)
+    assert index.top_keywords(5) == [{"keyword": "crm", "sessions": 2}]
+    index.close()
+
+
+def test_sessions_are_found_by_stemmed_or_exact_keyword(index):
+    index.index_session(session("s1", ["CRM softwares"]))
+    index.index_session(session("s2", ["crm software", "Dental CRM"]))
+    index.index_session(session("s3", ["erp"]))
+
+    assert sorted(index.find_sessions("crm software")) == ["s1", "s2"]
+    assert index.find_sessions("CRM Software", stemmed=False) == ["s2"]
+    assert index.find_sessions("dental crm", limit=1) == ["s2"]
+    assert index.find_sessions("payroll") == []
+
+
+def test_top_keywords_per_month(index):
+    index.index_session(session("s1", ["crm", "erp"], month=1))
+    index.index_session(session("s2", ["erp"], month=1))
+    index.index_session(session("s3", ["crm"], month=2))
+
+    assert index.top_keywords(5, month="2026-01") == [{"keyword": "erp", "sessions": 2},
+                                                      {"keyword": "crm", "sessions": 1}]
+    assert index.top_keywords(5, month="2026-02") == [{"keyword": "crm", "sessions": 1}]
+    assert index.top_keywords(5, month="2025-12") == []
+    # Moving a session to another month moves its counts
+    index.index_session(session("s2", ["erp"], month=2))
+    assert index.top_keywords(1, month="2026-02")[0]["sessions"] == 1
+    january = index.top_keywords(5, month="2026-01")
+    assert sorted((entry["keyword"], entry["sessions"]) for entry in january) == [("crm", 1), ("erp", 1)]
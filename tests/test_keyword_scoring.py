@@ -0,0 +1,78 @@
+# Tests for local keyword scoring, classification and deduplication
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from leadgen.entity.models import IdealCustomerProfile, QuestionSession
+from leadgen.services.keyword_index import KeywordIndex
+from leadgen.services.keyword_scoring import KeywordScorer, keyword_terms
+
+ANSWERS = {
+    "Default Questions": {
+        "What do you sell?": "Scheduling software for dental clinics. Our scheduling app cuts no-shows.",
+        "Who are your customers?": "Dental clinics and orthodontists in Germany",
+    },
+    "Personalized Questions": {"What is your pricing?": "Monthly subscription per clinic", "Anything else?": "  "},
+}
+
+
+def test_bm25_ranks_keywords_by_their_terms_in_the_answers():
+    scorer = KeywordScorer()
+    keywords = ["dental scheduling software", "clinic subscription", "veterinary marketing"]
+    scores = scorer.session_scores([keyword_terms(keyword) for keyword in keywords],
+                                   [answer for qa in ANSWERS.values() for answer in qa.values()])
+
+    # Scaled so the best keyword scores 1; a keyword with no term in the answers scores 0
+    assert scores.max() == pytest.approx(1.0)
+    assert scores[0] > 0 and scores[1] > 0
+    assert scores[2] == 0
+    assert not scorer.session_scores([keyword_terms("dental")], []).any()
+
+
+def test_stopwords_are_left_out_of_keyword_terms():
+    assert keyword_terms("Software for the Dental Clinics") == ["software", "dental", "clinic"]
+
+
+def test_near_duplicates_collapse_onto_the_higher_scoring_keyword():
+    scorer = KeywordScorer()
+    keywords = ["CRM software", "crm softwares", "dental clinics", "Dental Clinic", "orthodontist marketing"]
+    kept = scorer.deduplicate(keywords, np.array([0.4, 0.9, 0.5, 0.8, 0.1]))
+    assert [keywords[index] for index in kept] == ["crm softwares", "Dental Clinic", "orthodontist marketing"]
+
+
+def test_keywords_with_the_same_stems_are_duplicates_whatever_the_threshold():
+    # A threshold above 1 disables the trigram check, leaving only the stem check
+    scorer = KeywordScorer(dedup_threshold=1.01)
+    keywords = ["dental clinics", "Dental Clinic", "clinic dental"]
+    assert scorer.deduplicate(keywords, np.array([0.2, 0.6, 0.1])) == [1, 2]
+
+
+def test_score_classifies_and_deduplicates():
+    scorer = KeywordScorer(long_tail_min_words=3)
+    keywords = scorer.score(["dental scheduling software", " dental scheduling softwares ", "clinics", ""], ANSWERS)
+
+    assert [(keyword.text, keyword.type) for keyword in keywords] == [
+        ("dental scheduling software", "long-tail"), ("clinics", "short-tail"),
+    ]
+    assert keywords[0].relevance_score == 1.0
+    assert 0 < keywords[1].relevance_score < 1
+
+
+def test_terms_common_to_past_profiles_count_as_less_specific(tmp_path):
+    index = KeywordIndex(str(tmp_path / "index.sqlite3"))
+    scorer = KeywordScorer(keyword_index=index, min_history_sessions=3)
+    terms = [keyword_terms("software"), keyword_terms("orthodontists")]
+    assert scorer.history_specificity(terms) is None
+
+    for number in range(4):
+        summary = "Software buyers" + (" and orthodontists" if number == 0 else "")
+        index.index_session(QuestionSession(id=f"s{number}", created_at=datetime(2026, 1, 1),
+                                            ideal_customer_profile=IdealCustomerProfile(summary=summary)))
+    software, orthodontists = scorer.history_specificity(terms)
+    assert software == pytest.approx(np.log(5 / 5) / np.log(5))
+    assert orthodontists > software
+    # The session being scored is left out of its own history
+    assert list(scorer.history_specificity(terms, session_id="s0")) == [0.0, 1.0]
+    index.close()
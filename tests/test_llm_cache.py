@@ -0,0 +1,107 @@
+# Tests for the LLM response cache and how the LLM service uses it
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from leadgen.services import llm_cache
+from leadgen.services.llm_cache import LLMResponseCache
+from leadgen.services.llm_service import LLMService
+from leadgen.services.model_router import ModelRouter
+
+
+class FailFirstBackend:
+    """Backend whose first call fails, so the fallback model answers"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def run(self, system_prompt: str, prompt: str, output_type: Any = None,
+                  model_settings: Optional[Dict[str, Any]] = None) -> str:
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("primary down")
+        return "from the fallback"
+
+
+def test_answers_are_cached_under_the_model_that_gave_them(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    backend = FailFirstBackend()
+    llm = LLMService("primary", cache=cache, backend=backend,
+                     router=ModelRouter("primary", fallback_models=["fallback"]))
+
+    assert asyncio.run(llm.run_async("system", "prompt")) == "from the fallback"
+    assert cache.get(cache.make_key("primary", "system", "prompt")) is None
+    assert cache.get(cache.make_key("fallback", "system", "prompt")) == "from the fallback"
+
+    # The next identical call finds the fallback's answer without a model call
+    assert asyncio.run(llm.run_async("system", "prompt")) == "from the fallback"
+    assert backend.calls == 2
+
+
+def test_get_first_prefers_earlier_keys(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("b", "second")
+    assert cache.get_first(["a", "b"]) == "second"
+    cache.set("a", "first")
+    assert cache.get_first(["a", "b"]) == "first"
+    assert cache.get_first(["c"]) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+class Clock:
+    """Stand-in for time.time that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.set("key", ["crm", "erp"])
+
+    clock.now += 59
+    assert cache.get("key") == ["crm", "erp"]
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.get_stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    for index in range(10):
+        clock.now += 1
+        cache.set(f"key-{index}", index)
+    clock.now += 1
+    assert cache.get("key-0") == 0
+
+    clock.now += 1
+    cache.set("key-10", 10)
+    # Down to 90% of max_entries, dropping the oldest accesses (key-0 was just read)
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["evictions"]) == (9, 2)
+    remaining: List[Optional[int]] = [cache.get(f"key-{index}") for index in range(11)]
+    assert remaining == [0, None, None, 3, 4, 5, 6, 7, 8, 9, 10]
+
+
+class Profile(BaseModel):
+    summary: str
+
+
+def test_structured_outputs_are_validated_on_the_way_out(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"))
+    key = cache.make_key("model", "system", "prompt", {"max_tokens": 100}, Profile)
+    assert key != cache.make_key("model", "system", "prompt", {"max_tokens": 200}, Profile)
+    assert key != cache.make_key("model", "system", "prompt", {"max_tokens": 100}, None)
+
+    cache.set(key, Profile(summary="Dental clinics"))
+    assert cache.get(key, Profile) == Profile(summary="Dental clinics")
@@ -0,0 +1,84 @@
+# Tests that the router timeout limits each model attempt rather than the whole call
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from leadgen.services.llm_service import LLMService
+from leadgen.services.model_router import ModelRouter
+from leadgen.services.request_scheduler import RequestScheduler
+
+
+class SlowBackend:
+    """Backend whose calls and streams take scripted times"""
+
+    def __init__(self, delays: List[float], stall_after: Optional[int] = None):
+        self.delays = list(delays)
+        self.stall_after = stall_after
+        self.attempts = 0
+
+    async def run(self, system_prompt: str, prompt: str, output_type: Any = None,
+                  model_settings: Optional[Dict[str, Any]] = None) -> str:
+        delay = self.delays[min(self.attempts, len(self.delays) - 1)]
+        self.attempts += 1
+        await asyncio.sleep(delay)
+        return f"answer {self.attempts}"
+
+    async def stream(self, system_prompt: str, prompt: str, model_settings: Optional[Dict[str, Any]] = None):
+        self.attempts += 1
+        for index in range(3):
+            if index == self.stall_after:
+                await asyncio.sleep(10)
+            await asyncio.sleep(0.05)
+            yield f"delta {index} "
+
+
+def service(backend: SlowBackend, timeout: float, max_concurrency: int = 8) -> LLMService:
+    scheduler = RequestScheduler(requests_per_minute=10000, tokens_per_minute=10 ** 7,
+                                 max_concurrency=max_concurrency, max_retries=2, backoff_base_seconds=0.01)
+    return LLMService("model", scheduler=scheduler, backend=backend,
+                      router=ModelRouter("model", timeout_seconds=timeout))
+
+
+def test_queue_wait_does_not_count_against_the_timeout():
+    # One slot: the second call waits 0.15s for it, then runs within its own 0.2s
+    llm = service(SlowBackend([0.15]), timeout=0.2, max_concurrency=1)
+
+    async def scenario():
+        return await asyncio.gather(*(llm.run_async("system", f"prompt {index}") for index in range(2)))
+
+    assert asyncio.run(scenario()) == ["answer 1", "answer 2"]
+
+
+def test_a_timed_out_attempt_is_retried():
+    backend = SlowBackend([1.0, 0.01])
+    assert asyncio.run(service(backend, timeout=0.1).run_async("system", "prompt")) == "answer 2"
+    assert backend.attempts == 2
+
+
+def test_stream_idle_time_is_limited():
+    llm = service(SlowBackend([0], stall_after=1), timeout=0.2)
+
+    async def scenario():
+        deltas = []
+        with pytest.raises(asyncio.TimeoutError):
+            async for delta in llm.run_stream_async("system", "prompt"):
+                deltas.append(delta)
+        return deltas
+
+    # The stall after the first delta is not retried, since the caller already has output
+    assert asyncio.run(scenario()) == ["delta 0 "]
+
+
+def test_stream_first_delta_timeout_is_retried():
+    backend = SlowBackend([0], stall_after=0)
+    llm = service(backend, timeout=0.2)
+
+    async def scenario():
+        return [delta async for delta in llm.run_stream_async("system", "prompt")]
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scenario())
+    # The first attempt plus max_retries
+    assert backend.attempts == 3
@@ -0,0 +1,81 @@
+# Tests for the token-budgeted Q&A context
+
+import asyncio
+from typing import Any, List
+
+from leadgen.services.prompt_compaction import PromptCompactor, clean_answer, truncate_to_tokens
+from leadgen.utils.tokens import count_tokens
+
+LONG_ANSWER = " ".join(f"Sentence {index} about dental clinics and their scheduling needs." for index in range(60))
+
+
+def sections(**answers: str):
+    return {"Default Questions": {f"Question {name}?": answer for name, answer in answers.items()}}
+
+
+def test_answers_are_cleaned_of_whitespace_and_repeated_sentences():
+    assert clean_answer("We sell CRM.  We sell CRM.\n\nwe sell crm. Mostly   to clinics.") == \
+        "We sell CRM. Mostly to clinics."
+
+
+def test_truncation_keeps_the_head_and_tail_within_budget():
+    text = truncate_to_tokens(LONG_ANSWER, 60)
+    assert count_tokens(text) <= 60
+    assert text.startswith("Sentence 0 ") and text.endswith("Sentence 59 about dental clinics and their scheduling needs.")
+    assert " [...] " in text
+    assert truncate_to_tokens("short answer", 60) == "short answer"
+
+
+def test_rendering_meets_each_stage_budget():
+    compactor = PromptCompactor({"stages": {"keyword_generation": 300, "icp_generation": 1000}})
+    context = asyncio.run(compactor.build(sections(a=LONG_ANSWER, b=LONG_ANSWER + " Also vets.", c="Germany")))
+
+    keyword_text, keyword_metrics = compactor.render(context, "keyword_generation")
+    icp_text, icp_metrics = compactor.render(context, "icp_generation")
+    assert keyword_metrics["prompt_tokens"] == count_tokens(keyword_text) <= 300
+    assert icp_metrics["prompt_tokens"] <= 1000
+    assert keyword_metrics["prompt_tokens"] < icp_metrics["prompt_tokens"]
+    assert keyword_metrics["truncated_answers"] == 2
+    assert keyword_metrics["original_tokens"] > 1000
+    # The short answer is never cut
+    assert "Germany" in keyword_text
+    # Renderings are memoized per budget
+    assert compactor.render(context, "keyword_generation") == (keyword_text, keyword_metrics)
+
+    unlimited_text, unlimited_metrics = compactor.render(context, "unknown_stage")
+    assert unlimited_metrics["budget"] is None and unlimited_metrics["truncated_answers"] == 0
+
+
+def test_max_answer_tokens_caps_every_answer():
+    compactor = PromptCompactor({"max_answer_tokens": 50})
+    context = asyncio.run(compactor.build(sections(a=LONG_ANSWER, b="Short")))
+    text, metrics = compactor.render(context, "keyword_generation")
+    assert metrics["truncated_answers"] == 1
+    assert count_tokens(text) < 120
+
+
+class CountingSummarizer:
+    """LLM service stand-in that summarizes by returning a fixed text"""
+
+    def __init__(self):
+        self.prompts: List[str] = []
+
+    async def run_async(self, system_prompt: str, prompt: str, **_: Any) -> str:
+        self.prompts.append(prompt)
+        return "Summary of a long answer."
+
+
+def test_long_answers_are_summarized_once():
+    llm = CountingSummarizer()
+    compactor = PromptCompactor({"summarize_long_answers": True, "summarize_threshold_tokens": 200}, llm_service=llm)
+    summaries = {}
+    context = asyncio.run(compactor.build(sections(a=LONG_ANSWER, b=LONG_ANSWER, c="Germany"), summaries))
+    text, metrics = compactor.render(context, "keyword_generation")
+
+    assert len(llm.prompts) == 1
+    assert metrics["summarized_answers"] == 2
+    assert text.count("Summary of a long answer.") == 2 and "Germany" in text
+
+    # Summaries kept from an earlier build are not generated again
+    asyncio.run(compactor.build(sections(a=LONG_ANSWER), summaries))
+    assert len(llm.prompts) == 1
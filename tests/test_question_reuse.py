@@ -0,0 +1,106 @@
+# Tests for the question reuse index
+
+import os
+import asyncio
+
+import numpy as np
+import yaml
+
+from leadgen.pipeline.lead_gen_pipeline import AsyncLeadGenPipeline
+from leadgen.services.question_reuse import QuestionReuseIndex, hash_vector
+from leadgen.services.registry import ServiceRegistry
+
+ANSWERS = {"What do you sell?": "CRM software for dental clinics", "Who buys it?": "Mid-sized clinics in Europe"}
+QUESTIONS = ["How many clinics do you serve?", "Which CRM features matter most?"]
+
+
+def test_hash_vectors_are_normalized_and_position_aware():
+    vector = hash_vector(["CRM software", "dental clinics"])
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert np.isclose(vector @ hash_vector(["crm softwares", "dental clinic"]), 1.0)
+    assert vector @ hash_vector(["dental clinics", "CRM software"]) < 0.5
+
+
+def test_lookup_respects_the_threshold_and_exclude_session(tmp_path):
+    index = QuestionReuseIndex(str(tmp_path / "reuse.sqlite3"), threshold=0.9)
+    index.add("s1", ANSWERS, QUESTIONS, 2, "acme")
+
+    match = index.lookup(dict(ANSWERS), 2, "acme", exclude_session="s2")
+    assert match == {"questions": QUESTIONS, "similarity": 1.0, "session_id": "s1"}
+    assert index.lookup(ANSWERS, 2, "acme", exclude_session="s1") is None
+
+    different = {question: "Logistics for large retailers" for question in ANSWERS}
+    assert index.lookup(different, 2, "acme") is None
+    assert index.get_stats()["hits"] == 1
+    index.close()
+
+
+def test_the_threshold_decides_and_excluded_sessions_fall_back_to_the_next_best(tmp_path):
+    index = QuestionReuseIndex(str(tmp_path / "reuse.sqlite3"), threshold=0.0)
+    near = {**ANSWERS, "Who buys it?": "Mid-sized clinics in Germany"}
+    index.add("exact", ANSWERS, QUESTIONS, 2, "acme")
+    index.add("near", near, ["Near question?"], 2, "acme")
+    similarity = index.lookup(ANSWERS, 2, "acme", exclude_session="exact")["similarity"]
+    assert 0.5 < similarity < 1.0
+
+    # The reported similarity is rounded, so the threshold is set just around it
+    index.threshold = similarity - 1e-3
+    assert index.lookup(ANSWERS, 2, "acme", exclude_session="exact")["session_id"] == "near"
+    index.threshold = similarity + 1e-3
+    assert index.lookup(ANSWERS, 2, "acme", exclude_session="exact") is None
+    assert index.lookup(ANSWERS, 2, "acme")["session_id"] == "exact"
+    index.close()
+
+
+def test_entries_are_grouped_by_tenant_and_requested_count(tmp_path):
+    index = QuestionReuseIndex(str(tmp_path / "reuse.sqlite3"))
+    # The model returned fewer questions than requested; the entry is still found under the requested count
+    index.add("s1", ANSWERS, QUESTIONS, 10, "acme")
+    assert index.lookup(ANSWERS, 10, "acme") is not None
+    assert index.lookup(ANSWERS, 2, "acme") is None
+    assert index.lookup(ANSWERS, 10, "globex") is None
+    index.close()
+
+
+def test_oldest_entries_are_overwritten_and_reload_from_disk(tmp_path):
+    path = str(tmp_path / "reuse.sqlite3")
+    index = QuestionReuseIndex(path, threshold=0.99, max_entries=3)
+    answers = [{"What do you sell?": f"Product number {n} for market {n}"} for n in range(5)]
+    for n, qa in enumerate(answers):
+        index.add(f"s{n}", qa, [f"Question {n}"], 1, "acme")
+    index.add("s4", answers[4], ["Question 4, updated"], 1, "acme")
+    reopened = QuestionReuseIndex(path, threshold=0.99, max_entries=3)
+
+    for current in (index, reopened):
+        assert [current.lookup(qa, 1, "acme") is not None for qa in answers] == [False, False, True, True, True]
+        assert current.lookup(answers[4], 1, "acme")["questions"] == ["Question 4, updated"]
+    assert reopened._conn.execute("SELECT COUNT(*) FROM question_reuse").fetchone()[0] == 3
+    index.close()
+    reopened.close()
+
+
+def test_pipelines_only_reuse_questions_of_their_own_tenant(mock_config_dir, tmp_path):
+    config_path = os.path.join(mock_config_dir, "config.yaml")
+    with open(config_path) as file:
+        config = yaml.safe_load(file)
+    config["question_reuse"] = {"enabled": True, "path": str(tmp_path / "reuse.sqlite3")}
+    with open(config_path, "w") as file:
+        yaml.safe_dump(config, file)
+    registry = ServiceRegistry(mock_config_dir)
+
+    async def run(tenant_id):
+        pipeline = AsyncLeadGenPipeline(registry)
+        pipeline.session.tenant_id = tenant_id
+        questions = pipeline.run_default_questions_stage()
+        await pipeline.process_default_answers({question: "Acme sells CRM software to dental clinics" for question in questions})
+        await pipeline.run_personalized_questions_stage()
+        return pipeline.last_question_reuse
+
+    async def scenario():
+        return [await run(tenant_id) for tenant_id in (None, None, "acme", "globex", "acme")]
+
+    no_tenant, no_tenant_again, first, other_tenant, same_tenant = asyncio.run(scenario())
+    assert no_tenant is None and no_tenant_again is None
+    assert first == {"hit": False} and other_tenant == {"hit": False}
+    assert same_tenant["hit"]
+    registry.question_reuse.close()
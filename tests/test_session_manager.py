@@ -0,0 +1,141 @@
+# Tests for the session manager's memory tiers
+
+import asyncio
+
+import pytest
+
+from leadgen.pipeline.session_manager import SessionManager
+from leadgen.services.registry import ServiceRegistry
+
+
+@pytest.fixture
+def registry(mock_config_dir):
+    return ServiceRegistry(mock_config_dir)
+
+
+async def start(manager: SessionManager, *session_ids: str) -> None:
+    """Create sessions one after another, each released right away"""
+    for session_id in session_ids:
+        manager.create(session_id).session.tenant_id = f"tenant-{session_id}"
+        await manager.release(session_id)
+
+
+def test_idle_sessions_are_compacted_then_spilled(registry):
+    manager = SessionManager(registry, max_live=1)
+
+    async def scenario():
+        await start(manager, "a", "b", "c")
+        compacted = manager.get_stats()
+        manager.memory_budget_bytes = 0
+        await start(manager, "d")
+        return compacted, manager.get_stats()
+
+    compacted, spilled = asyncio.run(scenario())
+    assert (compacted["live"], compacted["compact"], compacted["compactions"]) == (1, 2, 2)
+    assert (spilled["live"], spilled["compact"], spilled["evictions"], spilled["memory_bytes"]) == (0, 0, 4, 0)
+    assert all(registry.session_storage.exists(session_id) for session_id in "abcd")
+
+
+def test_sessions_come_back_from_compact_and_from_storage(registry):
+    manager = SessionManager(registry, max_live=1)
+
+    async def scenario():
+        await start(manager, "a", "b", "c")
+        assert await manager.evict("a")
+        assert "a" not in manager and await manager.exists("a")
+        from_storage = await manager.acquire("a")
+        from_compact = await manager.acquire("b")
+        with pytest.raises(KeyError):
+            await manager.acquire("missing")
+        return from_storage, from_compact
+
+    from_storage, from_compact = asyncio.run(scenario())
+    assert from_storage.session.tenant_id == "tenant-a"
+    assert from_compact.session.tenant_id == "tenant-b"
+    stats = manager.get_stats()
+    assert (stats["rehydrated_storage"], stats["rehydrated_compact"], stats["in_use"]) == (1, 1, 2)
+
+
+def test_a_session_acquired_while_it_is_spilled_keeps_its_data(registry):
+    manager = SessionManager(registry)
+
+    async def scenario():
+        await start(manager, "a")
+        evicted, pipeline = await asyncio.gather(manager.evict("a"), manager.acquire("a"))
+        return evicted, pipeline
+
+    evicted, pipeline = asyncio.run(scenario())
+    assert evicted
+    assert pipeline.session.tenant_id == "tenant-a"
+    assert "a" in manager
+
+
+def test_an_older_spill_never_overwrites_a_newer_save(registry):
+    manager = SessionManager(registry, max_live=0)
+
+    async def scenario():
+        await start(manager, "a", "b")
+        manager.memory_budget_bytes = 0
+        # Picks a and b to spill, then waits for the save of a
+        spilling = asyncio.ensure_future(manager.release("other"))
+        await asyncio.sleep(0)
+        pipeline = await manager.acquire("b")
+        pipeline.session.tenant_id = "updated"
+        manager.memory_budget_bytes = 2 ** 20
+        await manager.release("b")
+        await manager.evict("b")
+        await spilling
+
+    asyncio.run(scenario())
+    assert registry.session_storage.load("b").tenant_id == "updated"
+    assert registry.session_storage.load("a").tenant_id == "tenant-a"
+
+
+def test_sessions_in_use_are_never_compacted_or_evicted(registry):
+    manager = SessionManager(registry, max_live=1, memory_budget_bytes=0)
+
+    async def scenario():
+        held = manager.create("held")
+        await start(manager, "a", "b")
+        return held, await manager.evict("held")
+
+    held, evicted = asyncio.run(scenario())
+    assert not evicted
+    stats = manager.get_stats()
+    assert (stats["live"], stats["compact"], stats["in_use"]) == (1, 0, 1)
+    assert manager._live["held"] is held
+    assert not registry.session_storage.exists("held")
+
+
+def test_pipelines_with_background_work_are_compacted_last(registry):
+    manager = SessionManager(registry, max_live=2)
+
+    async def scenario():
+        busy = manager.create("busy")
+        busy.has_background_work = lambda: True
+        await manager.release("busy")
+        await start(manager, "idle", "recent")
+
+    asyncio.run(scenario())
+    # "busy" is the least recently used, but the idle pipeline goes first
+    assert list(manager._live) == ["busy", "recent"]
+    assert list(manager._compact) == ["idle"]
+
+
+def test_prometheus_output(registry):
+    manager = SessionManager(registry, max_live=1, memory_budget_bytes=2 ** 20)
+    asyncio.run(start(manager, "a", "b"))
+    lines = manager.render_prometheus().splitlines()
+
+    assert 'leadgen_sessions_resident{tier="live"} 1' in lines
+    assert 'leadgen_sessions_resident{tier="compact"} 1' in lines
+    assert "leadgen_sessions_memory_budget_bytes 1048576" in lines
+    assert "leadgen_sessions_created_total 2" in lines
+    assert "leadgen_sessions_compactions_total 1" in lines
+    assert 'leadgen_sessions_rehydrations_total{source="storage"} 0' in lines
+    samples = [line for line in lines if not line.startswith("#")]
+    assert all(line.rsplit(" ", 1)[1].replace(".", "", 1).isdigit() for line in samples)
+    # Every sample's metric is declared once
+    declared = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert sorted(set(declared)) == sorted(declared)
+    assert {line.split("{")[0].split(" ")[0] for line in samples} == set(declared)
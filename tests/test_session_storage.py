@@ -0,0 +1,92 @@
+# Tests for the local and SQLite session storage backends
+
+from datetime import datetime
+
+import pytest
+
+from leadgen.entity.models import IdealCustomerProfile, Keyword, QuestionSession
+from leadgen.services.session_storage import (
+    STAGE_DEFAULT_QUESTIONS, STAGE_ICP, LocalSessionStorage, SQLiteSessionStorage, create_session_storage,
+)
+
+
+def full_session(session_id: str, created_at: datetime = datetime(2026, 3, 1, 9, 30)) -> QuestionSession:
+    return QuestionSession(
+        id=session_id,
+        tenant_id="acme",
+        created_at=created_at,
+        default_questions={"What do you sell?": "CRM software for dental clinics"},
+        generated_personalized_questions=["Who buys it?"],
+        personalized_questions={"Who buys it?": "Practice managers"},
+        keywords=[Keyword(text="dental crm", relevance_score=0.9, type="short-tail")],
+        ideal_customer_profile=IdealCustomerProfile(summary="Mid-sized dental clinics"),
+        prompt_metrics={"keyword_generation": {"prompt_tokens": 120}},
+    )
+
+
+@pytest.fixture(params=["local", "sqlite"])
+def storage(request, tmp_path):
+    storage = create_session_storage({"type": request.param, "path": str(tmp_path)})
+    yield storage
+    storage.close()
+
+
+def test_sessions_round_trip(storage):
+    session = full_session("s-1")
+    storage.save(session)
+    storage.flush()
+    assert storage.exists("s-1")
+    assert storage.load("s-1") == session
+
+    session.keywords.append(Keyword(text="clinic software"))
+    storage.save(session)
+    assert [keyword.text for keyword in storage.load("s-1").keywords] == ["dental crm", "clinic software"]
+
+
+def test_missing_and_unsafe_ids_are_not_found(storage):
+    assert not storage.exists("missing")
+    with pytest.raises(KeyError):
+        storage.load("missing")
+    if isinstance(storage, LocalSessionStorage):
+        assert not storage.exists("../escaped")
+        with pytest.raises(KeyError):
+            storage.load("../escaped")
+        with pytest.raises(ValueError):
+            storage.save(QuestionSession(id="../escaped"))
+
+
+def test_legacy_timestamped_files_are_read_and_replaced(tmp_path):
+    older, newer = full_session("s-1"), full_session("s-1")
+    newer.tenant_id = "newer"
+    (tmp_path / "20260101_090000_s-1.json").write_text(older.model_dump_json())
+    (tmp_path / "20260102_090000_s-1.json").write_text(newer.model_dump_json())
+    (tmp_path / "notes_s-2.json").write_text("{}")
+    storage = LocalSessionStorage(str(tmp_path))
+
+    assert storage.exists("s-1") and not storage.exists("s-2")
+    assert storage.load("s-1").tenant_id == "newer"
+
+    # Saving writes <id>.json and removes the superseded timestamped file
+    storage.save(older)
+    assert (tmp_path / "s-1.json").exists()
+    assert not (tmp_path / "20260102_090000_s-1.json").exists()
+    assert storage.load("s-1").tenant_id == "acme"
+
+
+def test_sqlite_buffers_saves_and_lists_by_stage(tmp_path):
+    storage = SQLiteSessionStorage(str(tmp_path / "sessions.sqlite3"), batch_size=3)
+    storage.save(full_session("done", datetime(2026, 3, 2)))
+    storage.save(QuestionSession(id="started", created_at=datetime(2026, 3, 3),
+                                 default_questions={"What do you sell?": ""}))
+    # Buffered saves are visible before they are written
+    assert storage.exists("done") and storage.load("done").tenant_id == "acme"
+
+    assert storage.list_session_ids() == ["started", "done"]
+    assert storage.list_session_ids(completed_stage=STAGE_ICP) == ["done"]
+    assert storage.list_session_ids(completed_stage=STAGE_DEFAULT_QUESTIONS) == ["started"]
+    assert storage.list_session_ids(since=datetime(2026, 3, 3)) == ["started"]
+    storage.close()
+
+    reopened = SQLiteSessionStorage(str(tmp_path / "sessions.sqlite3"))
+    assert reopened.load("done") == full_session("done", datetime(2026, 3, 2))
+    reopened.close()
@@ -0,0 +1,103 @@
+# Tests that the settings models are the one source of configuration defaults
+
+from pathlib import Path
+
+import pytest
+import yaml
+
+from leadgen.config.config_loader import ConfigLoader
+from leadgen.config.settings import (
+    FILE_MODELS, MockSettings, PromptBudgetSettings, QuestionReuseSettings, RateLimitSettings, StorageSettings,
+    validate_file,
+)
+from leadgen.services.mock_llm import MockLLMBackend
+from leadgen.services.prompt_compaction import PromptCompactor
+from leadgen.services.question_reuse import QuestionReuseIndex
+from leadgen.services.request_scheduler import RequestScheduler
+from leadgen.services.session_storage import create_session_storage
+
+CONFIG_DIR = Path(__file__).resolve().parent.parent / "config"
+
+
+@pytest.fixture
+def loader(tmp_path):
+    """A loader for files that set almost nothing, so the defaults decide"""
+    files = {
+        "config": {"llm": {"provider": "mock"}},
+        "params": {
+            "default_questions": ["What does your company do?"],
+            "agent_params": {"temperature": 0.7, "agents": {"keyword_generation_agent": {"max_tokens": 200}}},
+        },
+        "prompts": {},
+    }
+    for name, content in files.items():
+        (tmp_path / f"{name}.yaml").write_text(yaml.safe_dump(content))
+    return ConfigLoader(str(tmp_path))
+
+
+def test_config_dicts_and_typed_settings_agree(loader):
+    assert loader.get_config() == loader.get_settings("config").model_dump()
+    assert loader.get_params() == loader.get_settings("params").model_dump()
+
+
+def test_unset_sections_get_the_model_defaults(loader):
+    config, params = loader.get_config(), loader.get_params()
+    assert config["rate_limits"] == RateLimitSettings().model_dump()
+    assert config["question_reuse"]["threshold"] == QuestionReuseSettings().threshold
+    assert params["prompt_budget"] == PromptBudgetSettings().model_dump()
+
+
+def test_agent_overrides_keep_the_shared_settings(loader):
+    assert loader.get_model_settings("keyword_generation_agent") == {"temperature": 0.7, "max_tokens": 200}
+    assert loader.get_model_settings("icp_agent") == {"temperature": 0.7}
+
+
+def test_code_fallbacks_match_the_model_defaults(tmp_path):
+    # Services are also built from hand-written dicts (tests, benchmarks), where the .get() fallbacks apply
+    scheduler = RequestScheduler.from_config({})
+    limits = RateLimitSettings()
+    assert (scheduler.max_retries, scheduler.max_concurrency, scheduler.backoff_max_seconds) \
+        == (limits.max_retries, limits.max_concurrency, limits.backoff_max_seconds)
+
+    index = QuestionReuseIndex.from_config({"path": str(tmp_path / "reuse.sqlite3")})
+    assert index.threshold == QuestionReuseSettings().threshold
+    index.close()
+
+    compactor = PromptCompactor({})
+    budget = PromptBudgetSettings()
+    assert (compactor.max_answer_tokens, compactor.summarize_threshold, compactor.summary_tokens) \
+        == (budget.max_answer_tokens, budget.summarize_threshold_tokens, budget.summary_tokens)
+
+    assert MockLLMBackend.from_config({}).seed == MockSettings().seed
+
+    storage = create_session_storage({"type": "sqlite", "path": str(tmp_path), "sqlite_path": StorageSettings().sqlite_path})
+    assert storage.path == str(tmp_path / "sessions.sqlite3")
+    storage.close()
+
+
+def test_rate_limiting_is_off_without_a_rate_limits_section(loader):
+    from leadgen.services.registry import ServiceRegistry
+    assert ServiceRegistry(loader.config_dir)._create_scheduler() is None
+
+
+def enabled_flags(data, path=""):
+    """Map the dotted path of every "enabled" key to its value"""
+    flags = {}
+    for key, value in (data or {}).items():
+        if key == "enabled":
+            flags[path + key] = value
+        elif isinstance(value, dict):
+            flags.update(enabled_flags(value, f"{path}{key}."))
+    return flags
+
+
+
+@pytest.mark.parametrize("name", ["config", "params"])
+def test_shipped_files_keep_the_model_defaults_for_optional_features(name):
+    shipped = yaml.safe_load((CONFIG_DIR / f"{name}.yaml").read_text())
+    # default_questions is the one required setting
+    required = {"default_questions": shipped["default_questions"]} if name == "params" else {}
+    defaults = enabled_flags(FILE_MODELS[name](**required).model_dump())
+    # Every flag is spelled out in the shipped file, with the model's default
+    assert enabled_flags(shipped) == defaults
+    assert enabled_flags(validate_file(name, shipped).model_dump()) == defaults
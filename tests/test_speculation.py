@@ -0,0 +1,64 @@
+# Tests for the speculative work started while the user is still answering
+
+import asyncio
+from typing import Dict
+
+import pytest
+
+from leadgen.pipeline.lead_gen_pipeline import AsyncLeadGenPipeline
+from leadgen.pipeline.speculation import context_overlap
+from leadgen.services.registry import ServiceRegistry
+
+
+def test_context_overlap_is_the_share_of_final_words_already_seen():
+    assert context_overlap({"q1": "Dental clinics"}, {"q1": "dental clinic", "q2": ""}) == 1.0
+    assert context_overlap({"q1": "Dental clinics"}, {"q1": "Dental clinics", "q2": "in Germany"}) == 0.5
+    assert context_overlap({}, {"q1": "Anything"}) == 0.0
+    assert context_overlap({"q1": "Anything"}, {}) == 1.0
+
+
+def run_with_speculation(mock_config_dir, early: Dict[str, str], final: Dict[str, str]) -> AsyncLeadGenPipeline:
+    """Speculate from the early answers, then run the stage with the final ones"""
+    pipeline = AsyncLeadGenPipeline(ServiceRegistry(mock_config_dir))
+    pipeline.speculation_config = {"enabled": True, "min_answers": 1, "min_overlap": 0.5}
+
+    async def scenario():
+        questions = pipeline.run_default_questions_stage()
+        await pipeline.observe_default_answers({questions[0]: early["first"], questions[1]: early["second"]})
+        await pipeline.process_default_answers({
+            question: final.get(key, "") for question, key in zip(questions, ["first", "second", "third"])
+        } | {question: "n/a" for question in questions[3:]})
+        return await pipeline.run_personalized_questions_stage()
+
+    assert asyncio.run(scenario())
+    return pipeline
+
+
+@pytest.mark.parametrize("final, hit", [
+    ({"first": "We sell dental CRM software", "second": "Clinics in Germany", "third": "Germany"}, True),
+    ({"first": "Veterinary payroll tools", "second": "Farms across Brazil", "third": "Livestock"}, False),
+])
+def test_speculative_questions_are_kept_only_while_the_answers_overlap(mock_config_dir, final, hit):
+    early = {"first": "We sell dental CRM software", "second": "Clinics in Germany"}
+    pipeline = run_with_speculation(mock_config_dir, early, final)
+    assert pipeline.last_speculation["hit"] is hit
+    assert (pipeline.last_speculation["overlap"] >= 0.5) is hit
+
+
+def test_a_reused_keyword_draft_records_its_prompt_metrics(mock_config_dir):
+    pipeline = AsyncLeadGenPipeline(ServiceRegistry(mock_config_dir))
+    pipeline.keyword_draft_config = {"enabled": True, "min_answers": 1, "refresh_every": 1}
+
+    async def scenario():
+        questions = pipeline.run_default_questions_stage()
+        await pipeline.process_default_answers({question: "We sell dental practice software" for question in questions})
+        answers = {question: "Mid-sized clinics" for question in await pipeline.run_personalized_questions_stage()}
+        await pipeline.observe_personalized_answers(answers)
+        await pipeline.process_personalized_answers(answers)
+        return await pipeline.run_keyword_generation_stage()
+
+    keywords = asyncio.run(scenario())
+    assert keywords
+    assert pipeline.last_keyword_draft["used"] == "draft"
+    metrics = pipeline.session.prompt_metrics["keyword_generation"]
+    assert metrics and all(value is not None for value in metrics.values())